@@ -1,2 +1,5 @@
 #!/bin/sh
-mkctf-monitor --timeout 600 --delay 600
+if [ -f /mkctf.d/.mkctf/snapshot.bin ]; then
+    set -- --snapshot /mkctf.d/.mkctf/snapshot.bin "$@"
+fi
+mkctf-monitor --timeout 600 --delay 600 "$@"
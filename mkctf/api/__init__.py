@@ -1,20 +1,55 @@
 """MKCTF API implementation
 """
 
-from collections.abc import Iterator
+from asyncio import Semaphore, as_completed, create_task, gather
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import aclosing, nullcontext
 from dataclasses import dataclass
 from enum import Enum
+from functools import partial
+from itertools import repeat
+from json import loads
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from aiohttp import BasicAuth, ClientSession, ClientTimeout
 from yarl import URL
 
-from ..helper.subprocess import CalledProcessResult
+from ..helper.exception import MKCTFAPIException
+from ..helper.logging import LOGGER
+from ..helper.subprocess import (
+    CalledProcessResult,
+    CalledProcessState,
+    LineCallback,
+)
 from .challenge import ChallengeAPI
-from .config import ChallengeConfig, GeneralConfig, RepositoryConfig
+from .config import (
+    ChallengeConfig,
+    ConfigBatch,
+    GeneralConfig,
+    RepositoryConfig,
+)
+from .query import Aggregate, Catalog, parse_expression
 from .repository import RepositoryAPI, create_repository_api
+from .schedule import DependencyScheduler, dependency_closure
+
+if TYPE_CHECKING:
+    # export, fetch, snapshot and watch features pull tarfile, lzma, zipfile,
+    # urllib and ctypes, they are imported by methods using them
+    from ..helper.rangefetch import RemoteZip
+    from .export import ExportManifest, ExportResult, ExportVerification
+    from .watcher import RepositoryWatcher
 
 FLAG_SIZE = 16  # 16 bytes
+# challenge slug, stream name and line
+ChallengeLineCallback = Callable[[str, str, bytes], None]
+
+
+def _line_callback(
+    on_line: ChallengeLineCallback | None, challenge_api: ChallengeAPI
+) -> LineCallback | None:
+    if on_line is None:
+        return None
+    return partial(on_line, challenge_api.slug)
 
 
 @dataclass
@@ -36,13 +71,82 @@ class MKCTFAPI:
         tags: set[str] | None = None,
         categories: set[str] | None = None,
         slug: str | None = None,
+        enabled: bool | None = None,
     ) -> Iterator[ChallengeAPI]:
-        """Enumerate challenges"""
+        """Enumerate challenges
+
+        Only enabled (resp. disabled) challenges are enumerated when enabled
+        is True (resp. False)
+        """
         tags = tags or []
         categories = categories or []
-        for challenge_api in self.repository_api.chall_scan(tags, categories):
-            if slug is None or challenge_api.match_slug(slug):
-                yield challenge_api
+        yield from self.repository_api.chall_scan(
+            tags, categories, slug, enabled
+        )
+
+    def query(
+        self,
+        expression: str | None = None,
+        columns: list[str] | None = None,
+        group_by: list[str] | None = None,
+        aggregates: list[str] | None = None,
+    ) -> Iterator[dict]:
+        """Query challenges
+
+        Yield one row per challenge matching expression, restricted to
+        columns. When group_by or aggregates is given, yield one row per group
+        instead, aggregates being 'count' or 'function(column)' with function
+        in sum, min, max, avg, count.
+        """
+        expression = parse_expression(expression) if expression else None
+        aggregates = [Aggregate.parse(spec) for spec in aggregates or []]
+        catalog = self.repository_api.chall_catalog()
+        indices = catalog.filter(expression)
+        if group_by or aggregates:
+            yield from catalog.aggregate(
+                indices, group_by or [], aggregates or [Aggregate('count')]
+            )
+            return
+        yield from catalog.rows(indices, columns)
+
+    def index(self, rebuild: bool = False) -> int:
+        """Update challenge index and return indexed challenges count"""
+        return self.repository_api.index_update(rebuild)
+
+    def index_verify(self) -> list[tuple[str, str]]:
+        """Verify challenge index consistency"""
+        return self.repository_api.index_verify()
+
+    def watcher(self, interval: float = 5.0) -> 'RepositoryWatcher':
+        """Create a repository watcher
+
+        interval is the polling interval (in seconds) used when inotify is
+        not available.
+        """
+        from .watcher import RepositoryWatcher
+
+        if self.repository_api.read_only:
+            raise MKCTFAPIException("cannot watch a read-only repository")
+        return RepositoryWatcher(
+            repository_api=self.repository_api, interval=interval
+        )
+
+    def snapshot(self, filepath: Path | None = None) -> tuple[Path, int]:
+        """Write a snapshot of repository and challenge configurations
+
+        Snapshot is written to .mkctf/snapshot.bin unless filepath is given.
+        Return snapshot path and challenges count.
+        """
+        from .snapshot import write_snapshot
+
+        filepath = filepath or self.repository_api.snapshot_path
+        count = write_snapshot(
+            filepath,
+            self.repository_api.directory,
+            self.repository_api.config.to_dict(),
+            self.repository_api.chall_configs(),
+        )
+        return filepath, count
 
     def create(self, challenge_config: ChallengeConfig | None = None) -> bool:
         """Create a challenge"""
@@ -83,19 +187,185 @@ class MKCTFAPI:
         categories: set[str] | None = None,
         slug: str | None = None,
         export_disabled: bool = False,
-    ) -> Iterator[tuple[str, Path]]:
-        """Export challenge public data as an archive to given export_directory"""
+        jobs: int = 1,
+        force: bool = False,
+        reproducible: bool = False,
+        blobs: bool = False,
+    ) -> Iterator[tuple[str, 'ExportResult']]:
+        """Export challenge public data as an archive to given export_directory
+
+        Yields (slug, export result) tuples. Archives are compressed using
+        repository or category export configuration. Hashes computed while
+        archiving are stored in repository hash cache. When blobs is True,
+        compressed file data is stored once in repository blob store and
+        archives are assembled from it.
+
+        Archives are created by jobs worker processes when jobs is greater
+        than one. Results are yielded in challenge order in both cases.
+        Archives whose fingerprint did not change since previous export are
+        reused unless force is True. Reproducible archives are byte-stable:
+        identical inputs yield identical archives.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        from .export import (
+            ExportManifest,
+            ExportOptions,
+            cached_digests,
+            export_challenge,
+        )
+
         tags = tags or []
         categories = categories or []
         export_directory.mkdir(parents=True, exist_ok=True)
-        for challenge_api in self.repository_api.chall_scan(tags, categories):
-            if slug is None or challenge_api.match_slug(slug):
-                archive_path = challenge_api.export(
-                    export_directory, export_disabled
+        options = ExportOptions(
+            export_disabled=export_disabled,
+            reproducible=reproducible,
+            blob_directory=self.repository_api.blobs_dir if blobs else None,
+        )
+        manifest = ExportManifest.load(export_directory)
+        hash_cache = self.repository_api.hash_cache
+        challenge_apis = list(
+            self.repository_api.chall_scan(tags, categories, slug)
+        )
+        directories = [
+            challenge_api.directory for challenge_api in challenge_apis
+        ]
+        configs = [challenge_api.config for challenge_api in challenge_apis]
+        previous = [
+            None if force else manifest.fingerprints.get(challenge_api.slug)
+            for challenge_api in challenge_apis
+        ]
+        # worker processes cannot share the hash cache, send its entries
+        cached = [
+            cached_digests(
+                challenge_api.directory,
+                challenge_api.config,
+                self.repository_api.config,
+                hash_cache,
+            )
+            for challenge_api in challenge_apis
+        ]
+        executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+        try:
+            with executor or nullcontext():
+                results = (executor.map if executor else map)(
+                    export_challenge,
+                    directories,
+                    configs,
+                    repeat(self.repository_api.config),
+                    repeat(export_directory),
+                    repeat(options),
+                    previous,
+                    cached,
                 )
-                if not archive_path:
+                for challenge_api, result in zip(challenge_apis, results):
+                    if result is None:
+                        continue
+                    challenge_slug = challenge_api.slug
+                    manifest.fingerprints[challenge_slug] = result.fingerprint
+                    for stat, hexdigest in result.hashes:
+                        hash_cache.put(
+                            stat, hexdigest, result.fingerprint.time_ns
+                        )
+                    yield challenge_slug, result
+            if blobs:
+                self._prune_blobs(manifest)
+        finally:
+            manifest.dump()
+            hash_cache.dump()
+
+    def _prune_blobs(self, manifest: 'ExportManifest'):
+        """Drop blobs which are not referenced by manifest anymore"""
+        from ..helper.blobstore import BlobStore
+
+        keep = {
+            digest
+            for fingerprint in manifest.fingerprints.values()
+            for _, _, _, digest in fingerprint.files
+        }
+        count, size = BlobStore(self.repository_api.blobs_dir).prune(keep)
+        if count:
+            LOGGER.info("pruned %d unreferenced blobs (%d bytes)", count, size)
+
+    def export_verify(
+        self, export_directory: Path, jobs: int = 1
+    ) -> Iterator['ExportVerification']:
+        """Verify archives listed in export_directory export map
+
+        Outer and inner checksums of archives are verified by jobs threads,
+        decompression and hashing release the GIL. Archive names are also
+        compared to current static URLs. Results are yielded in export map
+        order.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        from .export import EXPORT_MAP, verify_archive
+
+        export_map_path = export_directory / EXPORT_MAP
+        try:
+            export_map = loads(export_map_path.read_text())
+        except (OSError, ValueError) as exc:
+            raise MKCTFAPIException(
+                f"failed to load {export_map_path}"
+            ) from exc
+        challenge_apis = {
+            challenge_api.slug: challenge_api
+            for challenge_api in self.repository_api.chall_scan()
+        }
+        slugs = list(export_map)
+        # export map holds absolute paths, a mirror can be anywhere
+        archive_names = [Path(export_map[slug]).name for slug in slugs]
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+            for verification in executor.map(
+                verify_archive,
+                repeat(export_directory),
+                slugs,
+                archive_names,
+            ):
+                challenge_api = challenge_apis.get(verification.slug)
+                if challenge_api is None:
+                    verification.errors.append("challenge not found")
+                    yield verification
                     continue
-                yield challenge_api.config.slug, archive_path
+                static_url = self.repository_api.config.make_static_url(
+                    verification.slug, challenge_api.config.category
+                )
+                if URL(static_url).name != verification.archive:
+                    verification.errors.append(
+                        f"archive name does not match static url {static_url}"
+                    )
+                yield verification
+
+    def fetch(
+        self, slug: str | None = None, url: str | None = None
+    ) -> 'RemoteZip':
+        """Remote zip archive of a challenge, read using range requests
+
+        Archive is located using challenge static url unless url is given.
+        Returned archive is an asynchronous context manager.
+        """
+        from ..helper.compression import ZipBackend
+        from ..helper.rangefetch import RemoteZip
+
+        if url is None:
+            challenge_api = self.find(slug)
+            if challenge_api is None:
+                raise MKCTFAPIException(f"challenge not found: {slug}")
+            url = str(challenge_api.config.static_url)
+        if not URL(url).name.endswith(ZipBackend.extension):
+            raise MKCTFAPIException(
+                f"{url} is not a zip archive, export challenge using zip compression"
+            )
+        return RemoteZip(url)
+
+    def batch(self) -> ConfigBatch:
+        """Create a configuration batch
+
+        Caller is responsible for committing or rolling back the batch, use it
+        as a context manager to commit on success and roll back on error.
+        """
+        return ConfigBatch()
 
     def renew_flag(
         self,
@@ -103,13 +373,20 @@ class MKCTFAPI:
         categories: set[str] | None = None,
         slug: str | None = None,
         size: int | None = None,
+        batch: ConfigBatch | None = None,
     ) -> Iterator[tuple[str, str]]:
-        """Renew flag for one challenge or more"""
+        """Renew flag for one challenge or more
+
+        Configuration writes are staged in batch if given, otherwise they are
+        committed once every challenge has been processed.
+        """
         tags = tags or []
         categories = categories or []
-        for challenge_api in self.repository_api.chall_scan(tags, categories):
-            if slug is None or challenge_api.match_slug(slug):
-                flag = challenge_api.renew_flag(size or FLAG_SIZE)
+        with nullcontext(batch) if batch else ConfigBatch() as batch:
+            for challenge_api in self.repository_api.chall_scan(
+                tags, categories, slug
+            ):
+                flag = challenge_api.renew_flag(size or FLAG_SIZE, batch)
                 yield challenge_api.config.slug, flag
 
     def update_meta(
@@ -117,16 +394,21 @@ class MKCTFAPI:
         tags: set[str] | None = None,
         categories: set[str] | None = None,
         slug: str | None = None,
+        batch: ConfigBatch | None = None,
     ) -> Iterator[tuple[str, URL]]:
         """Update static metadata
 
-        Only static_url might be updated at the moment
+        Only static_url might be updated at the moment. Configuration writes
+        are staged in batch if given, otherwise they are committed once every
+        challenge has been processed.
         """
         tags = tags or []
         categories = categories or []
-        for challenge_api in self.repository_api.chall_scan(tags, categories):
-            if slug is None or challenge_api.match_slug(slug):
-                static_url = challenge_api.update_static_url()
+        with nullcontext(batch) if batch else ConfigBatch() as batch:
+            for challenge_api in self.repository_api.chall_scan(
+                tags, categories, slug
+            ):
+                static_url = challenge_api.update_static_url(batch)
                 yield challenge_api.config.slug, static_url
 
     async def push(
@@ -139,6 +421,9 @@ class MKCTFAPI:
         no_verify_ssl: bool = False,
     ) -> tuple[bool, str]:
         """Push challenge configuration to a dashboard API"""
+        # aiohttp is slow to import and only needed here
+        from aiohttp import BasicAuth, ClientSession, ClientTimeout
+
         tags = tags or []
         categories = categories or []
         challenges = [
@@ -162,6 +447,135 @@ class MKCTFAPI:
             except Exception as exc:
                 return False, str(exc)
 
+    async def _run_prog(
+        self,
+        prog: str,
+        tags: set[str] | None,
+        categories: set[str] | None,
+        slug: str | None,
+        dev: bool,
+        timeout: int | None,
+        jobs: int,
+        keep_order: bool,
+        on_line: ChallengeLineCallback | None,
+        log: bool,
+    ) -> AsyncIterator[tuple[str, CalledProcessResult]]:
+        """Run prog executable of challenges, at most jobs at a time
+
+        Results are yielded as programs complete unless keep_order is True.
+        Output lines are passed to on_line as they are produced, full output
+        is written to logs directory if log is True.
+        """
+        tags = tags or []
+        categories = categories or []
+        semaphore = Semaphore(max(jobs, 1))
+
+        async def run(challenge_api):
+            async with semaphore:
+                cpr = await getattr(challenge_api, prog)(
+                    dev,
+                    timeout,
+                    on_line=_line_callback(on_line, challenge_api),
+                    log=log,
+                )
+            return challenge_api.slug, cpr
+
+        tasks = [
+            create_task(run(challenge_api))
+            for challenge_api in self.repository_api.chall_scan(
+                tags, categories, slug
+            )
+        ]
+        try:
+            for task in tasks if keep_order else as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+            # let cancelled programs be terminated and their logs closed
+            await gather(*tasks, return_exceptions=True)
+
+    def _build_scheduler(
+        self,
+        tags: set[str] | None,
+        categories: set[str] | None,
+        slug: str | None,
+        dependencies: bool,
+        jobs: int = 1,
+    ) -> tuple[dict[str, ChallengeAPI], DependencyScheduler]:
+        """Select challenges to build and schedule them along dependencies"""
+        challenge_apis = {
+            challenge_api.slug: challenge_api
+            for challenge_api in self.repository_api.chall_scan(
+                tags or [], categories or [], slug
+            )
+        }
+        if dependencies and any(
+            challenge_api.config.depends
+            for challenge_api in challenge_apis.values()
+        ):
+            known = {
+                challenge_api.slug: challenge_api
+                for challenge_api in self.repository_api.chall_scan()
+            }
+            selected = set(
+                dependency_closure(
+                    list(challenge_apis),
+                    {
+                        known_slug: challenge_api.config.depends
+                        for known_slug, challenge_api in known.items()
+                    },
+                )
+            )
+            challenge_apis = {
+                known_slug: challenge_api
+                for known_slug, challenge_api in known.items()
+                if known_slug in selected
+            }
+        scheduler = DependencyScheduler(
+            {
+                challenge_slug: challenge_api.config.depends
+                for challenge_slug, challenge_api in challenge_apis.items()
+            },
+            jobs,
+        )
+        return challenge_apis, scheduler
+
+    def build_plan(
+        self,
+        tags: set[str] | None = None,
+        categories: set[str] | None = None,
+        slug: str | None = None,
+        dev: bool = False,
+        force: bool = False,
+        dependencies: bool = True,
+    ) -> Iterator[tuple[str, str | None]]:
+        """Yield challenges in build order and why they would be built
+
+        Reason is None for challenges which are up-to-date. A challenge is
+        built again when one of its dependencies is.
+        """
+        challenge_apis, scheduler = self._build_scheduler(
+            tags, categories, slug, dependencies
+        )
+        outdated = set()
+        for challenge_slug in scheduler.topological_order():
+            rebuilt = [
+                dependency
+                for dependency in scheduler.dependencies[challenge_slug]
+                if dependency in outdated
+            ]
+            if force:
+                reason = "forced"
+            elif rebuilt:
+                reason = f"dependency {rebuilt[0]} is built"
+            else:
+                reason = challenge_apis[challenge_slug].build_outdated(dev)
+            if reason:
+                outdated.add(challenge_slug)
+            yield challenge_slug, reason
+        self.repository_api.hash_cache.dump()
+
     async def build(
         self,
         tags: set[str] | None = None,
@@ -169,14 +583,55 @@ class MKCTFAPI:
         slug: str | None = None,
         dev: bool = False,
         timeout: int | None = None,
-    ) -> tuple[str, CalledProcessResult]:
-        """Run build executable"""
-        tags = tags or []
-        categories = categories or []
-        for challenge_api in self.repository_api.chall_scan(tags, categories):
-            if slug is None or challenge_api.match_slug(slug):
-                cpr = await challenge_api.build(dev, timeout)
-                yield challenge_api.config.slug, cpr
+        jobs: int = 1,
+        keep_order: bool = False,
+        dependencies: bool = True,
+        force: bool = False,
+        on_line: ChallengeLineCallback | None = None,
+        log: bool = False,
+    ) -> AsyncIterator[tuple[str, CalledProcessResult]]:
+        """Run build executable
+
+        A challenge build starts as soon as builds of challenges it depends
+        on succeeded, builds of dependents of a failed challenge are skipped.
+        Dependencies of selected challenges are built as well unless
+        dependencies is False. Up-to-date challenges are not built again
+        unless force is True. Output lines are passed to on_line as they are
+        produced, full output is written to logs directory if log is True.
+        """
+        challenge_apis, scheduler = self._build_scheduler(
+            tags, categories, slug, dependencies, jobs
+        )
+
+        async def run(challenge_slug):
+            challenge_api = challenge_apis[challenge_slug]
+            return await challenge_api.build(
+                dev,
+                timeout,
+                force,
+                on_line=_line_callback(on_line, challenge_api),
+                log=log,
+            )
+
+        def skipped(challenge_slug, dependency):
+            return CalledProcessResult(
+                exception=f"dependency {dependency} failed",
+                returncode=CalledProcessState.SKIPPED.value,
+            )
+
+        results = scheduler.run(
+            run, lambda cpr: cpr.healthy, skipped, keep_order
+        )
+        try:
+            # closing results cancels builds still running
+            async with aclosing(results):
+                async for result in results:
+                    yield result
+        finally:
+            self.repository_api.hash_cache.dump()
+        path, length = scheduler.critical_path()
+        if path:
+            LOGGER.info("critical path: %s (%.2fs)", ' -> '.join(path), length)
 
     async def deploy(
         self,
@@ -185,14 +640,27 @@ class MKCTFAPI:
         slug: str | None = None,
         dev: bool = False,
         timeout: int | None = None,
-    ) -> tuple[str, CalledProcessResult]:
+        jobs: int = 1,
+        keep_order: bool = False,
+        on_line: ChallengeLineCallback | None = None,
+        log: bool = False,
+    ) -> AsyncIterator[tuple[str, CalledProcessResult]]:
         """Run deploy executable"""
-        tags = tags or []
-        categories = categories or []
-        for challenge_api in self.repository_api.chall_scan(tags, categories):
-            if slug is None or challenge_api.match_slug(slug):
-                cpr = await challenge_api.deploy(dev, timeout)
-                yield challenge_api.config.slug, cpr
+        results = self._run_prog(
+            'deploy',
+            tags,
+            categories,
+            slug,
+            dev,
+            timeout,
+            jobs,
+            keep_order,
+            on_line,
+            log,
+        )
+        async with aclosing(results):
+            async for result in results:
+                yield result
 
     async def healthcheck(
         self,
@@ -201,20 +669,49 @@ class MKCTFAPI:
         slug: str | None = None,
         dev: bool = False,
         timeout: int | None = None,
-    ) -> tuple[str, CalledProcessResult]:
+        jobs: int = 1,
+        keep_order: bool = False,
+        on_line: ChallengeLineCallback | None = None,
+        log: bool = False,
+    ) -> AsyncIterator[tuple[str, CalledProcessResult]]:
         """Run healthcheck executable"""
-        tags = tags or []
-        categories = categories or []
-        for challenge_api in self.repository_api.chall_scan(tags, categories):
-            if slug is None or challenge_api.match_slug(slug):
-                cpr = await challenge_api.healthcheck(dev, timeout)
-                yield challenge_api.config.slug, cpr
+        results = self._run_prog(
+            'healthcheck',
+            tags,
+            categories,
+            slug,
+            dev,
+            timeout,
+            jobs,
+            keep_order,
+            on_line,
+            log,
+        )
+        async with aclosing(results):
+            async for result in results:
+                yield result
 
 
-def create_mkctf_api(repository_directory: Path) -> MKCTFAPI:
-    """Create MKCTFAPI instance"""
+def create_mkctf_api(
+    repository_directory: Path,
+    scan_workers: int = 0,
+    snapshot: Path | None = None,
+) -> MKCTFAPI:
+    """Create MKCTFAPI instance
+
+    Challenge configurations are loaded using scan_workers threads when
+    scan_workers is greater than one. When snapshot is given, repository is
+    opened read-only from this snapshot and repository_directory is ignored.
+    """
     general_config = GeneralConfig.load()
+    if snapshot:
+        from .snapshot import create_snapshot_repository_api
+
+        repository_api = create_snapshot_repository_api(
+            snapshot, general_config
+        )
+        return MKCTFAPI(repository_api=repository_api)
     repository_api = create_repository_api(
-        repository_directory, general_config
+        repository_directory, general_config, scan_workers
     )
     return MKCTFAPI(repository_api=repository_api)
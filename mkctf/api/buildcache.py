@@ -0,0 +1,134 @@
+"""Build cache
+"""
+
+from base64 import b64decode, b64encode
+from collections.abc import Callable
+from dataclasses import dataclass
+from hashlib import sha256
+from json import dumps, loads
+from os import readlink
+from pathlib import Path
+from stat import S_IFMT, S_ISLNK, S_ISREG
+
+from ..helper.gitignore import walk_files
+from ..helper.logging import LOGGER
+from ..helper.subprocess import CalledProcessResult
+
+BUILD_CACHE_VERSION = 1
+
+
+@dataclass
+class BuildRecord:
+    """Last successful build of a challenge and its inputs fingerprint"""
+
+    fingerprint: str
+    result: CalledProcessResult
+
+    @classmethod
+    def from_dict(cls, dct):
+        result = dct['result']
+        for key in ('stdout', 'stderr'):
+            if result[key] is not None:
+                result[key] = b64decode(result[key])
+        return cls(
+            fingerprint=dct['fingerprint'],
+            result=CalledProcessResult.from_dict(result),
+        )
+
+    def to_dict(self):
+        result = self.result.to_dict()
+        for key in ('stdout', 'stderr'):
+            if result[key] is not None:
+                result[key] = b64encode(result[key]).decode()
+        return {
+            'version': BUILD_CACHE_VERSION,
+            'fingerprint': self.fingerprint,
+            'result': result,
+        }
+
+
+@dataclass
+class BuildCache:
+    """Build records, one file per challenge slug"""
+
+    directory: Path
+
+    def path(self, slug: str) -> Path:
+        """Build record file path"""
+        return self.directory / f'{slug}.json'
+
+    def load(self, slug: str) -> BuildRecord | None:
+        """Load build record, None if challenge was never built"""
+        filepath = self.path(slug)
+        if not filepath.is_file():
+            return None
+        try:
+            dct = loads(filepath.read_text())
+            if dct['version'] != BUILD_CACHE_VERSION:
+                raise ValueError("build cache version mismatch")
+            return BuildRecord.from_dict(dct)
+        except Exception as exc:
+            LOGGER.warning(
+                "discarding invalid build record %s (%s)", filepath, exc
+            )
+            return None
+
+    def dump(self, slug: str, record: BuildRecord):
+        """Write build record"""
+        filepath = self.path(slug)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        tmp_filepath = filepath.with_name(f'.{filepath.name}.tmp')
+        try:
+            tmp_filepath.write_text(
+                dumps(record.to_dict(), separators=(',', ':'))
+            )
+            tmp_filepath.replace(filepath)
+        except OSError as exc:
+            LOGGER.warning(
+                "failed to write build record %s (%s)", filepath, exc
+            )
+
+
+def build_fingerprint(
+    directory: Path,
+    root: Path,
+    excluded: set[Path],
+    prog: str,
+    flag: str,
+    dev: bool,
+    dependencies: dict[str, str],
+    hexdigest: Callable[[Path], str],
+) -> str:
+    """Fingerprint of challenge build inputs
+
+    Inputs are files under directory which are neither ignored by a
+    .gitignore file below root nor excluded, build program prog, flag, dev
+    mode and fingerprints of dependencies last successful builds. Only
+    regular files are read, the type of other files is fingerprinted.
+    Raises OSError if a file cannot be read.
+    """
+    hasher = sha256()
+
+    def update(*fields):
+        hasher.update('\0'.join(fields).encode('utf-8', 'surrogateescape'))
+        hasher.update(b'\n')
+
+    prog_path = directory / prog
+    update('prog', prog, hexdigest(prog_path) if prog_path.is_file() else '')
+    update('flag', flag)
+    update('dev', str(dev))
+    for slug, fingerprint in sorted(dependencies.items()):
+        update('dependency', slug, fingerprint)
+    for filepath in walk_files(directory, root, excluded):
+        relpath = filepath.relative_to(directory).as_posix()
+        mode = filepath.lstat().st_mode
+        if S_ISLNK(mode):
+            update('link', relpath, readlink(filepath))
+            continue
+        # opening a FIFO would block until a writer shows up
+        if not S_ISREG(mode):
+            update('special', relpath, oct(S_IFMT(mode)))
+            continue
+        executable = str(bool(mode & 0o111))
+        update('file', relpath, executable, hexdigest(filepath))
+    return hasher.hexdigest()
@@ -0,0 +1,127 @@
+"""Content hash cache
+"""
+
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from json import dumps, loads
+from os import stat_result
+from pathlib import Path
+from threading import Lock
+from time import time_ns
+
+from ..helper.checksum import sha256_file_hexdigest
+from ..helper.logging import LOGGER
+from .index import RACY_DELAY_NS
+
+HASH_CACHE_VERSION = 1
+HASH_CACHE_SIZE = 65536
+
+
+def stat_key(stat: stat_result) -> str:
+    """Cache key of file having given stat"""
+    return f'{stat.st_dev}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}'
+
+
+@dataclass
+class HashCache:
+    """Persistent SHA-256 cache keyed by device, inode, size and mtime_ns
+
+    Entries are kept in least recently used first order and evicted once
+    max_entries is exceeded. A hash is not cached if file was modified less
+    than RACY_DELAY_NS before it was computed: coarse mtime filesystems could
+    hide a later modification. Instances are thread-safe.
+    """
+
+    filepath: Path
+    max_entries: int = HASH_CACHE_SIZE
+    entries: OrderedDict[str, str] = field(default_factory=OrderedDict)
+    dirty: bool = False
+    _lock: Lock = field(default_factory=Lock, repr=False)
+
+    @classmethod
+    def load(
+        cls, filepath: Path, max_entries: int = HASH_CACHE_SIZE
+    ) -> 'HashCache':
+        """Load cache from filepath, an invalid cache is considered empty"""
+        cache = cls(filepath=filepath, max_entries=max_entries)
+        if not filepath.is_file():
+            return cache
+        try:
+            dct = loads(filepath.read_text())
+            if dct['version'] != HASH_CACHE_VERSION:
+                raise ValueError("hash cache version mismatch")
+            cache.entries = OrderedDict(dct['entries'][-max_entries:])
+        except Exception as exc:
+            LOGGER.warning(
+                "discarding invalid hash cache %s (%s)", filepath, exc
+            )
+            cache.dirty = True
+        return cache
+
+    def dump(self):
+        """Write cache to filepath if it changed since last load"""
+        if not self.dirty:
+            return
+        with self._lock:
+            dct = {
+                'version': HASH_CACHE_VERSION,
+                'entries': list(self.entries.items()),
+            }
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        tmp_filepath = self.filepath.with_name(f'.{self.filepath.name}.tmp')
+        try:
+            tmp_filepath.write_text(dumps(dct, separators=(',', ':')))
+            tmp_filepath.replace(self.filepath)
+        except OSError as exc:
+            LOGGER.warning(
+                "failed to write hash cache %s (%s)", self.filepath, exc
+            )
+            return
+        self.dirty = False
+
+    def get(self, stat: stat_result) -> str | None:
+        """Cached hash of file having given stat, None if unknown"""
+        key = stat_key(stat)
+        with self._lock:
+            hexdigest = self.entries.get(key)
+            if hexdigest is not None:
+                self.entries.move_to_end(key)
+            return hexdigest
+
+    def digests(self, stats: Iterable[stat_result]) -> dict[str, str]:
+        """Cached hashes of files having given stats, keyed by stat_key
+
+        Result can be sent to worker processes which cannot share the cache.
+        """
+        digests = {}
+        for stat in stats:
+            hexdigest = self.get(stat)
+            if hexdigest is not None:
+                digests[stat_key(stat)] = hexdigest
+        return digests
+
+    def put(self, stat: stat_result, hexdigest: str, hashed_ns: int):
+        """Cache hash of file having given stat, computed from hashed_ns"""
+        if stat.st_mtime_ns >= hashed_ns - RACY_DELAY_NS:
+            return
+        key = stat_key(stat)
+        with self._lock:
+            self.entries[key] = hexdigest
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.dirty = True
+
+    def hexdigest(self, filepath: Path) -> str:
+        """File SHA-256 hex digest, read file only if it is not cached"""
+        stat = filepath.stat()
+        hexdigest = self.get(stat)
+        if hexdigest is not None:
+            return hexdigest
+        hashed_ns = time_ns()
+        hexdigest = sha256_file_hexdigest(filepath)
+        # do not cache a hash computed while file was changing
+        if stat_key(filepath.stat()) == stat_key(stat):
+            self.put(stat, hexdigest, hashed_ns)
+        return hexdigest
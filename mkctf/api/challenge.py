@@ -1,30 +1,72 @@
 """Challenge API
 """
 
+from asyncio import to_thread
 from dataclasses import dataclass
 from pathlib import Path
 from shutil import rmtree
 from stat import S_IRWXU
-from tarfile import open as tarfile_open
-from tempfile import NamedTemporaryFile
 
-from jinja2 import Template
 from yarl import URL
 
-from ..helper.checksum import ChecksumFile
 from ..helper.logging import LOGGER
-from ..helper.subprocess import CalledProcessResult, run_mkctf_prog
-from ..wizard import ChallengeConfigWizard
-from .config import ChallengeConfig, FileConfig
+from ..helper.subprocess import (
+    CalledProcessResult,
+    CalledProcessState,
+    LineCallback,
+    run_mkctf_prog,
+)
+from .buildcache import BuildRecord, build_fingerprint
+from .config import CONFIG_CODEC, ChallengeConfig, ConfigBatch, FileConfig
 
 
 @dataclass
 class ChallengeAPI:
-    """Provides programmatic access to challenge features"""
+    """Provides programmatic access to challenge features
+
+    Challenge configuration is loaded on first access only.
+    """
 
-    config: ChallengeConfig
     directory: Path
     repository_api: 'RepositoryAPI'
+    config_: ChallengeConfig | None = None
+
+    @property
+    def config(self) -> ChallengeConfig:
+        """Challenge configuration"""
+        if self.config_ is None:
+            self.config_ = self.repository_api.index.config(self.config_path)
+        return self.config_
+
+    @config.setter
+    def config(self, config: ChallengeConfig):
+        self.config_ = config
+
+    @property
+    def indexed_config(self) -> dict:
+        """Challenge configuration dict as indexed, neither parsed nor checked
+
+        Cheaper than config when a few fields are read right after a
+        repository scan brought the index up to date, see chall_scan.
+        """
+        if self.config_ is not None:
+            return self.config_.to_dict()
+        index = self.repository_api.index
+        entry = index.entries.get(index.key(self.config_path))
+        return entry.config if entry else {}
+
+    @property
+    def slug(self) -> str:
+        """Challenge slug, as configured
+
+        Read from challenge index unless configuration is loaded already.
+        Challenge directory name is used when slug is not configured.
+        """
+        if self.config_ is None:
+            slug = self.indexed_config.get('slug')
+        else:
+            slug = self.config_.slug
+        return slug or self.config.slug or self.directory.name
 
     @property
     def repository_config(self):
@@ -63,6 +105,8 @@ class ChallengeAPI:
         if template:
             tmpl_path = self.repository_api.templates_dir / template
             if tmpl_path.is_file():
+                from jinja2 import Template
+
                 tmpl = Template(tmpl_path.read_text())
                 try:
                     content = tmpl.render(
@@ -122,6 +166,8 @@ class ChallengeAPI:
         """Configure challenge"""
         final_config = chall_config_override
         if not final_config:
+            from ..wizard import ChallengeConfigWizard
+
             wizard = ChallengeConfigWizard(
                 existing_config=self.config,
                 repository_config=self.repository_config,
@@ -133,122 +179,219 @@ class ChallengeAPI:
         self.config.dump(self.config_path)
         return True
 
-    def enable(self) -> bool:
+    def enable(self, batch: ConfigBatch | None = None) -> bool:
         """Enable the challenge"""
         self.config.enabled = True
-        self.config.dump(self.config_path)
+        self.config.dump(self.config_path, batch)
         return True
 
-    def disable(self) -> bool:
+    def disable(self, batch: ConfigBatch | None = None) -> bool:
         """Disable the challenge"""
         self.config.enabled = False
-        self.config.dump(self.config_path)
+        self.config.dump(self.config_path, batch)
         return True
 
-    def renew_flag(self, size: int) -> str:
+    def renew_flag(self, size: int, batch: ConfigBatch | None = None) -> str:
         """Replace current flag by a randomly generated one"""
         flag = self.repository_config.make_rand_flag(size)
         self.config.flag = flag
-        self.config.dump(self.config_path)
+        self.config.dump(self.config_path, batch)
         return flag
 
-    def update_static_url(self) -> URL:
+    def update_static_url(self, batch: ConfigBatch | None = None) -> URL:
         """Update challenge static url in configuration if required"""
-        static_url = self.repository_config.make_static_url(self.config.slug)
-        if self.config.static_url != static_url:
+        static_url = self.repository_config.make_static_url(
+            self.config.slug, self.config.category
+        )
+        if str(self.config.static_url) != static_url:
             self.config.static_url = static_url
-            self.config.dump(self.config_path)
+            self.config.dump(self.config_path, batch)
         return static_url
 
     def export(self, export_directory: Path, export_disabled: bool) -> Path:
         """Export the challenge
 
-        Creates a gzipped tar archive containing all of the challenge "exportable" files
+        Creates a compressed tar archive containing all of the challenge "exportable" files
         """
-        if not export_disabled and not self.config.enabled:
-            LOGGER.warning("export ignored %s (disabled)", self.config.slug)
-            return None
-        archive_name = self.config.static_url.parts[-1]
-        if not archive_name:
-            LOGGER.error(
-                "export ignored %s (invalid/empty static_url)",
-                self.config.slug,
+        from .export import ExportOptions, export_challenge
+
+        result = export_challenge(
+            self.directory,
+            self.config,
+            self.repository_config,
+            export_directory,
+            ExportOptions(export_disabled=export_disabled),
+        )
+        return result.archive_path if result else None
+
+    def last_build(self) -> BuildRecord | None:
+        """Last successful build record, None if challenge was never built"""
+        return self.repository_api.build_cache.load(self.slug)
+
+    def build_fingerprint(self, dev: bool = False) -> str:
+        """Fingerprint of build inputs
+
+        Challenge files honoring .gitignore files except configuration, its
+        sidecar and public directories, build program, flag, dev mode and
+        fingerprints of dependencies last successful builds.
+        """
+        excluded = {
+            self.config_path,
+            CONFIG_CODEC.sidecar_path(self.config_path),
+        }
+        excluded.update(
+            self.directory / public_dir
+            for public_dir in self.repository_config.directories(
+                self.config.category, public_only=True
             )
-            LOGGER.error(
-                "running `mkctf-cli update-meta` should be enough to fix this issue."
+        )
+        dependencies = {}
+        for slug in self.config.depends:
+            record = self.repository_api.build_cache.load(slug)
+            dependencies[slug] = record.fingerprint if record else ''
+        return build_fingerprint(
+            self.directory,
+            self.repository_api.directory,
+            excluded,
+            self.repository_config.standard.build.name,
+            self.config.flag,
+            dev,
+            dependencies,
+            self.repository_api.hash_cache.hexdigest,
+        )
+
+    def build_outdated(self, dev: bool = False) -> str | None:
+        """Reason why challenge must be built, None if it is up-to-date"""
+        record = self.last_build()
+        if record is None:
+            return "never built"
+        try:
+            fingerprint = self.build_fingerprint(dev)
+        except OSError as exc:
+            return f"inputs cannot be fingerprinted ({exc})"
+        if record.fingerprint != fingerprint:
+            return "inputs changed"
+        return None
+
+    async def _run_prog(
+        self,
+        prog: str,
+        dev: bool,
+        timeout: int,
+        on_line: LineCallback | None,
+        log: bool,
+    ) -> CalledProcessResult:
+        """Run challenge program, output is written to logs directory if log"""
+        log_path = None
+        if log and not self.repository_api.read_only:
+            log_path = (
+                self.repository_api.logs_dir / self.slug / f'{prog}.log.gz'
             )
-            return None
-        archive_path = export_directory / archive_name
-        checksum_file = ChecksumFile()
-        with tarfile_open(str(archive_path), 'w:gz') as arch:
-            for directory in self.repository_config.directories(
-                self.config.category, public_only=True
-            ):
-                dir_path = self.directory / directory
-                for entry in dir_path.glob('*'):
-                    if entry.is_dir():
-                        LOGGER.warning(
-                            "export ignored %s within %s (directory)",
-                            entry,
-                            self.config.slug,
-                        )
-                        continue
-                    checksum_file.add(entry)
-                    LOGGER.debug("adding %s to archive...", entry)
-                    arch.add(str(entry), arcname=entry.name)
-            with NamedTemporaryFile('w') as tmpfile:
-                tmpfile.write(checksum_file.content)
-                tmpfile.flush()
-                LOGGER.debug("adding checksum.sha256 to archive...")
-                arch.add(tmpfile.name, arcname='checksum.sha256')
-        arch_checksum_file = ChecksumFile()
-        arch_checksum_file.add(archive_path)
-        export_directory.joinpath(f'{archive_name}.sha256').write_text(
-            arch_checksum_file.content
+        limits = self.config.limits.to_dict() if self.config.limits else None
+        return await run_mkctf_prog(
+            prog, self.directory, dev, timeout, on_line, log_path, limits
         )
-        return archive_path
 
     async def build(
-        self, dev: bool = False, timeout: int = 4
+        self,
+        dev: bool = False,
+        timeout: int = 4,
+        force: bool = False,
+        on_line: LineCallback | None = None,
+        log: bool = False,
     ) -> CalledProcessResult:
-        """Build the challenge"""
-        return await run_mkctf_prog(
+        """Build the challenge
+
+        Last successful build result is returned instead of running build
+        program when build inputs did not change since, unless force is True.
+        Challenge is built and its build is not recorded when its inputs
+        cannot be fingerprinted.
+        """
+        # fingerprint inputs before building: a file modified while the
+        # build runs must not be recorded as built
+        try:
+            fingerprint = await to_thread(self.build_fingerprint, dev)
+        except OSError as exc:
+            LOGGER.warning(
+                "cannot fingerprint %s build inputs (%s), build cache is not"
+                " used",
+                self.slug,
+                exc,
+            )
+            fingerprint = None
+        record = self.last_build()
+        if (
+            not force
+            and fingerprint is not None
+            and record is not None
+            and record.fingerprint == fingerprint
+        ):
+            LOGGER.info("%s is up-to-date, build skipped", self.slug)
+            cpr = record.result
+            cpr.cached = True
+            return cpr
+        cpr = await self._run_prog(
             self.repository_config.standard.build.name,
-            self.directory,
             dev,
             timeout,
+            on_line,
+            log,
         )
+        if (
+            cpr.returnstate == CalledProcessState.SUCCESS
+            and fingerprint is not None
+            and not self.repository_api.read_only
+        ):
+            self.repository_api.build_cache.dump(
+                self.slug, BuildRecord(fingerprint=fingerprint, result=cpr)
+            )
+        return cpr
 
     async def deploy(
-        self, dev: bool = False, timeout: int = 4
+        self,
+        dev: bool = False,
+        timeout: int = 4,
+        on_line: LineCallback | None = None,
+        log: bool = False,
     ) -> CalledProcessResult:
         """Deploy the challenge"""
-        return await run_mkctf_prog(
+        return await self._run_prog(
             self.repository_config.standard.deploy.name,
-            self.directory,
             dev,
             timeout,
+            on_line,
+            log,
         )
 
     async def healthcheck(
-        self, dev: bool = False, timeout: int = 4
+        self,
+        dev: bool = False,
+        timeout: int = 4,
+        on_line: LineCallback | None = None,
+        log: bool = False,
     ) -> CalledProcessResult:
         """Check the health of a deployed challenge"""
-        return await run_mkctf_prog(
+        return await self._run_prog(
             self.repository_config.standard.healthcheck.name,
-            self.directory,
             dev,
             timeout,
+            on_line,
+            log,
         )
 
 
 def create_challenge_api(
-    repository_api: 'RepositoryAPI', directory: Path
+    repository_api: 'RepositoryAPI',
+    directory: Path,
+    config: ChallengeConfig | None = None,
 ) -> ChallengeAPI:
-    """Create ChallengeAPI instance"""
-    config = ChallengeConfig.load(directory / '.mkctf.yml')
+    """Create ChallengeAPI instance
+
+    Challenge configuration is loaded through repository index on first
+    access unless config is given.
+    """
     return ChallengeAPI(
-        config=config,
         directory=directory,
         repository_api=repository_api,
+        config_=config,
     )
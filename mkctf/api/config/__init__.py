@@ -1,6 +1,7 @@
 """Configuration module
 """
 
+from ._base import CONFIG_CODEC, ConfigBatch, config_enable_sidecar
 from .challenge import ChallengeConfig
 from .general import GeneralConfig
 from .repository import FileConfig, RepositoryConfig
@@ -1,11 +1,236 @@
 """Base configuration generic class
 """
 
+from io import StringIO
+from marshal import dumps as marshal_dumps
+from marshal import loads as marshal_loads
+from os import O_RDONLY
+from os import close as os_close
+from os import fsync, getpid
+from os import open as os_open
 from pathlib import Path
-
-from ruamel.yaml import YAML
+from threading import local
 
 from ...helper.exception import MKCTFAPIException
+from ...helper.logging import LOGGER
+
+CONFIG_HEADER = (
+    "#\n"
+    "# This file was generated using mkCTF utility.\n"
+    "# Do not edit it manually unless you know exactly what you're doing.\n"
+    "# Keep #PEBCAK in mind.\n"
+    "#\n"
+)
+SIDECAR_SUFFIX = '.bin'
+SIDECAR_VERSION = 1
+
+
+class ConfigCodec:
+    """Configuration codec
+
+    Reuses one YAML instance per thread, relying on C-accelerated parser and
+    emitter when ruamel.yaml.clib is available. When sidecar is enabled, a
+    marshal-encoded copy of the parsed YAML is kept next to the configuration
+    file and used as long as configuration file size and mtime_ns match.
+    YAML file remains the source of truth.
+    """
+
+    def __init__(self, sidecar: bool = False):
+        self.sidecar = sidecar
+        self._local = local()
+
+    @property
+    def yaml(self) -> 'YAML':
+        """YAML instance of current thread"""
+        yaml = getattr(self._local, 'yaml', None)
+        if yaml is None:
+            # ruamel.yaml is imported on first use only, configurations are
+            # often served by the challenge index or sidecar files
+            from ruamel.yaml import YAML
+
+            try:
+                from ruamel.yaml.main import CParser
+            except ImportError:
+                CParser = None
+            yaml = YAML(typ='safe', pure=False)
+            yaml.default_flow_style = False
+            LOGGER.debug(
+                "YAML codec uses %s parser",
+                'pure python' if CParser is None else 'C-accelerated',
+            )
+            self._local.yaml = yaml
+        return yaml
+
+    @staticmethod
+    def sidecar_path(filepath: Path) -> Path:
+        """Sidecar file path of given configuration file"""
+        return filepath.with_name(f'{filepath.name}{SIDECAR_SUFFIX}')
+
+    def _load_sidecar(self, filepath: Path):
+        sidecar_path = self.sidecar_path(filepath)
+        try:
+            stat = filepath.stat()
+            version, size, mtime_ns, dct = marshal_loads(
+                sidecar_path.read_bytes()
+            )
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if (version, size, mtime_ns) != (
+            SIDECAR_VERSION,
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            return None
+        return dct
+
+    def _dump_sidecar(self, filepath: Path, stat, dct):
+        sidecar_path = self.sidecar_path(filepath)
+        tmp_path = sidecar_path.with_name(f'.{sidecar_path.name}.tmp')
+        try:
+            data = marshal_dumps(
+                (SIDECAR_VERSION, stat.st_size, stat.st_mtime_ns, dct)
+            )
+            tmp_path.write_bytes(data)
+            tmp_path.replace(sidecar_path)
+        except (OSError, ValueError) as exc:
+            LOGGER.debug("cannot write sidecar for %s (%s)", filepath, exc)
+
+    def load(self, filepath: Path):
+        """Load YAML configuration file, using its sidecar if up to date"""
+        if self.sidecar:
+            dct = self._load_sidecar(filepath)
+            if dct is not None:
+                return dct
+        stat = filepath.stat()
+        dct = self.yaml.load(filepath.read_bytes())
+        if self.sidecar:
+            self._dump_sidecar(filepath, stat, dct)
+        return dct
+
+    def dumps(self, dct) -> str:
+        """Serialize dct to a YAML string"""
+        stream = StringIO()
+        stream.write(CONFIG_HEADER)
+        self.yaml.dump(dct, stream)
+        return stream.getvalue()
+
+    def dump(self, dct, filepath: Path, batch: 'ConfigBatch | None' = None):
+        """Serialize dct to a YAML configuration file
+
+        File is written when batch is committed if batch is given, otherwise
+        it is written immediately.
+        """
+        if batch is not None:
+            batch.stage(filepath, self.dumps(dct))
+            return
+        with ConfigBatch() as single:
+            single.stage(filepath, self.dumps(dct))
+
+
+CONFIG_CODEC = ConfigCodec()
+
+
+def _write_durable(filepath: Path, data: bytes):
+    """Write data to filepath and flush it to disk"""
+    with filepath.open('wb') as fstream:
+        fstream.write(data)
+        fstream.flush()
+        fsync(fstream.fileno())
+
+
+def _fsync_directory(directory: Path):
+    """Flush directory entries to disk, renames within it become durable"""
+    try:
+        fd = os_open(directory, O_RDONLY)
+    except OSError:
+        # directories cannot be opened on some platforms
+        return
+    try:
+        fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os_close(fd)
+
+
+class ConfigBatch:
+    """Batch of configuration file writes
+
+    Staged writes are discarded on rollback. On commit, files whose content
+    would not change are skipped, others are written to temporary files
+    which are flushed to disk then renamed over the original files, each
+    directory holding renamed files is flushed once.
+    Use it as a context manager to commit on success and roll back on error.
+    """
+
+    def __init__(self):
+        self._pending: dict[Path, str] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def stage(self, filepath: Path, content: str):
+        """Stage a write, replacing any write staged for the same file"""
+        self._pending[filepath] = content
+
+    def rollback(self):
+        """Discard staged writes"""
+        if self._pending:
+            LOGGER.warning(
+                "%d configuration writes rolled back", len(self._pending)
+            )
+        self._pending.clear()
+
+    def commit(self) -> int:
+        """Write staged files and return the count of files written"""
+        pending, self._pending = self._pending, {}
+        changed = {}
+        for filepath, content in pending.items():
+            data = content.encode()
+            try:
+                if filepath.read_bytes() == data:
+                    LOGGER.debug("%s unchanged, write skipped", filepath)
+                    continue
+            except FileNotFoundError:
+                pass
+            changed[filepath] = data
+        if not changed:
+            return 0
+        tmp_paths = {}
+        try:
+            for filepath, data in changed.items():
+                tmp_path = filepath.with_name(
+                    f'.{filepath.name}.{getpid()}.tmp'
+                )
+                tmp_paths[filepath] = tmp_path
+                _write_durable(tmp_path, data)
+                if filepath.is_file():
+                    tmp_path.chmod(filepath.stat().st_mode)
+        except:
+            for tmp_path in tmp_paths.values():
+                tmp_path.unlink(missing_ok=True)
+            raise
+        for filepath, tmp_path in tmp_paths.items():
+            tmp_path.replace(filepath)
+            CONFIG_CODEC.sidecar_path(filepath).unlink(missing_ok=True)
+        for directory in {filepath.parent for filepath in tmp_paths}:
+            _fsync_directory(directory)
+        LOGGER.debug("%d configuration files written", len(tmp_paths))
+        return len(tmp_paths)
+
+
+def config_enable_sidecar(enable=True):
+    """enable binary sidecar for configuration files"""
+    CONFIG_CODEC.sidecar = enable
 
 
 class ConfigBase:
@@ -17,25 +242,18 @@ class ConfigBase:
         if not filepath.is_file():
             return cls()
         try:
-            conf = YAML(typ='safe').load(filepath)
+            conf = CONFIG_CODEC.load(filepath)
             conf = cls.from_dict(conf)
         except Exception as exc:
             raise MKCTFAPIException("failed to load configuration") from exc
         return conf
 
-    def dump(self, filepath: Path):
-        """Serialize self to a file using YAML format"""
-        yaml = YAML(typ='safe')
-        yaml.default_flow_style = False
-        with filepath.open('w') as fstream:
-            fstream.write(
-                "#\n"
-                "# This file was generated using mkCTF utility.\n"
-                "# Do not edit it manually unless you know exactly what you're doing.\n"
-                "# Keep #PEBCAK in mind.\n"
-                "#\n"
-            )
-            yaml.dump(self.to_dict(), fstream)
+    def dump(self, filepath: Path, batch: ConfigBatch | None = None):
+        """Serialize self to a file using YAML format
+
+        Write is staged in batch if given.
+        """
+        CONFIG_CODEC.dump(self.to_dict(), filepath, batch)
 
     @classmethod
     def from_dict(cls, dct):
@@ -9,6 +9,58 @@ from ...helper.exception import MKCTFAPIException
 from ._base import ConfigBase
 
 
+class _LazyURL:
+    """URL field descriptor
+
+    Stores assigned value as is and converts it to an URL instance on first
+    access only.
+    """
+
+    def __set_name__(self, owner, name):
+        self._attr = f'_{name}'
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            # dataclass default value
+            return ''
+        value = obj.__dict__[self._attr]
+        if not isinstance(value, URL):
+            value = URL(value)
+            obj.__dict__[self._attr] = value
+        return value
+
+    def __set__(self, obj, value):
+        obj.__dict__[self._attr] = value
+
+
+@dataclass
+class _LimitsConfig:
+    cpu_time: int | None = None
+    address_space: int | None = None
+    open_files: int | None = None
+    processes: int | None = None
+
+    @classmethod
+    def from_dict(cls, dct):
+        """Build instance from dict"""
+        return cls(
+            cpu_time=dct.get('cpu_time'),
+            address_space=dct.get('address_space'),
+            open_files=dct.get('open_files'),
+            processes=dct.get('processes'),
+        )
+
+    def to_dict(self):
+        """Build dict from instance, unset limits are omitted"""
+        dct = {
+            'cpu_time': self.cpu_time,
+            'address_space': self.address_space,
+            'open_files': self.open_files,
+            'processes': self.processes,
+        }
+        return {key: value for key, value in dct.items() if value is not None}
+
+
 @dataclass
 class ChallengeConfig(ConfigBase):
     """Challenge concept"""
@@ -21,13 +73,16 @@ class ChallengeConfig(ConfigBase):
     points: int = -3
     enabled: bool = False
     category: str = ''
-    logo_url: URL = field(default_factory=URL)
+    logo_url: URL = _LazyURL()
     difficulty: str = ''
-    static_url: URL = field(default_factory=URL)
+    static_url: URL = _LazyURL()
+    depends: list[str] = field(default_factory=list)
+    limits: _LimitsConfig | None = None
 
     @classmethod
     def from_dict(cls, dct):
         try:
+            limits = dct.get('limits')
             return cls(
                 name=dct['name'],
                 slug=dct['slug'],
@@ -37,9 +92,11 @@ class ChallengeConfig(ConfigBase):
                 points=dct['points'],
                 enabled=dct['enabled'],
                 category=dct['category'],
-                logo_url=URL(dct['logo_url']),
+                logo_url=dct['logo_url'],
                 difficulty=dct['difficulty'],
-                static_url=URL(dct['static_url']),
+                static_url=dct['static_url'],
+                depends=dct.get('depends', []),
+                limits=_LimitsConfig.from_dict(limits) if limits else None,
             )
         except Exception as exc:
             raise MKCTFAPIException(
@@ -47,7 +104,7 @@ class ChallengeConfig(ConfigBase):
             ) from exc
 
     def to_dict(self):
-        return {
+        dct = {
             'name': self.name,
             'slug': self.slug,
             'tags': self.tags,
@@ -56,7 +113,14 @@ class ChallengeConfig(ConfigBase):
             'points': self.points,
             'enabled': self.enabled,
             'category': self.category,
-            'logo_url': str(self.logo_url),
+            'logo_url': str(self.__dict__['_logo_url']),
             'difficulty': self.difficulty,
-            'static_url': str(self.static_url),
+            'static_url': str(self.__dict__['_static_url']),
         }
+        # optional fields are omitted when unset, existing configurations
+        # keep their bytes
+        if self.depends:
+            dct['depends'] = self.depends
+        if self.limits:
+            dct['limits'] = self.limits.to_dict()
+        return dct
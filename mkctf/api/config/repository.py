@@ -6,6 +6,11 @@ from dataclasses import dataclass, field
 from yarl import URL
 
 from ...helper.checksum import sha1_hexdigest
+from ...helper.compression import (
+    CompressionBackend,
+    compression_backend,
+    compression_extension,
+)
 from ...helper.random import randbytes, randhex
 from ._base import ConfigBase
 from .general import GeneralConfig
@@ -53,6 +58,39 @@ class _StaticConfig:
         }
 
 
+@dataclass
+class _ExportConfig:
+    compression: str = 'gz'
+    level: int | None = None
+    threads: int = 1
+
+    @classmethod
+    def from_dict(cls, dct):
+        """Build instance from dict"""
+        return cls(
+            compression=dct.get('compression', 'gz'),
+            level=dct.get('level'),
+            threads=dct.get('threads', 1),
+        )
+
+    def to_dict(self):
+        """Build dict from instance"""
+        return {
+            'compression': self.compression,
+            'level': self.level,
+            'threads': self.threads,
+        }
+
+    @property
+    def extension(self) -> str:
+        """Archive file extension"""
+        return compression_extension(self.compression)
+
+    def backend(self) -> CompressionBackend:
+        """Create compression backend"""
+        return compression_backend(self.compression, self.level, self.threads)
+
+
 @dataclass
 class FileConfig:
     name: str = ''
@@ -117,21 +155,27 @@ class _StandardConfig:
 class _CategoryConfig:
     dirs: _DirsConfig = field(default_factory=_DirsConfig)
     files: list[FileConfig] = field(default_factory=list)
+    export: _ExportConfig | None = None
 
     @classmethod
     def from_dict(cls, dct):
         """Build instance from dict"""
+        export = dct.get('export')
         return cls(
             dirs=_DirsConfig.from_dict(dct['dirs']),
             files=[FileConfig.from_dict(item) for item in dct['files']],
+            export=_ExportConfig.from_dict(export) if export else None,
         )
 
     def to_dict(self):
         """Build dict from instance"""
-        return {
+        dct = {
             'dirs': self.dirs.to_dict(),
             'files': [item.to_dict() for item in self.files],
         }
+        if self.export:
+            dct['export'] = self.export.to_dict()
+        return dct
 
 
 def _standard_factory():
@@ -193,6 +237,7 @@ class RepositoryConfig(ConfigBase):
     static: _StaticConfig = field(default_factory=_StaticConfig)
     general: GeneralConfig = field(default_factory=GeneralConfig)
     standard: _StandardConfig = field(default_factory=_standard_factory)
+    export: _ExportConfig = field(default_factory=_ExportConfig)
     categories_: dict[str, _CategoryConfig] = field(
         default_factory=_categories_factory
     )
@@ -205,6 +250,7 @@ class RepositoryConfig(ConfigBase):
             static=_StaticConfig.from_dict(dct['static']),
             general=GeneralConfig.from_dict(dct['general']),
             standard=_StandardConfig.from_dict(dct['standard']),
+            export=_ExportConfig.from_dict(dct.get('export', {})),
             categories_={
                 category: _CategoryConfig.from_dict(category_config)
                 for category, category_config in dct['categories'].items()
@@ -218,6 +264,7 @@ class RepositoryConfig(ConfigBase):
             'static': self.static.to_dict(),
             'general': self.general.to_dict(),
             'standard': self.standard.to_dict(),
+            'export': self.export.to_dict(),
             'categories': {
                 category: category_config.to_dict()
                 for category, category_config in self.categories_.items()
@@ -256,6 +303,16 @@ class RepositoryConfig(ConfigBase):
         files_.extend(self.categories_[category].files)
         return files_
 
+    def export_config(self, category: str | None = None) -> _ExportConfig:
+        """Export configuration of given category
+
+        Category export configuration overrides repository one
+        """
+        category_config = self.categories_.get(category)
+        if category_config and category_config.export:
+            return category_config.export
+        return self.export
+
     def make_rand_flag(self, size: int = 16) -> str:
         """Generate a random flag"""
         return ''.join(
@@ -266,8 +323,12 @@ class RepositoryConfig(ConfigBase):
             ]
         )
 
-    def make_static_url(self, slug: str) -> str:
-        """Generate a static url"""
+    def make_static_url(self, slug: str, category: str | None = None) -> str:
+        """Generate a static url
+
+        URL extension follows category export compression format
+        """
         salted_slug = slug.encode() + self.static.salt
-        path = f'/{sha1_hexdigest(salted_slug)}.tar.gz'
+        extension = self.export_config(category).extension
+        path = f'/{sha1_hexdigest(salted_slug)}{extension}'
         return str(self.static.base_url.with_path(path))
@@ -0,0 +1,533 @@
+"""Challenge export
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from json import dumps, loads
+from os import getenv, getpid, stat_result
+from pathlib import Path
+from time import time_ns
+
+from ..helper.archive import (
+    ArchiveReader,
+    ArchiveWriter,
+    SegmentedArchiveWriter,
+    ZipArchiveWriter,
+)
+from ..helper.blobstore import BlobStore
+from ..helper.checksum import ChecksumFile, sha256_file_hexdigest
+from ..helper.logging import LOGGER
+from .cache import HashCache, stat_key
+from .config import ChallengeConfig, RepositoryConfig
+from .index import RACY_DELAY_NS
+
+EXPORT_MANIFEST = '.mkctf-export.json'
+EXPORT_MANIFEST_VERSION = 2
+EXPORT_MAP = 'export.map'
+INNER_CHECKSUM = 'checksum.sha256'
+
+
+def _source_date_epoch() -> int:
+    """Timestamp of reproducible archive members
+
+    SOURCE_DATE_EPOCH environment variable is honored, see
+    https://reproducible-builds.org/specs/source-date-epoch/
+    """
+    try:
+        return int(getenv('SOURCE_DATE_EPOCH', '0'))
+    except ValueError:
+        LOGGER.warning("ignoring invalid SOURCE_DATE_EPOCH")
+        return 0
+
+
+@dataclass
+class ExportOptions:
+    """Export options
+
+    Reproducible archives have sorted members, normalized metadata and a
+    fixed gzip timestamp: identical inputs yield identical bytes. When
+    blob_directory is set, archives are assembled from compressed file data
+    stored once in a blob store.
+    """
+
+    export_disabled: bool = False
+    reproducible: bool = False
+    blob_directory: Path | None = None
+
+    @property
+    def mtime(self) -> int | None:
+        """Timestamp of archive members, None keeps actual timestamps"""
+        return _source_date_epoch() if self.reproducible else None
+
+
+@dataclass
+class ExportFingerprint:
+    """Inputs and output of a challenge export
+
+    files holds [path, size, mtime_ns, sha256] lists, path is relative to
+    challenge directory, size and mtime_ns are only used to avoid hashing
+    unchanged files again.
+    """
+
+    archive: str
+    archive_size: int
+    archive_mtime_ns: int
+    config: dict
+    compression: dict
+    files: list[list]
+    time_ns: int
+
+    @classmethod
+    def from_dict(cls, dct):
+        """Build instance from dict"""
+        return cls(
+            archive=dct['archive'],
+            archive_size=dct['archive_size'],
+            archive_mtime_ns=dct['archive_mtime_ns'],
+            config=dct['config'],
+            compression=dct['compression'],
+            files=dct['files'],
+            time_ns=dct['time_ns'],
+        )
+
+    def to_dict(self):
+        """Build dict from instance"""
+        return {
+            'archive': self.archive,
+            'archive_size': self.archive_size,
+            'archive_mtime_ns': self.archive_mtime_ns,
+            'config': self.config,
+            'compression': self.compression,
+            'files': self.files,
+            'time_ns': self.time_ns,
+        }
+
+    @property
+    def contents(self) -> list[tuple[str, int, str]]:
+        """Sorted (path, size, sha256) of exported files"""
+        return sorted(
+            (name, size, digest) for name, size, _, digest in self.files
+        )
+
+    @property
+    def files_size(self) -> int:
+        """Total size of exported files"""
+        return sum(size for _, size, _, _ in self.files)
+
+    def match(self, other: 'ExportFingerprint') -> bool:
+        """Determine if other export would produce the same archive"""
+        return (
+            self.archive == other.archive
+            and self.config == other.config
+            and self.compression == other.compression
+            and self.contents == other.contents
+        )
+
+
+@dataclass
+class ExportResult:
+    """Challenge export result"""
+
+    archive_path: Path
+    fingerprint: ExportFingerprint
+    reused: bool = False
+    elapsed_ns: int = 0
+    hashes: list[tuple[stat_result, str]] = field(default_factory=list)
+
+    @property
+    def ratio(self) -> float:
+        """Archive size to exported files size ratio"""
+        return self.fingerprint.archive_size / (
+            self.fingerprint.files_size or 1
+        )
+
+    @property
+    def throughput(self) -> float:
+        """Exported files bytes compressed per second"""
+        return self.fingerprint.files_size * 1e9 / (self.elapsed_ns or 1)
+
+
+@dataclass
+class ExportManifest:
+    """Fingerprints of archives in an export directory, keyed by slug"""
+
+    filepath: Path
+    fingerprints: dict[str, ExportFingerprint] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, export_directory: Path) -> 'ExportManifest':
+        """Load manifest, an invalid manifest is considered empty"""
+        manifest = cls(filepath=export_directory / EXPORT_MANIFEST)
+        if not manifest.filepath.is_file():
+            return manifest
+        try:
+            dct = loads(manifest.filepath.read_text())
+            if dct['version'] != EXPORT_MANIFEST_VERSION:
+                raise ValueError("manifest version mismatch")
+            manifest.fingerprints = {
+                slug: ExportFingerprint.from_dict(fingerprint)
+                for slug, fingerprint in dct['fingerprints'].items()
+            }
+        except Exception as exc:
+            LOGGER.warning(
+                "discarding invalid export manifest %s (%s)",
+                manifest.filepath,
+                exc,
+            )
+        return manifest
+
+    def dump(self):
+        """Write manifest"""
+        dct = {
+            'version': EXPORT_MANIFEST_VERSION,
+            'fingerprints': {
+                slug: fingerprint.to_dict()
+                for slug, fingerprint in self.fingerprints.items()
+            },
+        }
+        tmp_filepath = self.filepath.with_name(f'.{self.filepath.name}.tmp')
+        tmp_filepath.write_text(dumps(dct, separators=(',', ':')))
+        tmp_filepath.replace(self.filepath)
+
+
+def _public_files(
+    directory: Path,
+    config: ChallengeConfig,
+    repository_config: RepositoryConfig,
+) -> list[Path]:
+    """Challenge files to be exported, directories are ignored"""
+    entries = []
+    for public_dir in repository_config.directories(
+        config.category, public_only=True
+    ):
+        dir_path = directory / public_dir
+        for entry in dir_path.glob('*'):
+            if entry.is_dir():
+                LOGGER.warning(
+                    "export ignored %s within %s (directory)",
+                    entry,
+                    config.slug,
+                )
+                continue
+            entries.append(entry)
+    # archive members are named after files, keep a stable order among
+    # files sharing a name
+    entries.sort(key=lambda entry: (entry.name, entry))
+    return entries
+
+
+def cached_digests(
+    directory: Path,
+    config: ChallengeConfig,
+    repository_config: RepositoryConfig,
+    hash_cache: HashCache,
+) -> dict[str, str]:
+    """Hash cache entries of challenge public files, see HashCache.digests"""
+    stats = []
+    for entry in _public_files(directory, config, repository_config):
+        try:
+            stats.append(entry.stat())
+        except FileNotFoundError:
+            continue
+    return hash_cache.digests(stats)
+
+
+def _hash_func(cached: dict[str, str]) -> Callable[[Path], str]:
+    """Hash function looking up cached digests first"""
+
+    def hexdigest(filepath: Path) -> str:
+        cached_hexdigest = cached.get(stat_key(filepath.stat()))
+        return cached_hexdigest or sha256_file_hexdigest(filepath)
+
+    return hexdigest
+
+
+def _file_digests(
+    directory: Path,
+    stats: list[tuple[Path, stat_result]],
+    previous: ExportFingerprint | None,
+    cached: dict[str, str],
+) -> list[list]:
+    """Build fingerprint files of stat entries, reusing known hashes
+
+    Files are keyed by their path relative to directory: several public
+    directories may hold files sharing a name. Hashes are taken from
+    previous fingerprint or from cached digests, hash is None for other
+    files: they are hashed while they are archived. A previous hash is not
+    trusted if file was modified shortly before previous fingerprint was
+    computed: coarse mtime filesystems could hide a later modification.
+    """
+    known = {}
+    threshold = 0
+    if previous is not None:
+        known = {
+            path: (size, mtime_ns, digest)
+            for path, size, mtime_ns, digest in previous.files
+        }
+        threshold = previous.time_ns - RACY_DELAY_NS
+    files = []
+    for entry, stat in stats:
+        path = entry.relative_to(directory).as_posix()
+        size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        digest = cached.get(stat_key(stat))
+        hit = known.get(path)
+        if hit and hit[:2] == (size, mtime_ns) and mtime_ns < threshold:
+            digest = hit[2]
+        files.append([path, size, mtime_ns, digest])
+    return files
+
+
+def _unchanged(entry: Path, stat: stat_result) -> bool:
+    """Determine if entry did not change since stat was taken"""
+    current = entry.stat()
+    return (current.st_ino, current.st_size, current.st_mtime_ns) == (
+        stat.st_ino,
+        stat.st_size,
+        stat.st_mtime_ns,
+    )
+
+
+def _archive_match(
+    archive_path: Path, checksum_path: Path, fingerprint: ExportFingerprint
+) -> bool:
+    """Determine if archive and its checksum file are still there untouched"""
+    try:
+        stat = archive_path.stat()
+    except FileNotFoundError:
+        return False
+    return (
+        checksum_path.is_file()
+        and stat.st_size == fingerprint.archive_size
+        and stat.st_mtime_ns == fingerprint.archive_mtime_ns
+    )
+
+
+def export_challenge(
+    directory: Path,
+    config: ChallengeConfig,
+    repository_config: RepositoryConfig,
+    export_directory: Path,
+    options: ExportOptions,
+    previous: ExportFingerprint | None = None,
+    cached: dict[str, str] | None = None,
+) -> ExportResult | None:
+    """Export challenge public files to export_directory
+
+    Creates a compressed tar archive and its checksum file, unless previous
+    fingerprint shows that existing ones are up to date. cached holds hash
+    cache entries of public files, see cached_digests. This function only
+    takes picklable arguments so that it can run in a worker process.
+    """
+    cached = cached or {}
+    if not options.export_disabled and not config.enabled:
+        LOGGER.warning("export ignored %s (disabled)", config.slug)
+        return None
+    archive_name = config.static_url.parts[-1]
+    if not archive_name:
+        LOGGER.error(
+            "export ignored %s (invalid/empty static_url)",
+            config.slug,
+        )
+        LOGGER.error(
+            "running `mkctf-cli update-meta` should be enough to fix this issue."
+        )
+        return None
+    export_config = repository_config.export_config(config.category)
+    if not archive_name.endswith(export_config.extension):
+        LOGGER.error(
+            "export ignored %s (static_url does not match %s compression)",
+            config.slug,
+            export_config.compression,
+        )
+        LOGGER.error(
+            "running `mkctf-cli update-meta` should be enough to fix this issue."
+        )
+        return None
+    backend = export_config.backend()
+    archive_path = export_directory / archive_name
+    checksum_path = export_directory / f'{archive_name}.sha256'
+    started_ns = time_ns()
+    entries = _public_files(directory, config, repository_config)
+    for before, entry in zip(entries, entries[1:]):
+        if before.name == entry.name:
+            LOGGER.warning(
+                "export of %s has several %s members (%s and %s)",
+                config.slug,
+                entry.name,
+                before.relative_to(directory),
+                entry.relative_to(directory),
+            )
+    stats = [(entry, entry.stat()) for entry in entries]
+    fingerprint = ExportFingerprint(
+        archive=archive_name,
+        archive_size=0,
+        archive_mtime_ns=0,
+        config={
+            'slug': config.slug,
+            'category': config.category,
+            'directories': repository_config.directories(
+                config.category, public_only=True
+            ),
+        },
+        compression={
+            **backend.settings(),
+            'mtime': options.mtime,
+            'segmented': options.blob_directory is not None,
+        },
+        files=_file_digests(directory, stats, previous, cached),
+        time_ns=started_ns,
+    )
+    if (
+        previous is not None
+        and all(digest for _, _, _, digest in fingerprint.files)
+        and previous.match(fingerprint)
+        and _archive_match(archive_path, checksum_path, previous)
+    ):
+        LOGGER.info("export reused %s (unchanged)", config.slug)
+        fingerprint.archive_size = previous.archive_size
+        fingerprint.archive_mtime_ns = previous.archive_mtime_ns
+        return ExportResult(archive_path, fingerprint, reused=True)
+    checksum_file = ChecksumFile(hash_func=_hash_func(cached))
+    hashes = []
+    tmp_archive_path = export_directory / f'.{archive_name}.{getpid()}.tmp'
+    try:
+        if backend.container == 'zip':
+            if options.blob_directory is not None:
+                LOGGER.warning(
+                    "blob store ignored for %s (zip archive)", config.slug
+                )
+            writer = ZipArchiveWriter(
+                tmp_archive_path,
+                archive_name,
+                backend=backend,
+                mtime=options.mtime,
+            )
+        elif options.blob_directory is None:
+            writer = ArchiveWriter(
+                tmp_archive_path,
+                archive_name,
+                backend=backend,
+                mtime=options.mtime,
+            )
+        else:
+            writer = SegmentedArchiveWriter(
+                tmp_archive_path,
+                archive_name,
+                BlobStore(options.blob_directory),
+                backend=backend,
+                mtime=options.mtime,
+            )
+        with writer:
+            for (entry, stat), file in zip(stats, fingerprint.files):
+                if isinstance(writer, SegmentedArchiveWriter):
+                    # known digests let existing blobs be used as is
+                    file[3] = writer.add(entry, entry.name, file[3])
+                else:
+                    file[3] = writer.add(entry, entry.name)
+                checksum_file.add(entry, file[3])
+                if _unchanged(entry, stat):
+                    hashes.append((stat, file[3]))
+            writer.add_bytes(INNER_CHECKSUM, checksum_file.content.encode())
+        tmp_archive_path.replace(archive_path)
+    except:
+        tmp_archive_path.unlink(missing_ok=True)
+        raise
+    arch_checksum_file = ChecksumFile(hash_func=_hash_func(cached))
+    arch_checksum_file.add(archive_path, writer.hexdigest)
+    checksum_path.write_text(arch_checksum_file.content)
+    stat = archive_path.stat()
+    fingerprint.archive_size = stat.st_size
+    fingerprint.archive_mtime_ns = stat.st_mtime_ns
+    return ExportResult(
+        archive_path,
+        fingerprint,
+        elapsed_ns=time_ns() - started_ns,
+        hashes=hashes,
+    )
+
+
+@dataclass
+class ExportVerification:
+    """Exported archive verification result"""
+
+    slug: str
+    archive: str
+    size: int = 0
+    members: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        """Determine if archive passed verification"""
+        return not self.errors
+
+    def to_dict(self):
+        """Build dict from instance"""
+        return {
+            'slug': self.slug,
+            'archive': self.archive,
+            'ok': self.ok,
+            'size': self.size,
+            'members': self.members,
+            'errors': self.errors,
+        }
+
+
+def verify_archive(
+    export_directory: Path, slug: str, archive_name: str
+) -> ExportVerification:
+    """Verify an exported archive against its checksum files
+
+    Archive checksum is compared to <archive>.sha256 and each member
+    checksum to the checksum.sha256 member, streaming the archive once.
+    """
+    verification = ExportVerification(slug=slug, archive=archive_name)
+    errors = verification.errors
+    archive_path = export_directory / archive_name
+    checksum_path = export_directory / f'{archive_name}.sha256'
+    expected = None
+    try:
+        checksum_file = ChecksumFile()
+        checksum_file.load(checksum_path)
+        expected = {
+            filename: hexdigest for hexdigest, filename in checksum_file.hashes
+        }.get(archive_name)
+        if expected is None:
+            errors.append(f"{archive_name} not listed in {checksum_path.name}")
+    except (OSError, ValueError) as exc:
+        errors.append(f"failed to load {checksum_path.name} ({exc})")
+    digests = {}
+    inner = None
+    try:
+        verification.size = archive_path.stat().st_size
+    except FileNotFoundError:
+        errors.append("archive is missing")
+        return verification
+    try:
+        with ArchiveReader(archive_path) as reader:
+            for name, hexdigest, data in reader.members(keep={INNER_CHECKSUM}):
+                verification.members += 1
+                if name == INNER_CHECKSUM:
+                    inner = ChecksumFile()
+                    inner.loads(data.decode())
+                elif hexdigest is None:
+                    errors.append(f"unexpected member {name}")
+                else:
+                    digests[name] = hexdigest
+    except Exception as exc:
+        errors.append(f"failed to read archive ({exc})")
+        return verification
+    if expected and reader.hexdigest != expected:
+        errors.append("archive checksum mismatch")
+    if inner is None:
+        errors.append(f"{INNER_CHECKSUM} member is missing")
+        return verification
+    for hexdigest, filename in inner.hashes:
+        actual = digests.pop(filename, None)
+        if actual is None:
+            errors.append(f"{filename} is missing")
+        elif actual != hexdigest:
+            errors.append(f"{filename} checksum mismatch")
+    for filename in digests:
+        errors.append(f"{filename} not listed in {INNER_CHECKSUM}")
+    return verification
@@ -0,0 +1,337 @@
+"""Challenge index
+"""
+
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from json import dumps, loads
+from os import stat_result
+from pathlib import Path
+from threading import Lock
+from time import time_ns
+
+from ..helper.exception import MKCTFAPIException
+from ..helper.logging import LOGGER
+from .config import ChallengeConfig
+
+INDEX_VERSION = 4
+# entries modified less than RACY_DELAY_NS before the index is written are
+# not persisted: coarse mtime filesystems could hide a later modification
+RACY_DELAY_NS = 2 * 1000 * 1000 * 1000  # 2 seconds
+
+
+@dataclass
+class IndexEntry:
+    """Challenge index entry"""
+
+    size: int
+    mtime_ns: int
+    config: dict
+
+    @classmethod
+    def from_dict(cls, dct):
+        """Build instance from dict"""
+        return cls(
+            size=dct['size'],
+            mtime_ns=dct['mtime_ns'],
+            config=dct['config'],
+        )
+
+    def to_dict(self):
+        """Build dict from instance"""
+        return {
+            'size': self.size,
+            'mtime_ns': self.mtime_ns,
+            'config': self.config,
+        }
+
+    def match(self, stat: stat_result) -> bool:
+        """Determine if entry matches given configuration file stat"""
+        return self.size == stat.st_size and self.mtime_ns == stat.st_mtime_ns
+
+
+@dataclass
+class InvertedIndex:
+    """Map slug, tag, category and enabled flag to index keys"""
+
+    slugs: dict[str, set[str]] = field(default_factory=dict)
+    tags: dict[str, set[str]] = field(default_factory=dict)
+    categories: dict[str, set[str]] = field(default_factory=dict)
+    enabled: set[str] = field(default_factory=set)
+
+    @staticmethod
+    def _tags(config: dict) -> list[str]:
+        tags = config.get('tags')
+        return tags if isinstance(tags, list) else []
+
+    def add(self, key: str, config: dict):
+        """Add index key using given configuration"""
+        self.slugs.setdefault(config.get('slug'), set()).add(key)
+        for tag in self._tags(config):
+            self.tags.setdefault(tag, set()).add(key)
+        self.categories.setdefault(config.get('category'), set()).add(key)
+        if config.get('enabled'):
+            self.enabled.add(key)
+
+    def remove(self, key: str, config: dict):
+        """Remove index key previously added using given configuration"""
+        self.slugs.get(config.get('slug'), set()).discard(key)
+        for tag in self._tags(config):
+            self.tags.get(tag, set()).discard(key)
+        self.categories.get(config.get('category'), set()).discard(key)
+        self.enabled.discard(key)
+
+
+@dataclass
+class ChallengeIndex:
+    """Persistent challenge configuration index
+
+    Entries are keyed by configuration file path relative to the repository
+    directory and invalidated using configuration file size and mtime_ns.
+    """
+
+    filepath: Path
+    directory: Path
+    entries: dict[str, IndexEntry] = field(default_factory=dict)
+    dirty: bool = False
+    _inverted: InvertedIndex | None = field(default=None, repr=False)
+    _lock: Lock = field(default_factory=Lock, repr=False)
+
+    @property
+    def inverted(self) -> InvertedIndex:
+        """Inverted index, built on first access and maintained afterwards"""
+        if self._inverted is None:
+            inverted = InvertedIndex()
+            for key, entry in self.entries.items():
+                inverted.add(key, entry.config)
+            self._inverted = inverted
+        return self._inverted
+
+    def _set_entry(self, key: str, entry: IndexEntry):
+        with self._lock:
+            previous = self.entries.get(key)
+            if previous and self._inverted is not None:
+                self._inverted.remove(key, previous.config)
+            self.entries[key] = entry
+            if self._inverted is not None:
+                self._inverted.add(key, entry.config)
+            self.dirty = True
+
+    def _drop_entry(self, key: str):
+        with self._lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return
+            if self._inverted is not None:
+                self._inverted.remove(key, entry.config)
+            self.dirty = True
+
+    @classmethod
+    def load(cls, filepath: Path, directory: Path) -> 'ChallengeIndex':
+        """Load index from filepath, an invalid index is considered empty"""
+        index = cls(filepath=filepath, directory=directory)
+        if not filepath.is_file():
+            return index
+        try:
+            dct = loads(filepath.read_text())
+            if dct['version'] != INDEX_VERSION:
+                raise ValueError("index version mismatch")
+            index.entries = {
+                key: IndexEntry.from_dict(entry)
+                for key, entry in dct['entries'].items()
+            }
+        except Exception as exc:
+            LOGGER.warning("discarding invalid index %s (%s)", filepath, exc)
+            index.dirty = True
+        return index
+
+    def dump(self, force: bool = False):
+        """Write index to filepath if it changed since last load"""
+        if not self.dirty and not force:
+            return
+        threshold = time_ns() - RACY_DELAY_NS
+        dct = {
+            'version': INDEX_VERSION,
+            'entries': {
+                key: entry.to_dict()
+                for key, entry in self.entries.items()
+                if entry.mtime_ns < threshold
+            },
+        }
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        tmp_filepath = self.filepath.with_name(f'.{self.filepath.name}.tmp')
+        try:
+            tmp_filepath.write_text(dumps(dct, separators=(',', ':')))
+            tmp_filepath.replace(self.filepath)
+        except OSError as exc:
+            LOGGER.warning("failed to write index %s (%s)", self.filepath, exc)
+            return
+        self.dirty = False
+
+    def clear(self):
+        """Drop every entry"""
+        self.entries.clear()
+        self._inverted = None
+        self.dirty = True
+
+    def key(self, config_path: Path) -> str:
+        """Index key of given configuration file"""
+        # fast path avoiding costly pure path computations
+        prefix = f'{self.directory}/'
+        path = str(config_path)
+        if path.startswith(prefix):
+            return path[len(prefix) :]
+        return config_path.relative_to(self.directory).as_posix()
+
+    def prune(self, keys: set[str]):
+        """Drop entries which are not in keys"""
+        for key in set(self.entries) - keys:
+            LOGGER.debug("dropping %s from index", key)
+            self._drop_entry(key)
+
+    def cached(self, key: str) -> ChallengeConfig:
+        """Challenge configuration stored in index without checking it"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return ChallengeConfig()
+        return ChallengeConfig.from_dict(entry.config)
+
+    def _refresh(
+        self, config_path: Path, key: str | None = None
+    ) -> ChallengeConfig | None:
+        """Parse configuration file again if index entry is stale"""
+        key = key or self.key(config_path)
+        try:
+            stat = config_path.stat()
+        except FileNotFoundError:
+            self._drop_entry(key)
+            return ChallengeConfig()
+        entry = self.entries.get(key)
+        if entry and entry.match(stat):
+            return None
+        LOGGER.debug("indexing %s", key)
+        config = ChallengeConfig.load(config_path)
+        self._set_entry(
+            key,
+            IndexEntry(
+                size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+                config=config.to_dict(),
+            ),
+        )
+        return config
+
+    def config(self, config_path: Path) -> ChallengeConfig:
+        """Load challenge configuration, parsing it only if index is stale"""
+        key = self.key(config_path)
+        config = self._refresh(config_path, key)
+        if config is None:
+            config = self.cached(key)
+        return config
+
+    def refresh(self, config_paths: list[Path], workers: int = 0):
+        """Bring index up to date with given configuration files
+
+        Stale configuration files are parsed using a bounded thread pool when
+        workers is greater than one. Entries not related to config_paths are
+        dropped.
+        """
+        if workers < 2 or len(config_paths) < 2:
+            for config_path in config_paths:
+                self._refresh(config_path)
+        else:
+            with ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix='mkctf-scan'
+            ) as executor:
+                for _ in executor.map(self._refresh, config_paths):
+                    pass
+        self.prune({self.key(config_path) for config_path in config_paths})
+
+    def select(
+        self,
+        keys: Iterable[str],
+        tags: set[str] | None = None,
+        categories: set[str] | None = None,
+        slug: str | None = None,
+        enabled: bool | None = None,
+    ) -> list[str]:
+        """Filter keys using inverted index, keys order is preserved
+
+        Challenges must have at least one tag in common with tags and their
+        category must be one of categories. Empty or None filters are
+        ignored.
+        """
+        inverted = self.inverted
+        candidates = None
+        if slug is not None:
+            candidates = set(inverted.slugs.get(slug, set()))
+        if tags:
+            selected = set().union(
+                *(inverted.tags.get(tag, set()) for tag in tags)
+            )
+            candidates = (
+                selected if candidates is None else candidates & selected
+            )
+        if categories:
+            selected = set().union(
+                *(
+                    inverted.categories.get(category, set())
+                    for category in categories
+                )
+            )
+            candidates = (
+                selected if candidates is None else candidates & selected
+            )
+        keys = list(keys)
+        if enabled is not None:
+            keys = [
+                key for key in keys if (key in inverted.enabled) == enabled
+            ]
+        if candidates is None:
+            return keys
+        return [key for key in keys if key in candidates]
+
+    def verify(self, config_paths: list[Path]) -> list[tuple[str, str]]:
+        """Compare index against configuration files
+
+        Return a list of (key, problem) tuples, an empty list means that
+        index is consistent with configuration files. Configuration files
+        modified less than RACY_DELAY_NS before index was written are not
+        expected to be indexed, see dump.
+        """
+        try:
+            written_ns = self.filepath.stat().st_mtime_ns
+        except FileNotFoundError:
+            written_ns = None
+        problems = []
+        keys = set()
+        for config_path in config_paths:
+            key = self.key(config_path)
+            keys.add(key)
+            entry = self.entries.get(key)
+            stat = config_path.stat()
+            if entry is None:
+                racy = (
+                    written_ns is not None
+                    and written_ns - RACY_DELAY_NS
+                    <= stat.st_mtime_ns
+                    <= written_ns
+                )
+                if racy:
+                    LOGGER.debug("%s modified too recently to be indexed", key)
+                else:
+                    problems.append((key, 'unindexed'))
+                continue
+            if not entry.match(stat):
+                problems.append((key, 'stale'))
+                continue
+            try:
+                config = ChallengeConfig.load(config_path)
+            except MKCTFAPIException:
+                problems.append((key, 'invalid'))
+                continue
+            if config.to_dict() != entry.config:
+                problems.append((key, 'mismatch'))
+        for key in sorted(set(self.entries) - keys):
+            problems.append((key, 'orphaned'))
+        return problems
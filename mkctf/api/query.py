@@ -0,0 +1,424 @@
+"""Challenge query engine
+"""
+
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from functools import lru_cache
+from operator import eq, ge, gt, le, lt, ne
+from re import compile as re_compile
+from re import error as re_error
+
+from ..helper.exception import MKCTFAPIException
+
+CATALOG_COLUMNS = (
+    'slug',
+    'name',
+    'author',
+    'points',
+    'enabled',
+    'category',
+    'difficulty',
+    'tags',
+)
+AGGREGATE_FUNCTIONS = ('count', 'sum', 'min', 'max', 'avg')
+_KEYWORDS = {'and', 'or', 'not', 'in', 'has'}
+_LITERALS = {'true': True, 'false': False, 'null': None}
+_TOKEN_PATTERN = re_compile(
+    r'\s*(?:'
+    r'(?P<number>-?\d+)'
+    r'|(?P<string>\'[^\']*\'|"[^"]*")'
+    r'|(?P<op>==|!=|<=|>=|=|<|>|~|\(|\)|\[|\]|,)'
+    r'|(?P<word>[A-Za-z_]\w*)'
+    r')'
+)
+_AGGREGATE_PATTERN = re_compile(r'(?P<function>\w+)(?:\((?P<column>\w+)\))?')
+
+
+@lru_cache(maxsize=64)
+def _regex(pattern: str):
+    try:
+        return re_compile(pattern)
+    except re_error as exc:
+        raise MKCTFAPIException(f"invalid regex: {pattern!r}") from exc
+
+
+def _match(value, pattern) -> bool:
+    return _regex(str(pattern)).search(str(value)) is not None
+
+
+def _contains(value, item) -> bool:
+    return item in value
+
+
+def _within(value, container) -> bool:
+    return value in container
+
+
+_OPERATORS = {
+    '==': eq,
+    '=': eq,
+    '!=': ne,
+    '<': lt,
+    '<=': le,
+    '>': gt,
+    '>=': ge,
+    '~': _match,
+    'in': _within,
+    'has': _contains,
+}
+
+
+@dataclass
+class Catalog:
+    """Column-oriented in-memory challenge catalog
+
+    Each challenge is a row, each configuration field in CATALOG_COLUMNS is a
+    column. Tags are stored as tuples so that every value is hashable.
+    """
+
+    columns: dict[str, list] = field(
+        default_factory=lambda: {name: [] for name in CATALOG_COLUMNS}
+    )
+    size: int = 0
+
+    @classmethod
+    def from_configs(cls, configs: Iterable[dict]) -> 'Catalog':
+        """Build catalog from challenge configuration dicts"""
+        catalog = cls()
+        for config in configs:
+            catalog.append(config)
+        return catalog
+
+    def append(self, config: dict):
+        """Append a challenge configuration dict as a new row"""
+        for name, column in self.columns.items():
+            value = config.get(name)
+            if name == 'tags':
+                value = tuple(value) if isinstance(value, list) else ()
+            column.append(value)
+        self.size += 1
+
+    def column(self, name: str) -> list:
+        """Column values"""
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise MKCTFAPIException(f"unknown column: {name}") from None
+
+    def filter(self, expression: 'Expression | None' = None) -> list[int]:
+        """Indices of rows matching expression, all rows if None"""
+        if expression is None:
+            return list(range(self.size))
+        mask = expression.evaluate(self)
+        return [index for index, selected in enumerate(mask) if selected]
+
+    def rows(
+        self, indices: list[int], columns: list[str] | None = None
+    ) -> Iterator[dict]:
+        """Yield selected rows as dicts restricted to columns"""
+        columns = [
+            (name, self.column(name)) for name in columns or CATALOG_COLUMNS
+        ]
+        for index in indices:
+            yield {
+                name: list(column[index])
+                if isinstance(column[index], tuple)
+                else column[index]
+                for name, column in columns
+            }
+
+    def aggregate(
+        self,
+        indices: list[int],
+        group_by: list[str],
+        aggregates: list['Aggregate'],
+    ) -> Iterator[dict]:
+        """Yield one row per group with its aggregated values
+
+        Grouping by tags puts a challenge in one group per tag. Groups are
+        yielded in order of first appearance.
+        """
+        group_columns = [self.column(name) for name in group_by]
+        for aggregate in aggregates:
+            if aggregate.column is not None:
+                self.column(aggregate.column)
+        groups: dict[tuple, list[int]] = {}
+        for index in indices:
+            keys = [()]
+            for column in group_columns:
+                value = column[index]
+                values = value if isinstance(value, tuple) else (value,)
+                keys = [key + (item,) for key in keys for item in values]
+            for key in keys:
+                groups.setdefault(key, []).append(index)
+        for key, group in groups.items():
+            row = dict(zip(group_by, key))
+            for aggregate in aggregates:
+                row[aggregate.name] = aggregate.compute(self, group)
+            yield row
+
+
+@dataclass
+class Aggregate:
+    """Aggregate function applied to a column, count applies to rows"""
+
+    function: str
+    column: str | None = None
+
+    @classmethod
+    def parse(cls, spec: str) -> 'Aggregate':
+        """Parse 'count' or 'function(column)' specification"""
+        match = _AGGREGATE_PATTERN.fullmatch(spec.strip())
+        if match is None or match['function'] not in AGGREGATE_FUNCTIONS:
+            raise MKCTFAPIException(f"invalid aggregate: {spec}")
+        if match['function'] != 'count' and match['column'] is None:
+            raise MKCTFAPIException(f"aggregate requires a column: {spec}")
+        return cls(function=match['function'], column=match['column'])
+
+    @property
+    def name(self) -> str:
+        """Aggregate name used as row key"""
+        if self.column is None:
+            return self.function
+        return f'{self.function}({self.column})'
+
+    def compute(self, catalog: Catalog, indices: list[int]):
+        """Compute aggregate over catalog rows"""
+        if self.column is None:
+            return len(indices)
+        column = catalog.column(self.column)
+        values = [column[index] for index in indices]
+        values = [value for value in values if value is not None]
+        if self.function == 'count':
+            return len(values)
+        if self.function in ('sum', 'avg'):
+            values = [
+                value
+                for value in values
+                if isinstance(value, (int, float))
+                and not isinstance(value, bool)
+            ]
+            if self.function == 'sum':
+                return sum(values)
+            return sum(values) / len(values) if values else None
+        try:
+            return (min if self.function == 'min' else max)(
+                values, default=None
+            )
+        except TypeError:
+            return None
+
+
+class Expression:
+    """Query expression node"""
+
+    def evaluate(self, catalog: Catalog) -> list:
+        """Evaluate expression against every catalog row at once"""
+        raise NotImplementedError
+
+
+@dataclass
+class _Literal(Expression):
+    value: object
+
+    def evaluate(self, catalog: Catalog) -> list:
+        return [self.value] * catalog.size
+
+
+@dataclass
+class _Column(Expression):
+    name: str
+
+    def evaluate(self, catalog: Catalog) -> list:
+        return catalog.column(self.name)
+
+
+@dataclass
+class _Comparison(Expression):
+    operator: str
+    left: Expression
+    right: Expression
+
+    def evaluate(self, catalog: Catalog) -> list:
+        operator = _OPERATORS[self.operator]
+
+        def compare(left, right) -> bool:
+            try:
+                return bool(operator(left, right))
+            except TypeError:
+                return False
+
+        if isinstance(self.right, _Literal):
+            # columns hold few distinct values: compare each of them once
+            right = self.right.value
+            memo = {}
+            mask = []
+            for left in self.left.evaluate(catalog):
+                selected = memo.get(left)
+                if selected is None:
+                    selected = memo[left] = compare(left, right)
+                mask.append(selected)
+            return mask
+        return [
+            compare(left, right)
+            for left, right in zip(
+                self.left.evaluate(catalog), self.right.evaluate(catalog)
+            )
+        ]
+
+
+@dataclass
+class _Not(Expression):
+    operand: Expression
+
+    def evaluate(self, catalog: Catalog) -> list:
+        return [not value for value in self.operand.evaluate(catalog)]
+
+
+@dataclass
+class _Logical(Expression):
+    combine: Callable[[bool, bool], bool]
+    left: Expression
+    right: Expression
+
+    def evaluate(self, catalog: Catalog) -> list:
+        return [
+            self.combine(bool(left), bool(right))
+            for left, right in zip(
+                self.left.evaluate(catalog), self.right.evaluate(catalog)
+            )
+        ]
+
+
+def _tokenize(text: str) -> list[tuple[str, str]]:
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN_PATTERN.match(text, position)
+        if match is None or match.end() == position:
+            raise MKCTFAPIException(
+                f"unexpected character at position {position}: {text!r}"
+            )
+        kind = match.lastgroup
+        value = match[kind]
+        if kind == 'word' and value in _KEYWORDS:
+            kind = 'op'
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser
+
+    expression := conjunction ('or' conjunction)*
+    conjunction := negation ('and' negation)*
+    negation := 'not' negation | '(' expression ')' | comparison
+    comparison := operand (operator operand)?
+    operand := column | literal | '[' literal (',' literal)* ']'
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def _peek(self) -> tuple[str, str] | None:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def _accept(self, *values: str) -> str | None:
+        token = self._peek()
+        if token and token[0] == 'op' and token[1] in values:
+            self.position += 1
+            return token[1]
+        return None
+
+    def _expect(self, value: str):
+        if self._accept(value) is None:
+            raise MKCTFAPIException(f"expected '{value}' in {self.text!r}")
+
+    def parse(self) -> Expression:
+        expression = self._expression()
+        if self._peek() is not None:
+            raise MKCTFAPIException(
+                f"unexpected token '{self._peek()[1]}' in {self.text!r}"
+            )
+        return expression
+
+    def _expression(self) -> Expression:
+        expression = self._conjunction()
+        while self._accept('or'):
+            expression = _Logical(
+                lambda left, right: left or right,
+                expression,
+                self._conjunction(),
+            )
+        return expression
+
+    def _conjunction(self) -> Expression:
+        expression = self._negation()
+        while self._accept('and'):
+            expression = _Logical(
+                lambda left, right: left and right,
+                expression,
+                self._negation(),
+            )
+        return expression
+
+    def _negation(self) -> Expression:
+        if self._accept('not'):
+            return _Not(self._negation())
+        if self._accept('('):
+            expression = self._expression()
+            self._expect(')')
+            return expression
+        left = self._operand()
+        operator = self._accept(*_OPERATORS)
+        if operator is None:
+            return left
+        return _Comparison(operator, left, self._operand())
+
+    def _literal(self) -> object:
+        token = self._peek()
+        if token is None:
+            raise MKCTFAPIException(f"unexpected end of {self.text!r}")
+        kind, value = token
+        self.position += 1
+        if kind == 'number':
+            return int(value)
+        if kind == 'string':
+            return value[1:-1]
+        if kind == 'word' and value in _LITERALS:
+            return _LITERALS[value]
+        raise MKCTFAPIException(f"unexpected token '{value}' in {self.text!r}")
+
+    def _operand(self) -> Expression:
+        token = self._peek()
+        if token and token[0] == 'word' and token[1] not in _LITERALS:
+            self.position += 1
+            if token[1] not in CATALOG_COLUMNS:
+                raise MKCTFAPIException(f"unknown column: {token[1]}")
+            return _Column(token[1])
+        if self._accept('['):
+            values = []
+            if not self._accept(']'):
+                values.append(self._literal())
+                while self._accept(','):
+                    values.append(self._literal())
+                self._expect(']')
+            return _Literal(tuple(values))
+        return _Literal(self._literal())
+
+
+def parse_expression(text: str) -> Expression:
+    """Parse a filter expression
+
+    Expressions combine comparisons (==, !=, <, <=, >, >=, ~ for regex
+    search, in, has) of columns and literals (integers, quoted strings,
+    true, false, null, [lists]) using and, or, not and parentheses, e.g.
+    "enabled and tags has 'pwn' and points > 300".
+    """
+    return _Parser(text).parse()
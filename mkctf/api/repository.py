@@ -2,14 +2,18 @@
 """
 
 from collections.abc import Iterator
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from os import scandir
 from pathlib import Path
 from shutil import copytree
 
 from ..helper.logging import LOGGER
-from ..wizard import ChallengeConfigWizard, RepositoryConfigWizard
+from .buildcache import BuildCache
+from .cache import HashCache
 from .challenge import ChallengeAPI, create_challenge_api
 from .config import ChallengeConfig, GeneralConfig, RepositoryConfig
+from .index import ChallengeIndex
+from .query import Catalog
 
 
 @dataclass
@@ -19,12 +23,69 @@ class RepositoryAPI:
     config: RepositoryConfig
     directory: Path
     general_config: GeneralConfig
+    scan_workers: int = 0
+    _index: ChallengeIndex | None = field(default=None, repr=False)
+    _hash_cache: HashCache | None = field(default=None, repr=False)
 
     @property
     def config_path(self) -> Path:
         """Configuration file path"""
         return self.directory / '.mkctf' / 'repo.yml'
 
+    @property
+    def index_path(self) -> Path:
+        """Challenge index file path"""
+        return self.directory / '.mkctf' / 'index.json'
+
+    @property
+    def index(self) -> ChallengeIndex:
+        """Challenge index, loaded on first access"""
+        if self._index is None:
+            self._index = ChallengeIndex.load(self.index_path, self.directory)
+        return self._index
+
+    @property
+    def hash_cache_path(self) -> Path:
+        """Content hash cache file path"""
+        return self.directory / '.mkctf' / 'cache' / 'hashes.json'
+
+    @property
+    def hash_cache(self) -> HashCache:
+        """Content hash cache, loaded on first access"""
+        if self._hash_cache is None:
+            self._hash_cache = HashCache.load(self.hash_cache_path)
+        return self._hash_cache
+
+    @property
+    def blobs_dir(self) -> Path:
+        """Export blob store directory"""
+        return self.directory / '.mkctf' / 'cache' / 'blobs'
+
+    @property
+    def builds_dir(self) -> Path:
+        """Build records directory"""
+        return self.directory / '.mkctf' / 'cache' / 'builds'
+
+    @property
+    def build_cache(self) -> BuildCache:
+        """Build records of challenges"""
+        return BuildCache(self.builds_dir)
+
+    @property
+    def logs_dir(self) -> Path:
+        """Challenge programs logs directory"""
+        return self.directory / '.mkctf' / 'logs'
+
+    @property
+    def snapshot_path(self) -> Path:
+        """Default repository snapshot file path"""
+        return self.directory / '.mkctf' / 'snapshot.bin'
+
+    @property
+    def read_only(self) -> bool:
+        """Determine if repository can be modified"""
+        return False
+
     @property
     def templates_dir(self) -> Path:
         """Templates directory"""
@@ -49,6 +110,8 @@ class RepositoryAPI:
         """[summary]"""
         if self.initialized:
             return False, 'already initialized'
+        from ..wizard import RepositoryConfigWizard
+
         wizard = RepositoryConfigWizard(general_config=self.general_config)
         config = wizard.show()
         if config is None:
@@ -73,6 +136,8 @@ class RepositoryAPI:
         """Configures repository"""
         final_repo_config = repo_config_override
         if final_repo_config is None:
+            from ..wizard import RepositoryConfigWizard
+
             wizard = RepositoryConfigWizard(
                 general_config=self.general_config,
                 existing_config=self.config,
@@ -85,43 +150,107 @@ class RepositoryAPI:
         return True
 
     def chall_find(self, slug: str) -> ChallengeAPI | None:
-        """Finds challenge"""
-        challenge_dir = self.challenges_dir / slug
-        if not challenge_dir.is_dir():
+        """Finds challenge having given slug, see ChallengeAPI.slug"""
+        challenge_apis = list(self.chall_scan(slug=slug))
+        if not challenge_apis:
             LOGGER.warning("%s not found!", slug)
             return None
-        return create_challenge_api(self, challenge_dir)
+        if len(challenge_apis) > 1:
+            LOGGER.warning(
+                "%s is the slug of several challenges, using %s",
+                slug,
+                challenge_apis[0].directory,
+            )
+        return challenge_apis[0]
+
+    def chall_dirs(self) -> list[Path]:
+        """List challenge directories in a deterministic order"""
+        if not self.challenges_dir.is_dir():
+            return []
+        with scandir(self.challenges_dir) as entries:
+            names = [
+                entry.name
+                for entry in entries
+                if entry.is_dir() and not entry.name.startswith('.')
+            ]
+        return [self.challenges_dir / name for name in sorted(names)]
 
     def chall_scan(
         self,
         tags: list[str] | set[str] | None = None,
         categories: list[str] | set[str] | None = None,
+        slug: str | None = None,
+        enabled: bool | None = None,
     ) -> Iterator[ChallengeAPI]:
         """
         Yield challenges having at least one tag in common with tags.
         An empty list of tags means all tags.
+
+        Candidates are resolved using the challenge index so that challenges
+        which do not match are never loaded.
         """
-        tags = set(tags) or set()
-        categories = set(categories) or set()
-        for entry in sorted(self.challenges_dir.glob('*')):
-            if not entry.is_dir() or entry.name.startswith('.'):
-                continue
-            challenge_api = create_challenge_api(
-                self, self.challenges_dir / entry.name
+        tags = set(tags or [])
+        categories = set(categories or [])
+        try:
+            chall_dirs = self._index_refresh()
+            keys = self.index.select(
+                chall_dirs.keys(),
+                tags=tags,
+                categories=categories,
+                slug=slug,
+                enabled=enabled,
+            )
+            LOGGER.debug(
+                "%d/%d challenges selected", len(keys), len(chall_dirs)
             )
-            if tags and not challenge_api.match_tags(tags):
-                LOGGER.debug(
-                    "%s does not match selected tags => skipped",
-                    challenge_api.config.slug,
-                )
-                continue
-            if categories and not challenge_api.match_categories(categories):
-                LOGGER.debug(
-                    "%s does not match selected categories => skipped",
-                    challenge_api.config.slug,
-                )
-                continue
-            yield challenge_api
+            for key in keys:
+                yield create_challenge_api(self, chall_dirs[key])
+        finally:
+            self.index.dump()
+
+    def _index_refresh(self) -> dict[str, Path]:
+        """Bring challenge index up to date and map its keys to directories"""
+        chall_dirs = {
+            self.index.key(chall_dir / '.mkctf.yml'): chall_dir
+            for chall_dir in self.chall_dirs()
+        }
+        self.index.refresh(
+            [chall_dir / '.mkctf.yml' for chall_dir in chall_dirs.values()],
+            self.scan_workers,
+        )
+        return chall_dirs
+
+    def chall_configs(self) -> dict[str, dict]:
+        """Map challenge directory names to challenge configuration dicts"""
+        try:
+            chall_dirs = self._index_refresh()
+        finally:
+            self.index.dump()
+        entries = self.index.entries
+        return {
+            chall_dir.name: entries[key].config
+            for key, chall_dir in chall_dirs.items()
+            if key in entries
+        }
+
+    def chall_catalog(self) -> Catalog:
+        """Build a column-oriented catalog of challenge configurations"""
+        return Catalog.from_configs(self.chall_configs().values())
+
+    def index_update(self, rebuild: bool = False) -> int:
+        """Update challenge index, drop existing entries first if rebuild"""
+        if rebuild:
+            self.index.clear()
+        count = 0
+        for _ in self.chall_scan():
+            count += 1
+        return count
+
+    def index_verify(self) -> list[tuple[str, str]]:
+        """Compare challenge index against challenge configuration files"""
+        return self.index.verify(
+            [chall_dir / '.mkctf.yml' for chall_dir in self.chall_dirs()]
+        )
 
     def chall_create(
         self, chall_config_override: ChallengeConfig | None = None
@@ -129,6 +258,8 @@ class RepositoryAPI:
         """Creates a challenge"""
         final_chall_config = chall_config_override
         if final_chall_config is None:
+            from ..wizard import ChallengeConfigWizard
+
             wizard = ChallengeConfigWizard(repository_config=self.config)
             final_chall_config = wizard.show()
             if final_chall_config is None:
@@ -176,7 +307,7 @@ class RepositoryAPI:
 
 
 def create_repository_api(
-    directory: Path, general_config: GeneralConfig
+    directory: Path, general_config: GeneralConfig, scan_workers: int = 0
 ) -> RepositoryAPI:
     """Create RepositoryAPI instance"""
     config = RepositoryConfig.load(directory / '.mkctf' / 'repo.yml')
@@ -184,4 +315,5 @@ def create_repository_api(
         config=config,
         directory=directory,
         general_config=general_config,
+        scan_workers=scan_workers,
     )
@@ -0,0 +1,190 @@
+"""Challenge dependency scheduling
+"""
+
+from asyncio import FIRST_COMPLETED, create_task, gather, wait
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, field
+from time import monotonic
+
+from ..helper.exception import MKCTFAPIException
+
+
+def dependency_closure(
+    slugs: list[str], dependencies: dict[str, list[str]]
+) -> list[str]:
+    """Add transitive dependencies of slugs, dependencies first"""
+    selected = set()
+    ordered = []
+    stack = [(slug, None) for slug in reversed(slugs)]
+    while stack:
+        slug, dependent = stack.pop()
+        if slug in selected:
+            continue
+        if slug not in dependencies:
+            raise MKCTFAPIException(
+                f"{dependent} depends on unknown challenge {slug}"
+            )
+        selected.add(slug)
+        ordered.append(slug)
+        stack.extend((dependency, slug) for dependency in dependencies[slug])
+    return ordered
+
+
+@dataclass
+class DependencyScheduler:
+    """Run tasks as soon as their dependencies succeeded
+
+    dependencies maps each node to nodes it depends on, in preferred start
+    order. Dependencies which are not nodes are considered satisfied. At most
+    jobs tasks run concurrently, dependents of a failed node are skipped.
+    """
+
+    dependencies: dict[str, list[str]]
+    jobs: int = 1
+    durations: dict[str, float] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.dependencies = {
+            node: [dep for dep in deps if dep in self.dependencies]
+            for node, deps in self.dependencies.items()
+        }
+        self.dependents = {node: [] for node in self.dependencies}
+        for node, deps in self.dependencies.items():
+            for dep in deps:
+                self.dependents[dep].append(node)
+        self._check_cycles()
+
+    def _check_cycles(self):
+        """Raise if dependencies are not a directed acyclic graph"""
+        remaining = {
+            node: len(deps) for node, deps in self.dependencies.items()
+        }
+        ready = [node for node, count in remaining.items() if not count]
+        while ready:
+            node = ready.pop()
+            del remaining[node]
+            for dependent in self.dependents[node]:
+                remaining[dependent] -= 1
+                if not remaining[dependent]:
+                    ready.append(dependent)
+        if remaining:
+            raise MKCTFAPIException(
+                f"dependency cycle between {', '.join(sorted(remaining))}"
+            )
+
+    def critical_path(self) -> tuple[list[str], float]:
+        """Longest chain of dependent tasks which ran and its duration"""
+        finish = {}
+        previous = {}
+        for node in self.topological_order():
+            if node not in self.durations:
+                continue
+            ran = [dep for dep in self.dependencies[node] if dep in finish]
+            before = max(ran, key=finish.get, default=None)
+            previous[node] = before
+            finish[node] = self.durations[node] + finish.get(before, 0.0)
+        if not finish:
+            return [], 0.0
+        node = max(finish, key=finish.get)
+        length = finish[node]
+        path = []
+        while node is not None:
+            path.append(node)
+            node = previous[node]
+        return path[::-1], length
+
+    def topological_order(self) -> list[str]:
+        """Nodes ordered so that dependencies come first"""
+        order = []
+        visited = set()
+        for root in self.dependencies:
+            stack = [(root, False)]
+            while stack:
+                node, expanded = stack.pop()
+                if expanded:
+                    order.append(node)
+                    continue
+                if node in visited:
+                    continue
+                visited.add(node)
+                stack.append((node, True))
+                stack.extend(
+                    (dep, False) for dep in reversed(self.dependencies[node])
+                )
+        return order
+
+    async def run(
+        self,
+        func: Callable[[str], Awaitable],
+        succeeded: Callable[[object], bool],
+        skipped: Callable[[str, str], object],
+        keep_order: bool = False,
+    ) -> AsyncIterator[tuple[str, object]]:
+        """Run func for every node and yield (node, result)
+
+        Results are yielded as tasks complete unless keep_order is True.
+        skipped(node, dependency) builds the result of a node skipped because
+        dependency failed.
+        """
+        nodes = list(self.dependencies)
+        remaining = {
+            node: set(deps) for node, deps in self.dependencies.items()
+        }
+        ready = [node for node in nodes if not remaining[node]]
+        running = {}
+        results = {}
+        position = 0
+
+        async def timed(node):
+            started = monotonic()
+            try:
+                return await func(node)
+            finally:
+                self.durations[node] = monotonic() - started
+
+        def complete(node, result):
+            results[node] = result
+            if not keep_order:
+                return [(node, result)]
+            nonlocal position
+            done = []
+            while position < len(nodes) and nodes[position] in results:
+                done.append((nodes[position], results[nodes[position]]))
+                position += 1
+            return done
+
+        try:
+            while ready or running:
+                while ready and len(running) < max(self.jobs, 1):
+                    node = ready.pop(0)
+                    running[create_task(timed(node))] = node
+                finished, _ = await wait(running, return_when=FIRST_COMPLETED)
+                for task in sorted(
+                    finished, key=lambda task: nodes.index(running[task])
+                ):
+                    node = running.pop(task)
+                    result = task.result()
+                    for item in complete(node, result):
+                        yield item
+                    if succeeded(result):
+                        for dependent in self.dependents[node]:
+                            remaining[dependent].discard(node)
+                            if not remaining[dependent]:
+                                ready.append(dependent)
+                        continue
+                    # skip every transitive dependent of failed node
+                    stack = list(self.dependents[node])
+                    while stack:
+                        dependent = stack.pop()
+                        if dependent in results:
+                            continue
+                        for item in complete(
+                            dependent, skipped(dependent, node)
+                        ):
+                            yield item
+                        stack.extend(self.dependents[dependent])
+        finally:
+            for task in running:
+                task.cancel()
+            # let cancelled tasks clean up before returning
+            await gather(*running, return_exceptions=True)
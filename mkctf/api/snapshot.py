@@ -0,0 +1,282 @@
+"""Repository snapshot
+"""
+
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from json import dumps, loads
+from mmap import ACCESS_READ, mmap
+from os import path as os_path
+from pathlib import Path
+from struct import Struct
+from struct import error as struct_error
+
+from ..helper.exception import MKCTFAPIException
+from ..helper.logging import LOGGER
+from .challenge import ChallengeAPI, create_challenge_api
+from .config import ChallengeConfig, GeneralConfig, RepositoryConfig
+from .repository import RepositoryAPI
+
+SNAPSHOT_MAGIC = b'MKCTFSNP'
+SNAPSHOT_VERSION = 2
+# magic, version, challenge count, metadata offset, metadata size
+_HEADER = Struct('<8sIIQI')
+# blob offset, blob size, name size, enabled flag
+_RECORD = Struct('<QIH?')
+
+
+def write_snapshot(
+    filepath: Path,
+    repository_directory: Path,
+    repository_config: dict,
+    challenges: dict[str, dict],
+) -> int:
+    """Write a snapshot of a repository and return challenges count
+
+    challenges maps challenge directory names to challenge configuration
+    dicts. Records are named after challenge slugs, directory name is used
+    when slug is not configured, and sorted by name so that a challenge can
+    be found using a binary search. Each record blob holds the UTF-8 encoded
+    name followed by the JSON encoded [directory name, configuration] pair.
+    """
+    entries = {}
+    for directory in sorted(challenges):
+        config = challenges[directory]
+        name = config.get('slug') or directory
+        if name in entries:
+            LOGGER.warning(
+                "snapshot ignored %s (slug %s is used by %s)",
+                directory,
+                name,
+                entries[name][0],
+            )
+            continue
+        entries[name] = (directory, config)
+    names = sorted(entries)
+    metadata = dumps(
+        {
+            'repository': os_path.relpath(
+                repository_directory, filepath.parent
+            ),
+            'config': repository_config,
+        },
+        separators=(',', ':'),
+    ).encode()
+    offset = _HEADER.size + len(names) * _RECORD.size
+    records = []
+    blobs = [metadata]
+    metadata_offset = offset
+    offset += len(metadata)
+    for name in names:
+        encoded = name.encode()
+        directory, config = entries[name]
+        blob = (
+            encoded
+            + dumps([directory, config], separators=(',', ':')).encode()
+        )
+        records.append(
+            _RECORD.pack(
+                offset, len(blob), len(encoded), bool(config.get('enabled'))
+            )
+        )
+        blobs.append(blob)
+        offset += len(blob)
+    header = _HEADER.pack(
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_VERSION,
+        len(names),
+        metadata_offset,
+        len(metadata),
+    )
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    tmp_filepath = filepath.with_name(f'.{filepath.name}.tmp')
+    with tmp_filepath.open('wb') as fstream:
+        fstream.write(header)
+        fstream.writelines(records)
+        fstream.writelines(blobs)
+    tmp_filepath.replace(filepath)
+    return len(names)
+
+
+@dataclass
+class Snapshot:
+    """Read-only memory-mapped repository snapshot
+
+    Opening a snapshot only reads its header, challenge records are decoded
+    on access.
+    """
+
+    filepath: Path
+    count: int
+    _mmap: mmap = field(repr=False)
+    _metadata: dict | None = field(default=None, repr=False)
+
+    @classmethod
+    def open(cls, filepath: Path) -> 'Snapshot':
+        """Open and validate snapshot header"""
+        try:
+            with filepath.open('rb') as fstream:
+                data = mmap(fstream.fileno(), 0, access=ACCESS_READ)
+            magic, version, count, _, _ = _HEADER.unpack_from(data)
+        except (OSError, ValueError, struct_error) as exc:
+            raise MKCTFAPIException(
+                f"failed to open snapshot {filepath}"
+            ) from exc
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            data.close()
+            raise MKCTFAPIException(f"invalid snapshot {filepath}")
+        return cls(filepath=filepath, count=count, _mmap=data)
+
+    @property
+    def metadata(self) -> dict:
+        """Snapshot metadata"""
+        if self._metadata is None:
+            _, _, _, offset, size = _HEADER.unpack_from(self._mmap)
+            self._metadata = loads(self._mmap[offset : offset + size])
+        return self._metadata
+
+    @property
+    def repository_directory(self) -> Path:
+        """Repository directory, resolved from snapshot directory"""
+        return Path(
+            os_path.normpath(
+                self.filepath.parent / self.metadata['repository']
+            )
+        )
+
+    def _record(self, index: int) -> tuple[int, int, int, bool]:
+        return _RECORD.unpack_from(
+            self._mmap, _HEADER.size + index * _RECORD.size
+        )
+
+    def name(self, index: int) -> str:
+        """Challenge slug of record at index"""
+        offset, _, name_size, _ = self._record(index)
+        return self._mmap[offset : offset + name_size].decode()
+
+    def enabled(self, index: int) -> bool:
+        """Enabled flag of record at index"""
+        return self._record(index)[3]
+
+    def entry(self, index: int) -> tuple[str, dict]:
+        """Challenge directory name and configuration dict of record"""
+        offset, size, name_size, _ = self._record(index)
+        directory, config = loads(
+            self._mmap[offset + name_size : offset + size]
+        )
+        return directory, config
+
+    def directory(self, index: int) -> str:
+        """Challenge directory name of record at index"""
+        return self.entry(index)[0]
+
+    def config(self, index: int) -> dict:
+        """Challenge configuration dict of record at index"""
+        return self.entry(index)[1]
+
+    def find(self, name: str) -> int | None:
+        """Index of record named name, None if not found"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.name(mid) < name:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self.name(lo) == name:
+            return lo
+        return None
+
+    def close(self):
+        """Release memory mapping"""
+        self._mmap.close()
+
+
+@dataclass
+class SnapshotRepositoryAPI(RepositoryAPI):
+    """Provides read-only access to a repository snapshot
+
+    Challenge configurations come from the snapshot, challenge directories
+    are still used to run challenge programs.
+    """
+
+    snapshot: Snapshot | None = None
+
+    @property
+    def read_only(self) -> bool:
+        return True
+
+    def _read_only(self, *_args, **_kwargs):
+        raise MKCTFAPIException("repository snapshot is read-only")
+
+    init = configure = _read_only
+    chall_create = chall_configure = chall_delete = _read_only
+    chall_enable = chall_disable = _read_only
+    index_update = index_verify = _read_only
+
+    def _challenge_api(self, index: int) -> ChallengeAPI:
+        directory, config = self.snapshot.entry(index)
+        return create_challenge_api(
+            self,
+            self.challenges_dir / directory,
+            ChallengeConfig.from_dict(config),
+        )
+
+    def chall_find(self, slug: str) -> ChallengeAPI | None:
+        index = self.snapshot.find(slug)
+        if index is None:
+            LOGGER.warning("%s not found!", slug)
+            return None
+        return self._challenge_api(index)
+
+    def chall_dirs(self) -> list[Path]:
+        return sorted(
+            self.challenges_dir / self.snapshot.directory(index)
+            for index in range(self.snapshot.count)
+        )
+
+    def chall_scan(
+        self,
+        tags: list[str] | set[str] | None = None,
+        categories: list[str] | set[str] | None = None,
+        slug: str | None = None,
+        enabled: bool | None = None,
+    ) -> Iterator[ChallengeAPI]:
+        tags = set(tags or [])
+        categories = set(categories or [])
+        if slug is None:
+            indices = range(self.snapshot.count)
+        else:
+            index = self.snapshot.find(slug)
+            indices = [] if index is None else [index]
+        for index in indices:
+            if enabled is not None and self.snapshot.enabled(index) != enabled:
+                continue
+            challenge_api = self._challenge_api(index)
+            config = challenge_api.config
+            if tags and not tags.intersection(config.tags or []):
+                continue
+            if categories and config.category not in categories:
+                continue
+            yield challenge_api
+
+    def chall_configs(self) -> dict[str, dict]:
+        return dict(map(self.snapshot.entry, range(self.snapshot.count)))
+
+
+def create_snapshot_repository_api(
+    filepath: Path, general_config: GeneralConfig
+) -> SnapshotRepositoryAPI:
+    """Create SnapshotRepositoryAPI instance from a snapshot file"""
+    snapshot = Snapshot.open(filepath)
+    try:
+        config = RepositoryConfig.from_dict(snapshot.metadata['config'])
+    except (MKCTFAPIException, KeyError, ValueError) as exc:
+        snapshot.close()
+        raise MKCTFAPIException(f"invalid snapshot {filepath}") from exc
+    LOGGER.info("using snapshot %s (%d challenges)", filepath, snapshot.count)
+    return SnapshotRepositoryAPI(
+        config=config,
+        directory=snapshot.repository_directory,
+        general_config=general_config,
+        snapshot=snapshot,
+    )
@@ -0,0 +1,285 @@
+"""Repository watcher
+"""
+
+from asyncio import CancelledError, Event, get_running_loop, sleep
+from collections.abc import Awaitable, Callable
+from ctypes import CDLL, get_errno
+from ctypes.util import find_library
+from dataclasses import dataclass, field
+from enum import Enum
+from os import close, read, strerror
+from pathlib import Path
+from struct import Struct
+
+from ..helper.exception import MKCTFAPIException
+from ..helper.logging import LOGGER
+from .config import ChallengeConfig
+
+# see inotify(7)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_IN_EVENT = Struct('iIII')
+_CHALLENGES_MASK = (
+    _IN_CREATE | _IN_DELETE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_ONLYDIR
+)
+_CHALLENGE_MASK = (
+    _IN_CLOSE_WRITE
+    | _IN_MODIFY
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+    | _IN_ONLYDIR
+)
+_CONFIG_NAME = '.mkctf.yml'
+
+
+class RepositoryEventKind(Enum):
+    """Repository event kinds"""
+
+    ADDED = 'added'
+    REMOVED = 'removed'
+    MODIFIED = 'modified'
+    ENABLED = 'enabled'
+    DISABLED = 'disabled'
+
+
+@dataclass
+class RepositoryEvent:
+    """Repository event, config is None for REMOVED events"""
+
+    kind: RepositoryEventKind
+    slug: str
+    config: ChallengeConfig | None = None
+
+
+RepositorySubscriber = Callable[[RepositoryEvent], Awaitable[None] | None]
+
+
+class _Inotify:
+    """Minimal inotify binding based on ctypes"""
+
+    def __init__(self):
+        libc = CDLL(find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(get_errno(), strerror(get_errno()))
+        self.watches: dict[int, str | None] = {}
+
+    def add_watch(self, path: Path, mask: int, name: str | None):
+        """Watch path, events will be reported with name"""
+        wd = self._add_watch(self.fd, str(path).encode(), mask)
+        if wd < 0:
+            LOGGER.debug("cannot watch %s (%s)", path, strerror(get_errno()))
+            return
+        self.watches[wd] = name
+
+    def read(self) -> list[tuple[str | None, int, str]]:
+        """Read pending events as (watch name, mask, entry name) tuples"""
+        events = []
+        try:
+            data = read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return events
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _IN_EVENT.unpack_from(data, offset)
+            offset += _IN_EVENT.size
+            name = data[offset : offset + length].rstrip(b'\0').decode()
+            offset += length
+            if mask & _IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            events.append((self.watches.get(wd), mask, name))
+        return events
+
+    def close(self):
+        """Release inotify instance"""
+        close(self.fd)
+
+
+@dataclass
+class RepositoryWatcher:
+    """Keep an in-memory view of repository challenges up to date
+
+    Linux inotify is used when available, the watcher falls back to polling
+    challenge configurations every interval seconds otherwise. Subscribers
+    are notified of added, removed, modified, enabled and disabled
+    challenges. View and events are keyed by challenge slug, changes are
+    tracked per challenge directory: a challenge whose slug changes is
+    removed then added.
+    """
+
+    repository_api: 'RepositoryAPI'
+    interval: float = 5.0
+    debounce: float = 0.5
+    view: dict[str, ChallengeConfig] = field(default_factory=dict)
+    # challenge directory name -> slug of challenges in view
+    _slugs: dict[str, str] = field(default_factory=dict)
+    _subscribers: list[RepositorySubscriber] = field(default_factory=list)
+    _pending: set[str] = field(default_factory=set)
+    _wakeup: Event = field(default_factory=Event)
+
+    def subscribe(self, subscriber: RepositorySubscriber):
+        """Register a callback called (or awaited) for each event"""
+        self._subscribers.append(subscriber)
+
+    def _names(self) -> set[str]:
+        """Directory names of challenges in view or on disk"""
+        names = set(self._slugs)
+        names.update(
+            chall_dir.name for chall_dir in self.repository_api.chall_dirs()
+        )
+        return names
+
+    def _chall_config(self, name: str) -> ChallengeConfig | None:
+        chall_dir = self.repository_api.challenges_dir / name
+        if not chall_dir.is_dir():
+            return None
+        return self.repository_api.index.config(chall_dir / _CONFIG_NAME)
+
+    def snapshot(self):
+        """Build initial view, no event is emitted"""
+        self.view = {}
+        self._slugs = {}
+        for challenge_api in self.repository_api.chall_scan():
+            self.view[challenge_api.slug] = challenge_api.config
+            self._slugs[challenge_api.directory.name] = challenge_api.slug
+
+    async def _emit(self, event: RepositoryEvent):
+        LOGGER.info("[watcher]: %s %s", event.slug, event.kind.value)
+        for subscriber in self._subscribers:
+            try:
+                result = subscriber(event)
+                if result is not None:
+                    await result
+            except:
+                LOGGER.exception("[watcher]: subscriber failed")
+
+    async def _update(self, name: str):
+        """Compare current state of challenge directory to view, emit events"""
+        previous_slug = self._slugs.get(name)
+        previous = self.view.get(previous_slug)
+        try:
+            current = self._chall_config(name)
+        except MKCTFAPIException:
+            LOGGER.warning("[watcher]: %s configuration is invalid", name)
+            return
+        slug = None if current is None else current.slug or name
+        if previous_slug is not None and previous_slug != slug:
+            del self._slugs[name]
+            self.view.pop(previous_slug, None)
+            await self._emit(
+                RepositoryEvent(RepositoryEventKind.REMOVED, previous_slug)
+            )
+            previous = None
+        if current is None:
+            return
+        self._slugs[name] = slug
+        self.view[slug] = current
+        if previous is None:
+            kind = RepositoryEventKind.ADDED
+        elif previous.enabled != current.enabled:
+            kind = (
+                RepositoryEventKind.ENABLED
+                if current.enabled
+                else RepositoryEventKind.DISABLED
+            )
+        elif previous.to_dict() != current.to_dict():
+            kind = RepositoryEventKind.MODIFIED
+        else:
+            return
+        await self._emit(RepositoryEvent(kind, slug, current))
+
+    async def _flush(self):
+        pending, self._pending = self._pending, set()
+        for name in sorted(pending):
+            await self._update(name)
+        self.repository_api.index.dump()
+
+    def _on_inotify(self, inotify: _Inotify):
+        challenges_dir = self.repository_api.challenges_dir
+        for watch_name, mask, name in inotify.read():
+            if mask & _IN_Q_OVERFLOW:
+                LOGGER.warning("[watcher]: inotify queue overflow")
+                self._pending.update(self._names())
+                continue
+            if watch_name is None:
+                # event on challenges directory
+                if name.startswith('.') or not mask & _IN_ISDIR:
+                    continue
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    inotify.add_watch(
+                        challenges_dir / name, _CHALLENGE_MASK, name
+                    )
+                self._pending.add(name)
+                continue
+            if name in (_CONFIG_NAME, '') or mask & (
+                _IN_DELETE_SELF | _IN_MOVE_SELF
+            ):
+                self._pending.add(watch_name)
+        if self._pending:
+            self._wakeup.set()
+
+    async def _watch_inotify(self):
+        inotify = _Inotify()
+        loop = get_running_loop()
+        try:
+            challenges_dir = self.repository_api.challenges_dir
+            inotify.add_watch(challenges_dir, _CHALLENGES_MASK, None)
+            for chall_dir in self.repository_api.chall_dirs():
+                inotify.add_watch(chall_dir, _CHALLENGE_MASK, chall_dir.name)
+            loop.add_reader(inotify.fd, self._on_inotify, inotify)
+            # catch up with modifications which happened before watches
+            # were added
+            self._pending.update(self._names())
+            while True:
+                await self._flush()
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                # let bursts of events settle
+                await sleep(self.debounce)
+        finally:
+            loop.remove_reader(inotify.fd)
+            inotify.close()
+
+    async def _watch_polling(self):
+        while True:
+            self._pending.update(self._names())
+            await self._flush()
+            await sleep(self.interval)
+
+    async def run(self, polling: bool = False):
+        """Watch repository until cancelled"""
+        if not self.view:
+            self.snapshot()
+        if not polling:
+            try:
+                LOGGER.info("[watcher]: watching repository using inotify")
+                await self._watch_inotify()
+                return
+            except (OSError, AttributeError) as exc:
+                LOGGER.warning("[watcher]: inotify unavailable (%s)", exc)
+        LOGGER.info(
+            "[watcher]: polling repository every %.1f seconds", self.interval
+        )
+        try:
+            await self._watch_polling()
+        except CancelledError:
+            LOGGER.info("[watcher]: stopped")
+            raise
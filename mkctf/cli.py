@@ -7,7 +7,7 @@ from sys import exit as sys_exit
 
 from . import version
 from .api import create_mkctf_api
-from .command import setup_commands
+from .command import LazySubParsersAction, setup_commands
 from .helper.argparse import generic_add_arguments, generic_parse_args
 from .helper.exception import MKCTFAPIException
 from .helper.logging import LOGGER
@@ -25,7 +25,9 @@ def parse_args():
         help="some operations will stop asking for confirmation",
     )
     # -- add subparsers
-    subparsers = parser.add_subparsers(dest='command')
+    subparsers = parser.add_subparsers(
+        dest='command', action=LazySubParsersAction
+    )
     subparsers.required = True
     setup_commands(subparsers)
     # -- parse args and pre-process if needed
@@ -37,7 +39,9 @@ async def main():
     LOGGER.info("MKCTF CLI %s", version)
     args = parse_args()
     try:
-        mkctf_api = create_mkctf_api(args.repository_directory)
+        mkctf_api = create_mkctf_api(
+            args.repository_directory, args.scan_workers
+        )
         returncode = 0 if await args.func(mkctf_api, args) else 1
     except MKCTFAPIException as exc:
         LOGGER.critical("%s", exc.args[0])
@@ -1,38 +1,97 @@
 """mkctf command line interface commands
 """
 
-from .build import setup_build
-from .configure import setup_configure
-from .create import setup_create
-from .delete import setup_delete
-from .deploy import setup_deploy
-from .disable import setup_disable
-from .enable import setup_enable
-from .enum import setup_enum
-from .export import setup_export
-from .healthcheck import setup_healthcheck
-from .init import setup_init
-from .push import setup_push
-from .renew_flag import setup_renew_flag
-from .update_meta import setup_update_meta
+from argparse import _SubParsersAction
+from importlib import import_module
+
+# command name -> (module name, help)
+COMMANDS = {
+    'init': ('init', "initialize mkctf repository"),
+    'enum': ('enum', "enumerate challenges"),
+    'index': (
+        'index',
+        "update challenge index used to speed up challenge enumeration",
+    ),
+    'query': (
+        'query',
+        "query challenges using filter expressions and aggregates",
+    ),
+    'create': ('create', "create a challenge"),
+    'enable': ('enable', "enable a challenge"),
+    'disable': ('disable', "disable a challenge"),
+    'renew-flag': (
+        'renew_flag',
+        "renew flags. You might want to build and deploy/export after that",
+    ),
+    'update-meta': (
+        'update_meta',
+        "update challenge metadata. You might want to run this command after reconfiguring the repository",
+    ),
+    'configure': (
+        'configure',
+        "edit repository's config or challenge's config",
+    ),
+    'build': (
+        'build',
+        "build challenges. After building challenges you might want to deploy/export",
+    ),
+    'deploy': ('deploy', "deploy challenges"),
+    'healthcheck': (
+        'healthcheck',
+        "perform a healthcheck on a challenge using healthcheck script",
+    ),
+    'delete': ('delete', "delete a challenge"),
+    'export': ('export', "export public resources for each challenge"),
+    'export-verify': (
+        'export_verify',
+        "verify exported archives checksums and names, printing one JSON report per line",
+    ),
+    'fetch': (
+        'fetch',
+        "fetch members of a challenge zip archive from static host using range requests",
+    ),
+    'snapshot': (
+        'snapshot',
+        "write a compact snapshot of repository and challenge configurations, used by mkctf-monitor --snapshot",
+    ),
+    'push': ('push', "push challenges configuration to the dashboard API"),
+}
+
+
+def _setup_command(parser, module_name: str):
+    """Import command module and add command arguments to parser"""
+    module = import_module(f'.{module_name}', __name__)
+    getattr(module, f'setup_{module_name}')(parser)
+
+
+class LazySubParsersAction(_SubParsersAction):
+    """Subparsers action adding arguments of the selected command only
+
+    Command modules are imported once argparse selected a command, keeping
+    modules of other commands and their dependencies out of the startup path.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # command name -> module name of commands not set up yet
+        self.pending = {}
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        module_name = self.pending.pop(values[0], None)
+        if module_name is not None:
+            _setup_command(self.choices[values[0]], module_name)
+        super().__call__(parser, namespace, values, option_string)
 
 
 def setup_commands(subparsers):
-    """Setup mkctf command line interface commands"""
-    for setup_func in (
-        setup_init,
-        setup_enum,
-        setup_create,
-        setup_enable,
-        setup_disable,
-        setup_renew_flag,
-        setup_update_meta,
-        setup_configure,
-        setup_build,
-        setup_deploy,
-        setup_healthcheck,
-        setup_delete,
-        setup_export,
-        setup_push,
-    ):
-        setup_func(subparsers)
+    """Setup mkctf command line interface commands
+
+    Command arguments are added when the command is selected if subparsers
+    was created using LazySubParsersAction, right away otherwise.
+    """
+    for name, (module_name, help_) in COMMANDS.items():
+        parser = subparsers.add_parser(name, help=help_)
+        if isinstance(subparsers, LazySubParsersAction):
+            subparsers.pending[name] = module_name
+            continue
+        _setup_command(parser, module_name)
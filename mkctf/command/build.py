@@ -1,14 +1,31 @@
 """build command
 """
 
+from os import cpu_count
+
 from ..helper.cli import Answer, confirm
-from ..helper.display import display_cpr
+from ..helper.display import display_build_plan, display_cpr, display_line
 from ..helper.logging import LOGGER
 from ..helper.subprocess import DEFAULT_PROG_TIMEOUT, CalledProcessState
 
 
+def _dry_run(mkctf_api, args):
+    for slug, reason in mkctf_api.build_plan(
+        tags=args.tags,
+        categories=args.categories,
+        slug=args.slug,
+        dev=args.dev,
+        force=args.force,
+        dependencies=not args.no_deps,
+    ):
+        display_build_plan(slug, reason)
+    return True
+
+
 async def build(mkctf_api, args):
     """Builds at least one challenge"""
+    if args.dry_run:
+        return _dry_run(mkctf_api, args)
     if (
         not args.yes
         and confirm('do you really want to perform a build?') == Answer.NO
@@ -22,19 +39,24 @@ async def build(mkctf_api, args):
         slug=args.slug,
         dev=args.dev,
         timeout=args.timeout,
+        jobs=args.jobs,
+        keep_order=args.keep_order,
+        on_line=display_line if args.follow else None,
+        log=args.log,
+        dependencies=not args.no_deps,
+        force=args.force,
     ):
         display_cpr(slug, cpr)
-        if cpr.returnstate == CalledProcessState.EXCEPTION:
+        if cpr.returnstate in (
+            CalledProcessState.EXCEPTION,
+            CalledProcessState.SKIPPED,
+        ):
             success = False
     return success
 
 
-def setup_build(subparsers):
+def setup_build(parser):
     """Setup build command"""
-    parser = subparsers.add_parser(
-        'build',
-        help="build challenges. After building challenges you might want to deploy/export",
-    )
     parser.add_argument(
         '--dev',
         action='store_true',
@@ -65,4 +87,43 @@ def setup_build(subparsers):
         default=DEFAULT_PROG_TIMEOUT,
         help="override default timeout for subprocesses",
     )
+    parser.add_argument(
+        '--jobs',
+        '-j',
+        type=int,
+        default=cpu_count() or 1,
+        help="count of build programs running concurrently, defaults to CPU count",
+    )
+    parser.add_argument(
+        '--follow',
+        action='store_true',
+        help="display program output lines as they are produced",
+    )
+    parser.add_argument(
+        '--log',
+        action='store_true',
+        help="write full program output to .mkctf/logs/<slug>/<program>.log.gz",
+    )
+    parser.add_argument(
+        '--keep-order',
+        action='store_true',
+        help="display results in challenge order instead of completion order",
+    )
+    parser.add_argument(
+        '--no-deps',
+        action='store_true',
+        help="do not build dependencies of selected challenges",
+    )
+    parser.add_argument(
+        '--force',
+        '-f',
+        action='store_true',
+        help="build challenges even if they are up-to-date",
+    )
+    parser.add_argument(
+        '--dry-run',
+        '-n',
+        action='store_true',
+        help="display challenges which would be built and why, build nothing",
+    )
     parser.set_defaults(func=build)
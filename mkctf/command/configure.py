@@ -14,10 +14,7 @@ async def configure(mkctf_api, args):
     return configured
 
 
-def setup_configure(subparsers):
+def setup_configure(parser):
     """Setup configure command"""
-    parser = subparsers.add_parser(
-        'configure', help="edit repository's config or challenge's config"
-    )
     parser.add_argument('-s', '--slug', help="challenge's slug")
     parser.set_defaults(func=configure)
@@ -14,7 +14,6 @@ async def create(mkctf_api, _):
     return created
 
 
-def setup_create(subparsers):
+def setup_create(parser):
     """Setup create command"""
-    parser = subparsers.add_parser('create', help="create a challenge")
     parser.set_defaults(func=create)
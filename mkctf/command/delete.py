@@ -21,8 +21,7 @@ async def delete(mkctf_api, args):
     return deleted
 
 
-def setup_delete(subparsers):
+def setup_delete(parser):
     """Setup delete command"""
-    parser = subparsers.add_parser('delete', help="delete a challenge")
     parser.add_argument('slug', help="challenge's slug")
     parser.set_defaults(func=delete)
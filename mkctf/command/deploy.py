@@ -1,8 +1,10 @@
 """deploy command
 """
 
+from os import cpu_count
+
 from ..helper.cli import Answer, confirm
-from ..helper.display import display_cpr
+from ..helper.display import display_cpr, display_line
 from ..helper.logging import LOGGER
 from ..helper.subprocess import DEFAULT_PROG_TIMEOUT, CalledProcessState
 
@@ -22,6 +24,10 @@ async def deploy(mkctf_api, args):
         slug=args.slug,
         dev=args.dev,
         timeout=args.timeout,
+        jobs=args.jobs,
+        keep_order=args.keep_order,
+        on_line=display_line if args.follow else None,
+        log=args.log,
     ):
         display_cpr(slug, cpr)
         if cpr.returnstate == CalledProcessState.EXCEPTION:
@@ -29,9 +35,8 @@ async def deploy(mkctf_api, args):
     return success
 
 
-def setup_deploy(subparsers):
+def setup_deploy(parser):
     """Setup deploy command"""
-    parser = subparsers.add_parser('deploy', help="deploy challenges")
     parser.add_argument(
         '--dev',
         action='store_true',
@@ -62,4 +67,26 @@ def setup_deploy(subparsers):
         default=DEFAULT_PROG_TIMEOUT,
         help="override default timeout for subprocesses",
     )
+    parser.add_argument(
+        '--jobs',
+        '-j',
+        type=int,
+        default=cpu_count() or 1,
+        help="count of deploy programs running concurrently, defaults to CPU count",
+    )
+    parser.add_argument(
+        '--follow',
+        action='store_true',
+        help="display program output lines as they are produced",
+    )
+    parser.add_argument(
+        '--log',
+        action='store_true',
+        help="write full program output to .mkctf/logs/<slug>/<program>.log.gz",
+    )
+    parser.add_argument(
+        '--keep-order',
+        action='store_true',
+        help="display results in challenge order instead of completion order",
+    )
     parser.set_defaults(func=deploy)
@@ -14,8 +14,7 @@ async def disable(mkctf_api, args):
     return disabled
 
 
-def setup_disable(subparsers):
+def setup_disable(parser):
     """Setup disable command"""
-    parser = subparsers.add_parser('disable', help="disable a challenge")
     parser.add_argument('slug', help="challenge's slug")
     parser.set_defaults(func=disable)
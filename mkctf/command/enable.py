@@ -14,8 +14,7 @@ async def enable(mkctf_api, args):
     return enabled
 
 
-def setup_enable(subparsers):
+def setup_enable(parser):
     """Setup enable command"""
-    parser = subparsers.add_parser('enable', help="enable a challenge")
     parser.add_argument('slug', help="challenge's slug")
     parser.set_defaults(func=enable)
@@ -18,9 +18,8 @@ async def enum(mkctf_api, args):
     return found
 
 
-def setup_enum(subparsers):
+def setup_enum(parser):
     """Setup enum command"""
-    parser = subparsers.add_parser('enum', help="enumerate challenges")
     parser.add_argument(
         '--summarize',
         action='store_true',
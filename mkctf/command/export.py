@@ -4,8 +4,11 @@
 from json import dumps
 from pathlib import Path
 
+from ..api.export import EXPORT_MAP
 from ..helper.logging import LOGGER
 
+MIB = 1024 * 1024
+
 
 async def export(mkctf_api, args):
     """Exports one or more challenges
@@ -14,30 +17,54 @@ async def export(mkctf_api, args):
     """
     LOGGER.info("exporting challenges...")
     export_directory = args.export_directory.resolve()
-    export_map = {
-        slug: str(archive_path)
-        for slug, archive_path in mkctf_api.export(
-            export_directory,
-            tags=args.tags,
-            categories=args.categories,
-            slug=args.slug,
-            export_disabled=args.export_disabled,
+    export_map = {}
+    files_size, archive_size, elapsed_ns = 0, 0, 0
+    for slug, result in mkctf_api.export(
+        export_directory,
+        tags=args.tags,
+        categories=args.categories,
+        slug=args.slug,
+        export_disabled=args.export_disabled,
+        jobs=args.jobs,
+        force=args.force,
+        reproducible=args.reproducible,
+        blobs=args.blobs,
+    ):
+        export_map[slug] = str(result.archive_path)
+        if result.reused:
+            continue
+        LOGGER.info(
+            "exported %s (%s, ratio %.3f, %.1f MiB/s)",
+            slug,
+            result.fingerprint.compression['format'],
+            result.ratio,
+            result.throughput / MIB,
+        )
+        files_size += result.fingerprint.files_size
+        archive_size += result.fingerprint.archive_size
+        elapsed_ns += result.elapsed_ns
+    if elapsed_ns:
+        LOGGER.info(
+            "compressed %.1f MiB to %.1f MiB (ratio %.3f, %.1f MiB/s)",
+            files_size / MIB,
+            archive_size / MIB,
+            archive_size / (files_size or 1),
+            files_size * 1e9 / elapsed_ns / MIB,
         )
-    }
     if not export_map:
         LOGGER.warning("export is empty")
         return False
     LOGGER.info("creating export.map...")
-    (export_directory / 'export.map').write_text(dumps(export_map))
+    export_map_path = export_directory / EXPORT_MAP
+    tmp_export_map_path = export_directory / f'.{EXPORT_MAP}.tmp'
+    tmp_export_map_path.write_text(dumps(export_map))
+    tmp_export_map_path.replace(export_map_path)
     LOGGER.info("export done")
     return True
 
 
-def setup_export(subparsers):
+def setup_export(parser):
     """Setup export command"""
-    parser = subparsers.add_parser(
-        'export', help="export public resources for each challenge"
-    )
     parser.add_argument(
         'export_directory',
         type=Path,
@@ -67,4 +94,27 @@ def setup_export(subparsers):
         action='store_true',
         help="also export disabled challenges",
     )
+    parser.add_argument(
+        '--jobs',
+        '-j',
+        type=int,
+        default=1,
+        help="count of worker processes creating archives concurrently",
+    )
+    parser.add_argument(
+        '--force',
+        '-f',
+        action='store_true',
+        help="create every archive again, even if its fingerprint did not change",
+    )
+    parser.add_argument(
+        '--reproducible',
+        action='store_true',
+        help="create byte-stable archives: sorted members, normalized metadata and fixed timestamps (SOURCE_DATE_EPOCH or 0)",
+    )
+    parser.add_argument(
+        '--blobs',
+        action='store_true',
+        help="compress each distinct public file once into .mkctf/cache/blobs and assemble archives from it",
+    )
     parser.set_defaults(func=export)
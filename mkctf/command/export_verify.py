@@ -0,0 +1,48 @@
+"""export-verify command
+"""
+
+from json import dumps
+from os import cpu_count
+from pathlib import Path
+
+from ..helper.logging import LOGGER
+
+
+async def export_verify(mkctf_api, args):
+    """Verifies an export directory and prints one JSON report per archive"""
+    LOGGER.info("verifying export...")
+    total, failed = 0, 0
+    for verification in mkctf_api.export_verify(
+        args.export_directory.resolve(), jobs=args.jobs
+    ):
+        total += 1
+        if not verification.ok:
+            failed += 1
+        print(dumps(verification.to_dict()), flush=True)
+    if not total:
+        LOGGER.warning("export map is empty")
+        return False
+    if failed:
+        LOGGER.error(
+            "%d out of %d archives failed verification", failed, total
+        )
+        return False
+    LOGGER.info("%d archives verified", total)
+    return True
+
+
+def setup_export_verify(parser):
+    """Setup export-verify command"""
+    parser.add_argument(
+        'export_directory',
+        type=Path,
+        help="folder where archives and export.map were written",
+    )
+    parser.add_argument(
+        '--jobs',
+        '-j',
+        type=int,
+        default=cpu_count() or 1,
+        help="count of threads verifying archives concurrently",
+    )
+    parser.set_defaults(func=export_verify)
@@ -0,0 +1,48 @@
+"""fetch command
+"""
+
+from pathlib import Path
+
+from ..helper.logging import LOGGER
+
+
+async def fetch(mkctf_api, args):
+    """Fetches members of a challenge archive without downloading it"""
+    async with mkctf_api.fetch(slug=args.slug, url=args.url) as remote_zip:
+        if args.list:
+            for member in (await remote_zip.members()).values():
+                print(f"{member.file_size}\t{member.name}")
+            return True
+        if not args.members:
+            LOGGER.warning("no member to fetch")
+            return False
+        args.output_directory.mkdir(parents=True, exist_ok=True)
+        for name in args.members:
+            LOGGER.info("fetching %s...", name)
+            filepath = args.output_directory / Path(name).name
+            filepath.write_bytes(await remote_zip.read(name))
+            LOGGER.info("%s written to %s", name, filepath)
+    return True
+
+
+def setup_fetch(parser):
+    """Setup fetch command"""
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        '-s', '--slug', help="challenge's slug, its static url is used"
+    )
+    source.add_argument('-u', '--url', help="zip archive url")
+    parser.add_argument(
+        '--list', '-l', action='store_true', help="list archive members"
+    )
+    parser.add_argument(
+        '--output-directory',
+        '-o',
+        type=Path,
+        default=Path.cwd(),
+        help="folder where fetched members are written",
+    )
+    parser.add_argument(
+        'members', nargs='*', metavar='MEMBER', help="member to fetch"
+    )
+    parser.set_defaults(func=fetch)
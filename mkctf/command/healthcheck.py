@@ -1,8 +1,10 @@
 """healthcheck command
 """
 
+from os import cpu_count
+
 from ..helper.cli import Answer, confirm
-from ..helper.display import display_cpr
+from ..helper.display import display_cpr, display_line
 from ..helper.logging import LOGGER
 from ..helper.subprocess import DEFAULT_PROG_TIMEOUT, CalledProcessState
 
@@ -17,12 +19,16 @@ async def healthcheck(mkctf_api, args):
         LOGGER.warning("operation cancelled by user.")
         return False
     success = True
-    async for slug, cpr in mkctf_api.build(
+    async for slug, cpr in mkctf_api.healthcheck(
         tags=args.tags,
         categories=args.categories,
         slug=args.slug,
         dev=args.dev,
         timeout=args.timeout,
+        jobs=args.jobs,
+        keep_order=args.keep_order,
+        on_line=display_line if args.follow else None,
+        log=args.log,
     ):
         display_cpr(slug, cpr)
         if cpr.returnstate == CalledProcessState.EXCEPTION:
@@ -30,12 +36,8 @@ async def healthcheck(mkctf_api, args):
     return success
 
 
-def setup_healthcheck(subparsers):
+def setup_healthcheck(parser):
     """Setup healthcheck command"""
-    parser = subparsers.add_parser(
-        'healthcheck',
-        help="perform a healthcheck on a challenge using healthcheck script",
-    )
     parser.add_argument(
         '--dev',
         action='store_true',
@@ -66,4 +68,26 @@ def setup_healthcheck(subparsers):
         default=DEFAULT_PROG_TIMEOUT,
         help="override default timeout for subprocesses",
     )
+    parser.add_argument(
+        '--jobs',
+        '-j',
+        type=int,
+        default=cpu_count() or 1,
+        help="count of healthcheck programs running concurrently, defaults to CPU count",
+    )
+    parser.add_argument(
+        '--follow',
+        action='store_true',
+        help="display program output lines as they are produced",
+    )
+    parser.add_argument(
+        '--log',
+        action='store_true',
+        help="write full program output to .mkctf/logs/<slug>/<program>.log.gz",
+    )
+    parser.add_argument(
+        '--keep-order',
+        action='store_true',
+        help="display results in challenge order instead of completion order",
+    )
     parser.set_defaults(func=healthcheck)
@@ -0,0 +1,37 @@
+"""index command
+"""
+
+from ..helper.logging import LOGGER
+
+
+async def index(mkctf_api, args):
+    """Updates, rebuilds or verifies challenge index"""
+    if not args.verify:
+        count = mkctf_api.index(rebuild=args.rebuild)
+        LOGGER.info("%d challenges indexed", count)
+        return True
+    # verify index as written on disk, updating it first would hide problems
+    problems = mkctf_api.index_verify()
+    for key, problem in problems:
+        LOGGER.warning("%s: %s", key, problem)
+    if problems:
+        LOGGER.warning("index is inconsistent")
+    else:
+        LOGGER.info("index is consistent")
+    return not problems
+
+
+def setup_index(parser):
+    """Setup index command"""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        '--rebuild',
+        action='store_true',
+        help="drop existing index entries and parse every challenge again",
+    )
+    group.add_argument(
+        '--verify',
+        action='store_true',
+        help="check that index is consistent with challenge configurations without updating it",
+    )
+    parser.set_defaults(func=index)
@@ -14,7 +14,6 @@ async def init(mkctf_api, _):
     return initialized
 
 
-def setup_init(subparsers):
+def setup_init(parser):
     """Setup init command"""
-    parser = subparsers.add_parser('init', help="initialize mkctf repository")
     parser.set_defaults(func=init)
@@ -28,11 +28,8 @@ async def push(mkctf_api, args):
     return pushed
 
 
-def setup_push(subparsers):
+def setup_push(parser):
     """Setup push command"""
-    parser = subparsers.add_parser(
-        'push', help="push challenges configuration to the dashboard API"
-    )
     parser.add_argument(
         '--host',
         default=getenv('MKCTF_API_HOST', 'dashboard.example.ctf'),
@@ -0,0 +1,69 @@
+"""query command
+"""
+
+from json import dumps
+
+from ..api.query import AGGREGATE_FUNCTIONS, CATALOG_COLUMNS
+from ..helper.logging import LOGGER
+
+
+async def query(mkctf_api, args):
+    """Queries challenges and prints one JSON row per line"""
+    found = False
+    for row in mkctf_api.query(
+        expression=args.expression,
+        columns=args.columns,
+        group_by=args.group_by,
+        aggregates=args.aggregates,
+    ):
+        found = True
+        print(dumps(row), flush=True)
+    if not found:
+        LOGGER.warning("no challenge found")
+    return found
+
+
+def setup_query(parser):
+    """Setup query command"""
+    parser.add_argument(
+        '--column',
+        '-C',
+        action='append',
+        default=[],
+        dest='columns',
+        choices=CATALOG_COLUMNS,
+        metavar='COLUMN',
+        help="column to print, can appear multiple times",
+    )
+    parser.add_argument(
+        '--group-by',
+        '-g',
+        action='append',
+        default=[],
+        dest='group_by',
+        choices=CATALOG_COLUMNS,
+        metavar='COLUMN',
+        help="column to group rows by, can appear multiple times",
+    )
+    parser.add_argument(
+        '--aggregate',
+        '-a',
+        action='append',
+        default=[],
+        dest='aggregates',
+        metavar='AGGREGATE',
+        help=(
+            "aggregate computed for each group, 'count' or "
+            f"'function(column)' with function in {', '.join(AGGREGATE_FUNCTIONS)}, "
+            "can appear multiple times"
+        ),
+    )
+    parser.add_argument(
+        'expression',
+        nargs='?',
+        help=(
+            "filter expression, "
+            "e.g. \"enabled and tags has 'pwn' and points > 300\""
+        ),
+    )
+    parser.set_defaults(func=query)
@@ -14,14 +14,16 @@ async def renew_flag(mkctf_api, args):
     ):
         LOGGER.warning("operation cancelled by user")
         return False
-    renewed = list(
-        mkctf_api.renew_flag(
-            tags=args.tags,
-            categories=args.categories,
-            slug=args.slug,
-            size=args.size,
+    with mkctf_api.batch() as batch:
+        renewed = list(
+            mkctf_api.renew_flag(
+                tags=args.tags,
+                categories=args.categories,
+                slug=args.slug,
+                size=args.size,
+                batch=batch,
+            )
         )
-    )
     if renewed:
         LOGGER.info("challenge flag renewed")
     else:
@@ -29,12 +31,8 @@ async def renew_flag(mkctf_api, args):
     return bool(renewed)
 
 
-def setup_renew_flag(subparsers):
+def setup_renew_flag(parser):
     """Setup renew-flag command"""
-    parser = subparsers.add_parser(
-        'renew-flag',
-        help="renew flags. You might want to build and deploy/export after that",
-    )
     parser.add_argument(
         '--tag',
         '-t',
@@ -0,0 +1,24 @@
+"""snapshot command
+"""
+
+from pathlib import Path
+
+from ..helper.logging import LOGGER
+
+
+async def snapshot(mkctf_api, args):
+    """Writes a read-only snapshot of the repository"""
+    filepath, count = mkctf_api.snapshot(args.output)
+    LOGGER.info("snapshot of %d challenges written to %s", count, filepath)
+    return True
+
+
+def setup_snapshot(parser):
+    """Setup snapshot command"""
+    parser.add_argument(
+        '--output',
+        '-o',
+        type=Path,
+        help="snapshot file path, defaults to .mkctf/snapshot.bin",
+    )
+    parser.set_defaults(func=snapshot)
@@ -6,11 +6,15 @@ from ..helper.logging import LOGGER
 
 async def update_meta(mkctf_api, args):
     """update-meta command"""
-    updated = list(
-        mkctf_api.update_meta(
-            tags=args.tags, categories=args.categories, slug=args.slug
+    with mkctf_api.batch() as batch:
+        updated = list(
+            mkctf_api.update_meta(
+                tags=args.tags,
+                categories=args.categories,
+                slug=args.slug,
+                batch=batch,
+            )
         )
-    )
     if updated:
         LOGGER.info("challenge metadata updated")
     else:
@@ -18,12 +22,8 @@ async def update_meta(mkctf_api, args):
     return bool(updated)
 
 
-def setup_update_meta(subparsers):
+def setup_update_meta(parser):
     """Setup update-meta command"""
-    parser = subparsers.add_parser(
-        'update-meta',
-        help="update challenge metadata. You might want to run this command after reconfiguring the repository",
-    )
     parser.add_argument(
         '--tag',
         '-t',
@@ -0,0 +1,459 @@
+"""Archive helper
+"""
+
+from collections.abc import Iterator
+from hashlib import sha256
+from io import BytesIO
+from pathlib import Path
+from stat import S_IFREG
+from tarfile import BLOCKSIZE, PAX_FORMAT, RECORDSIZE, TarInfo
+from tarfile import open as tarfile_open
+from time import gmtime, localtime, time
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile, ZipInfo
+
+from .blobstore import BlobStore
+from .checksum import HASH_BUFSIZE
+from .compression import (
+    CompressionBackend,
+    GzipBackend,
+    ZipBackend,
+    compression_backend_of,
+)
+from .logging import LOGGER
+
+# zip timestamps cannot represent dates before 1980
+ZIP_EPOCH = 315532800
+
+
+class _TeeReader:
+    """Read from fileobj, updating digest with data read"""
+
+    def __init__(self, fileobj, digest):
+        self._fileobj = fileobj
+        self._digest = digest
+
+    def read(self, size=-1):
+        data = self._fileobj.read(size)
+        self._digest.update(data)
+        return data
+
+
+class _TeeWriter:
+    """Write to fileobj, updating digest with data written"""
+
+    def __init__(self, fileobj, digest, name: str):
+        self.name = name
+        self._fileobj = fileobj
+        self._digest = digest
+
+    def write(self, data):
+        self._digest.update(data)
+        return self._fileobj.write(data)
+
+    def flush(self):
+        self._fileobj.flush()
+
+
+class ArchiveWriter:
+    """Streaming compressed tar archive writer
+
+    Each file is hashed while it is written to the archive and the archive
+    itself is hashed while it is written to filepath, so no file is read
+    twice. name is the archive name stored in compressed data header, backend
+    defaults to gzip. Use it as a context manager, hexdigest is available
+    once the archive is closed.
+
+    When mtime is given, archive is reproducible: members metadata is
+    normalized (owner, timestamps, permissions) and mtime is used as
+    compressed data header timestamp.
+    """
+
+    def __init__(
+        self,
+        filepath: Path,
+        name: str,
+        backend: CompressionBackend | None = None,
+        mtime: int | None = None,
+    ):
+        self.filepath = filepath
+        self.name = name
+        self.backend = backend or GzipBackend()
+        self.mtime = mtime
+        self.hexdigest = None
+        self._digest = sha256()
+        self._fstream = None
+        self._stream = None
+        self._arch = None
+
+    def __enter__(self):
+        self._fstream = self.filepath.open('wb')
+        try:
+            self._stream = self.backend.open(
+                _TeeWriter(self._fstream, self._digest, self.name),
+                self.name,
+                self.mtime,
+            )
+            self._arch = tarfile_open(mode='w', fileobj=self._stream)
+            self._arch.copybufsize = HASH_BUFSIZE
+        except:
+            self._fstream.close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self._arch.close()
+            self._stream.close()
+        finally:
+            self._fstream.close()
+        self.hexdigest = self._digest.hexdigest()
+
+    def _normalize(self, tarinfo: TarInfo) -> TarInfo:
+        if self.mtime is None:
+            return tarinfo
+        tarinfo.mtime = self.mtime
+        tarinfo.uid = tarinfo.gid = 0
+        tarinfo.uname = tarinfo.gname = ''
+        tarinfo.mode = 0o755 if tarinfo.mode & 0o111 else 0o644
+        return tarinfo
+
+    def add(self, filepath: Path, arcname: str) -> str:
+        """Add file to archive and return its SHA-256 hex digest"""
+        digest = sha256()
+        LOGGER.debug("adding %s to archive...", filepath)
+        tarinfo = self._normalize(
+            self._arch.gettarinfo(str(filepath), arcname=arcname)
+        )
+        with filepath.open('rb') as fstream:
+            self._arch.addfile(tarinfo, _TeeReader(fstream, digest))
+        return digest.hexdigest()
+
+    def add_bytes(self, arcname: str, data: bytes):
+        """Add in-memory data to archive as a regular file"""
+        LOGGER.debug("adding %s to archive...", arcname)
+        tarinfo = TarInfo(arcname)
+        tarinfo.size = len(data)
+        tarinfo.mtime = int(time())
+        tarinfo.mode = 0o644
+        self._arch.addfile(self._normalize(tarinfo), BytesIO(data))
+
+
+class ZipArchiveWriter:
+    """Streaming zip archive writer
+
+    Members are deflated independently and listed in a central directory at
+    the end of the archive, so a single member can be fetched without
+    downloading the whole archive. It has the same interface and hashing
+    behavior as ArchiveWriter.
+    """
+
+    def __init__(
+        self,
+        filepath: Path,
+        name: str,
+        backend: CompressionBackend | None = None,
+        mtime: int | None = None,
+    ):
+        self.filepath = filepath
+        self.name = name
+        self.backend = backend or ZipBackend()
+        self.mtime = mtime
+        self.hexdigest = None
+        self._digest = sha256()
+        self._fstream = None
+        self._zip = None
+
+    def __enter__(self):
+        self._fstream = self.filepath.open('wb')
+        try:
+            # output is not seekable: members sizes and CRC are written in
+            # data descriptors and central directory
+            self._zip = ZipFile(
+                _TeeWriter(self._fstream, self._digest, self.name),
+                mode='w',
+                compression=ZIP_DEFLATED if self.backend.level else ZIP_STORED,
+                compresslevel=self.backend.level or None,
+            )
+        except:
+            self._fstream.close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self._zip.close()
+        finally:
+            self._fstream.close()
+        self.hexdigest = self._digest.hexdigest()
+
+    def _zipinfo(self, arcname: str, size: int, mtime: float, mode: int):
+        if self.mtime is None:
+            date_time = localtime(max(mtime, ZIP_EPOCH))[:6]
+        else:
+            date_time = gmtime(max(self.mtime, ZIP_EPOCH))[:6]
+        zinfo = ZipInfo(arcname, date_time=date_time)
+        zinfo.file_size = size
+        zinfo.compress_type = self._zip.compression
+        # ZipFile.open does not apply archive compression level by itself
+        zinfo._compresslevel = self._zip.compresslevel
+        zinfo.external_attr = (
+            S_IFREG | (0o755 if mode & 0o111 else 0o644)
+        ) << 16
+        return zinfo
+
+    def add(self, filepath: Path, arcname: str) -> str:
+        """Add file to archive and return its SHA-256 hex digest"""
+        digest = sha256()
+        LOGGER.debug("adding %s to archive...", filepath)
+        stat = filepath.stat()
+        zinfo = self._zipinfo(
+            arcname, stat.st_size, stat.st_mtime, stat.st_mode
+        )
+        with filepath.open('rb') as fstream, self._zip.open(
+            zinfo, mode='w'
+        ) as zstream:
+            while True:
+                data = fstream.read(HASH_BUFSIZE)
+                if not data:
+                    break
+                digest.update(data)
+                zstream.write(data)
+        return digest.hexdigest()
+
+    def add_bytes(self, arcname: str, data: bytes):
+        """Add in-memory data to archive as a regular file"""
+        LOGGER.debug("adding %s to archive...", arcname)
+        self._zip.writestr(
+            self._zipinfo(arcname, len(data), time(), 0o644), data
+        )
+
+
+class SegmentedArchiveWriter:
+    """Compressed tar archive writer assembling archives from blobs
+
+    Each file data is compressed once into a separate compressed stream
+    stored in blob_store, keyed by its SHA-256 hex digest and compression
+    settings. Archives are assembled by concatenating compressed tar headers
+    and compressed file data: gzip members, xz streams and zstd frames can
+    be concatenated, so files shared by several archives are compressed only
+    once. Members metadata is always normalized (owner and permissions), it
+    has the same interface as ArchiveWriter otherwise.
+    """
+
+    def __init__(
+        self,
+        filepath: Path,
+        name: str,
+        blob_store: BlobStore,
+        backend: CompressionBackend | None = None,
+        mtime: int | None = None,
+    ):
+        self.filepath = filepath
+        self.name = name
+        self.blob_store = blob_store
+        self.backend = backend or GzipBackend()
+        self.mtime = mtime
+        self.hexdigest = None
+        self._namespace = '-'.join(
+            str(value) for value in self.backend.settings().values()
+        )
+        self._digest = sha256()
+        self._offset = 0
+        self._fstream = None
+
+    def __enter__(self):
+        self._fstream = self.filepath.open('wb')
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                # end of archive marker then padding to a record boundary
+                end = self._offset + 2 * BLOCKSIZE
+                end += -end % RECORDSIZE
+                self._write(bytes(end - self._offset))
+        finally:
+            self._fstream.close()
+        self.hexdigest = self._digest.hexdigest()
+
+    def _emit(self, data: bytes):
+        self._digest.update(data)
+        self._fstream.write(data)
+
+    def _compress(self, data: bytes) -> bytes:
+        sink = BytesIO()
+        stream = self.backend.open(sink, '', 0)
+        stream.write(data)
+        stream.close()
+        return sink.getvalue()
+
+    def _write(self, data: bytes):
+        """Write compressed data, offset tracks uncompressed tar offset"""
+        self._emit(self._compress(data))
+        self._offset += len(data)
+
+    def _write_header(self, arcname: str, size: int, mtime: int, mode: int):
+        tarinfo = TarInfo(arcname)
+        tarinfo.size = size
+        tarinfo.mtime = mtime if self.mtime is None else self.mtime
+        tarinfo.mode = 0o755 if mode & 0o111 else 0o644
+        self._write(tarinfo.tobuf(PAX_FORMAT, 'utf-8', 'surrogateescape'))
+
+    def _create_blob(self, filepath: Path) -> tuple[str, int, Path]:
+        """Compress file data and its padding into a blob
+
+        File is read once, its SHA-256 hex digest and size are computed
+        from the data which was compressed.
+        """
+        digest = sha256()
+        tmp_path = self.blob_store.tmp_path(self._namespace)
+        try:
+            with tmp_path.open('wb') as bstream:
+                stream = self.backend.open(bstream, '', 0)
+                size = 0
+                with filepath.open('rb') as fstream:
+                    while True:
+                        data = fstream.read(HASH_BUFSIZE)
+                        if not data:
+                            break
+                        digest.update(data)
+                        stream.write(data)
+                        size += len(data)
+                stream.write(bytes(-size % BLOCKSIZE))
+                stream.close()
+            hexdigest = digest.hexdigest()
+            return (
+                hexdigest,
+                size,
+                self.blob_store.put(self._namespace, hexdigest, tmp_path),
+            )
+        except:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    def add(
+        self, filepath: Path, arcname: str, hexdigest: str | None = None
+    ) -> str:
+        """Add file to archive and return its SHA-256 hex digest
+
+        When hexdigest of file content is known and its blob exists, file is
+        not read at all. Otherwise file is read once to create its blob.
+        """
+        LOGGER.debug("adding %s to archive...", filepath)
+        stat = filepath.stat()
+        size = stat.st_size
+        blob_path = None
+        if hexdigest is not None:
+            blob_path = self.blob_store.find(self._namespace, hexdigest)
+        if blob_path is None:
+            LOGGER.debug("compressing %s into blob store...", filepath)
+            hexdigest, size, blob_path = self._create_blob(filepath)
+        # header size must match blob data, not a later stat of the file
+        self._write_header(arcname, size, int(stat.st_mtime), stat.st_mode)
+        with blob_path.open('rb') as bstream:
+            while True:
+                data = bstream.read(HASH_BUFSIZE)
+                if not data:
+                    break
+                self._emit(data)
+        self._offset += size + -size % BLOCKSIZE
+        return hexdigest
+
+    def add_bytes(self, arcname: str, data: bytes):
+        """Add in-memory data to archive as a regular file"""
+        LOGGER.debug("adding %s to archive...", arcname)
+        self._write_header(arcname, len(data), int(time()), 0o644)
+        self._write(data + bytes(-len(data) % BLOCKSIZE))
+
+
+def _read_member(fstream, keep: bool) -> tuple[str, bytes | None]:
+    """Hash member data and return hex digest and data if keep is True"""
+    digest = sha256()
+    chunks = [] if keep else None
+    while True:
+        data = fstream.read(HASH_BUFSIZE)
+        if not data:
+            break
+        digest.update(data)
+        if keep:
+            chunks.append(data)
+    return digest.hexdigest(), (b''.join(chunks) if keep else None)
+
+
+class ArchiveReader:
+    """Streaming archive reader
+
+    Archive is read without extracting it: each regular member is hashed
+    while it is decompressed and the archive itself is hashed while it is
+    read. Compressed tar archives are read once, zip archives are hashed
+    once their members were read. Use it as a context manager, hexdigest is
+    available once the archive is closed.
+    """
+
+    def __init__(self, filepath: Path):
+        self.filepath = filepath
+        self.hexdigest = None
+        self._digest = sha256()
+        self._fstream = None
+        self._tee = None
+        self._arch = None
+        self._zip = None
+
+    def __enter__(self):
+        self._fstream = self.filepath.open('rb')
+        try:
+            backend_cls = compression_backend_of(self.filepath.name)
+            self._tee = _TeeReader(self._fstream, self._digest)
+            if backend_cls.container == 'zip':
+                self._zip = ZipFile(self._fstream)
+            else:
+                self._arch = tarfile_open(
+                    mode='r|',
+                    fileobj=backend_cls.reader(self._tee),
+                    bufsize=HASH_BUFSIZE,
+                )
+        except:
+            self._fstream.close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if self._zip:
+                self._zip.close()
+                self._fstream.seek(0)
+            else:
+                self._arch.close()
+            if exc_type is None:
+                # hash data left unread by decompressor
+                while self._tee.read(HASH_BUFSIZE):
+                    pass
+        finally:
+            self._fstream.close()
+        self.hexdigest = self._digest.hexdigest()
+
+    def members(
+        self, keep: set[str] | frozenset[str] = frozenset()
+    ) -> Iterator[tuple[str, str | None, bytes | None]]:
+        """Yield (name, hexdigest, data) of each member
+
+        hexdigest is None for members which are not regular files, data is
+        None unless member name is in keep.
+        """
+        if self._zip:
+            for zinfo in self._zip.infolist():
+                if zinfo.is_dir():
+                    yield zinfo.filename, None, None
+                    continue
+                with self._zip.open(zinfo) as fstream:
+                    yield zinfo.filename, *_read_member(
+                        fstream, zinfo.filename in keep
+                    )
+            return
+        for tarinfo in self._arch:
+            if not tarinfo.isfile():
+                yield tarinfo.name, None, None
+                continue
+            yield tarinfo.name, *_read_member(
+                self._arch.extractfile(tarinfo), tarinfo.name in keep
+            )
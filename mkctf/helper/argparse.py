@@ -1,10 +1,19 @@
 """mkctf custom argument parser
 """
 
+from os import getenv
 from pathlib import Path
 
+from ..api.config import config_enable_sidecar
 from .logging import LOGGER, log_enable_debug, log_enable_logging
 
+TRUTHY_VALUES = {'1', 'true', 'yes', 'on'}
+
+
+def _getenv_flag(name: str) -> bool:
+    """Determine if environment variable is set to a truthy value"""
+    return getenv(name, '').strip().lower() in TRUTHY_VALUES
+
 
 def generic_add_arguments(parser):
     parser.add_argument(
@@ -20,6 +29,18 @@ def generic_add_arguments(parser):
         default=Path.cwd(),
         help="absolute path of a mkCTF repository directory",
     )
+    parser.add_argument(
+        '--scan-workers',
+        type=int,
+        default=int(getenv('MKCTF_SCAN_WORKERS', '0')),
+        help="load challenge configurations concurrently using this many threads, overrides MKCTF_SCAN_WORKERS (env)",
+    )
+    parser.add_argument(
+        '--config-sidecar',
+        action='store_true',
+        default=_getenv_flag('MKCTF_CONFIG_SIDECAR'),
+        help="keep a binary copy of parsed configuration files next to them, enabled by MKCTF_CONFIG_SIDECAR=1 (env)",
+    )
 
 
 def generic_parse_args(parser):
@@ -27,5 +48,6 @@ def generic_parse_args(parser):
     args = parser.parse_args()
     log_enable_debug(args.debug)
     log_enable_logging(not args.quiet)
+    config_enable_sidecar(args.config_sidecar)
     LOGGER.debug(args)
     return args
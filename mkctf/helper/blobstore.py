@@ -0,0 +1,63 @@
+"""Blob store helper
+"""
+
+from dataclasses import dataclass
+from os import getpid
+from pathlib import Path
+from threading import get_ident
+
+from .logging import LOGGER
+
+
+@dataclass
+class BlobStore:
+    """Content-addressed blob store
+
+    Blobs are grouped by namespace and named after the SHA-256 hex digest of
+    the content they were derived from. Blobs are published using an atomic
+    rename so that concurrent writers never expose a partial blob.
+    """
+
+    directory: Path
+
+    def path(self, namespace: str, hexdigest: str) -> Path:
+        """Path of blob"""
+        return self.directory / namespace / hexdigest[:2] / hexdigest
+
+    def find(self, namespace: str, hexdigest: str) -> Path | None:
+        """Path of blob, None if blob does not exist"""
+        blob_path = self.path(namespace, hexdigest)
+        return blob_path if blob_path.is_file() else None
+
+    def tmp_path(self, namespace: str) -> Path:
+        """Temporary path where a blob of namespace can be written"""
+        directory = self.directory / namespace
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory / f'.{getpid()}.{get_ident()}.tmp'
+
+    def put(self, namespace: str, hexdigest: str, tmp_path: Path) -> Path:
+        """Publish blob written to tmp_path and return its path"""
+        blob_path = self.path(namespace, hexdigest)
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.replace(blob_path)
+        return blob_path
+
+    def prune(self, keep: set[str]) -> tuple[int, int]:
+        """Delete blobs whose hex digest is not in keep
+
+        Return the count and total size of deleted blobs. Temporary files are
+        left alone: they may belong to a concurrent writer.
+        """
+        count, size = 0, 0
+        for blob_path in self.directory.glob('*/??/*'):
+            if blob_path.name in keep:
+                continue
+            try:
+                blob_size = blob_path.stat().st_size
+                blob_path.unlink()
+            except OSError as exc:
+                LOGGER.warning("failed to prune blob %s (%s)", blob_path, exc)
+                continue
+            count += 1
+            size += blob_size
+        return count, size
@@ -1,23 +1,49 @@
 """checksum helper
 """
 
+from collections.abc import Callable
 from dataclasses import dataclass, field
 from hashlib import sha1, sha256
 from pathlib import Path
 
 from .logging import LOGGER
 
+# hashlib releases the GIL while hashing large slices, reading large chunks
+# also keeps Python-level iterations count low for large files
+HASH_BUFSIZE = 1024 * 1024
+
 
 def sha1_hexdigest(data: bytes) -> str:
     """Compute and return data SHA-1 hex digest"""
     return sha1(data).hexdigest()
 
 
+def sha256_file_hexdigest(filepath: Path) -> str:
+    """Compute and return file SHA-256 hex digest"""
+    mdigest = sha256()
+    LOGGER.debug("computing SHA256 sum of %s", filepath)
+    buffer = bytearray(HASH_BUFSIZE)
+    view = memoryview(buffer)
+    with filepath.open('rb', buffering=0) as fstream:
+        while True:
+            size = fstream.readinto(buffer)
+            if not size:
+                break
+            mdigest.update(view[:size])
+    return mdigest.hexdigest()
+
+
 @dataclass
 class ChecksumFile:
-    """Represent a checksum file"""
+    """Represent a checksum file
+
+    hash_func computes file hashes, it can be a hash cache lookup
+    """
 
     hashes: list[tuple[str, str]] = field(default_factory=list)
+    hash_func: Callable[[Path], str] = field(
+        default=sha256_file_hexdigest, repr=False
+    )
 
     @property
     def content(self):
@@ -29,21 +55,20 @@ class ChecksumFile:
             ]
         )
 
-    def add(self, filepath: Path):
-        """[summary]"""
-        mdigest = sha256()
-        LOGGER.debug("computing SHA256 sum of %s", filepath)
-        with filepath.open('rb') as fstream:
-            while True:
-                data = fstream.read(4096)
-                if not data:
-                    break
-                mdigest.update(data)
-        self.hashes.append((mdigest.hexdigest(), filepath.name))
+    def add(self, filepath: Path, hexdigest: str | None = None):
+        """Add filepath, hexdigest is computed unless given"""
+        hexdigest = hexdigest or self.hash_func(filepath)
+        self.hashes.append((hexdigest, filepath.name))
 
     def load(self, filepath: Path):
         """Load hashes from file"""
-        for line in filepath.read_text().split('\n'):
+        self.loads(filepath.read_text())
+
+    def loads(self, content: str):
+        """Load hashes from content"""
+        for line in content.split('\n'):
+            if not line:
+                continue
             hexdigest, filename = line.split('\t', maxsplit=1)
             self.hashes.append((hexdigest, filename))
 
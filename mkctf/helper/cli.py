@@ -4,8 +4,6 @@
 import re
 from enum import Enum
 
-from pick import pick
-
 from .logging import LOGGER
 
 INT_RE = re.compile(r'[\-]?[0-9]+')
@@ -92,6 +90,8 @@ def choose(choices, title, multi=False, min_count=1, custom=False):
 
     You can also allow tht user to enter a custom value
     """
+    from pick import pick
+
     sep = '=' * ((78 - len(title)) // 2)
     title = f'{sep} {title} {sep}'
     text = [title]
@@ -0,0 +1,331 @@
+"""Compression helper
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from os import cpu_count
+from struct import pack
+from time import time
+from zlib import (
+    DEFLATED,
+    MAX_WBITS,
+    Z_FINISH,
+    Z_SYNC_FLUSH,
+    compressobj,
+    crc32,
+)
+
+from .exception import MKCTFAPIException
+
+# parallel gzip block size and dictionary size, same as pigz
+PGZ_BLOCK_SIZE = 128 * 1024
+PGZ_DICT_SIZE = 32 * 1024
+
+
+class _PlainWriter:
+    """Write to fileobj without compression, leaving fileobj open on close"""
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._size = 0
+
+    def write(self, data):
+        self._size += len(data)
+        return self._fileobj.write(data)
+
+    def tell(self):
+        return self._size
+
+    def close(self):
+        pass
+
+
+def _deflate_block(block: bytes, dictionary: bytes, level: int, last: bool):
+    """Compress block as raw deflate data primed with dictionary
+
+    Non-last blocks end with a sync flush, so compressed blocks can be
+    concatenated into a single deflate stream.
+    """
+    if dictionary:
+        compressor = compressobj(level, DEFLATED, -MAX_WBITS, zdict=dictionary)
+    else:
+        compressor = compressobj(level, DEFLATED, -MAX_WBITS)
+    data = compressor.compress(block)
+    return data + compressor.flush(Z_FINISH if last else Z_SYNC_FLUSH)
+
+
+class _ParallelGzipWriter:
+    """Write a single member gzip stream, compressing blocks concurrently
+
+    Each block is compressed by a worker thread using the end of previous
+    block as dictionary, like pigz does. zlib releases the GIL while
+    compressing, CRC is computed in calling thread.
+    """
+
+    def __init__(
+        self,
+        fileobj,
+        name: str,
+        level: int,
+        threads: int,
+        mtime: int | None,
+    ):
+        self._fileobj = fileobj
+        self._level = level
+        self._threads = threads
+        self._crc = 0
+        self._size = 0
+        self._buffer = bytearray()
+        self._dictionary = b''
+        self._pending = deque()
+        self._executor = ThreadPoolExecutor(max_workers=threads)
+        fname = name.encode('latin-1', 'replace').removesuffix(b'.gz')
+        xfl = {1: 4, 9: 2}.get(level, 0)
+        mtime = int(time()) if mtime is None else mtime
+        fileobj.write(pack('<BBBBIBB', 0x1F, 0x8B, 8, 8, mtime, xfl, 255))
+        fileobj.write(fname + b'\0')
+
+    def _submit(self, block: bytes, last: bool):
+        self._pending.append(
+            self._executor.submit(
+                _deflate_block, block, self._dictionary, self._level, last
+            )
+        )
+        self._dictionary = block[-PGZ_DICT_SIZE:]
+        # bound memory usage: keep at most two blocks per thread in flight
+        while len(self._pending) > 2 * self._threads:
+            self._fileobj.write(self._pending.popleft().result())
+
+    def write(self, data):
+        self._crc = crc32(data, self._crc)
+        self._size += len(data)
+        self._buffer += data
+        while len(self._buffer) >= PGZ_BLOCK_SIZE:
+            block = bytes(self._buffer[:PGZ_BLOCK_SIZE])
+            del self._buffer[:PGZ_BLOCK_SIZE]
+            self._submit(block, last=False)
+        return len(data)
+
+    def tell(self):
+        return self._size
+
+    def close(self):
+        try:
+            self._submit(bytes(self._buffer), last=True)
+            self._buffer.clear()
+            while self._pending:
+                self._fileobj.write(self._pending.popleft().result())
+            self._fileobj.write(
+                pack('<II', self._crc, self._size & 0xFFFFFFFF)
+            )
+        finally:
+            self._executor.shutdown()
+
+
+class CompressionBackend:
+    """Compression backend
+
+    Backends create a writable stream compressing data to a file object.
+    Closing the stream finishes compression but leaves file object open.
+    """
+
+    name = ''
+    extension = ''
+    container = 'tar'
+    levels = range(0)
+    default_level = None
+
+    def __init__(self, level: int | None = None, threads: int = 1):
+        if level is None:
+            level = self.default_level
+        if self.levels and level not in self.levels:
+            raise MKCTFAPIException(
+                f"invalid {self.name} compression level: {level}"
+            )
+        self.level = level
+        self.threads = threads if threads > 0 else (cpu_count() or 1)
+
+    def settings(self) -> dict:
+        """Settings affecting compressed data"""
+        return {'format': self.name, 'level': self.level}
+
+    def open(self, fileobj, name: str, mtime: int | None = None):
+        """Create a compressing stream writing to fileobj
+
+        name and mtime are stored in compressed data header when the format
+        has one, mtime defaults to current time.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def reader(cls, fileobj):
+        """Create a decompressing stream reading from fileobj"""
+        raise NotImplementedError
+
+
+class TarBackend(CompressionBackend):
+    """Uncompressed tar, for already compressed data"""
+
+    name = 'tar'
+    extension = '.tar'
+
+    def open(self, fileobj, name: str, mtime: int | None = None):
+        return _PlainWriter(fileobj)
+
+    @classmethod
+    def reader(cls, fileobj):
+        return fileobj
+
+
+class GzipBackend(CompressionBackend):
+    """Single-threaded gzip"""
+
+    name = 'gz'
+    extension = '.tar.gz'
+    levels = range(0, 10)
+    default_level = 9
+
+    def open(self, fileobj, name: str, mtime: int | None = None):
+        from gzip import GzipFile
+
+        return GzipFile(
+            filename=name,
+            mode='wb',
+            compresslevel=self.level,
+            fileobj=fileobj,
+            mtime=mtime,
+        )
+
+    @classmethod
+    def reader(cls, fileobj):
+        from gzip import GzipFile
+
+        return GzipFile(mode='rb', fileobj=fileobj)
+
+
+class ParallelGzipBackend(GzipBackend):
+    """Multi-threaded block gzip, output is readable by any gzip reader"""
+
+    name = 'pgz'
+
+    def open(self, fileobj, name: str, mtime: int | None = None):
+        return _ParallelGzipWriter(
+            fileobj, name, self.level, self.threads, mtime
+        )
+
+
+class XzBackend(CompressionBackend):
+    """Single-threaded xz, best ratio at the cost of speed"""
+
+    name = 'xz'
+    extension = '.tar.xz'
+    levels = range(0, 10)
+    default_level = 6
+
+    def open(self, fileobj, name: str, mtime: int | None = None):
+        from lzma import LZMAFile
+
+        return LZMAFile(fileobj, mode='wb', preset=self.level)
+
+    @classmethod
+    def reader(cls, fileobj):
+        from lzma import LZMAFile
+
+        return LZMAFile(fileobj, mode='rb')
+
+
+class ZstdBackend(CompressionBackend):
+    """Multi-threaded zstd, requires zstandard package"""
+
+    name = 'zstd'
+    extension = '.tar.zst'
+    levels = range(1, 23)
+    default_level = 3
+
+    def settings(self) -> dict:
+        # multi-threaded zstd output depends on threads count
+        return {**super().settings(), 'threads': self.threads}
+
+    @staticmethod
+    def _zstandard():
+        try:
+            import zstandard
+        except ImportError as exc:
+            raise MKCTFAPIException(
+                "zstd compression requires zstandard package"
+            ) from exc
+        return zstandard
+
+    def open(self, fileobj, name: str, mtime: int | None = None):
+        compressor = self._zstandard().ZstdCompressor(
+            level=self.level,
+            threads=self.threads if self.threads > 1 else 0,
+        )
+        return compressor.stream_writer(fileobj, closefd=False)
+
+    @classmethod
+    def reader(cls, fileobj):
+        decompressor = cls._zstandard().ZstdDecompressor()
+        return decompressor.stream_reader(
+            fileobj, read_across_frames=True, closefd=False
+        )
+
+
+class ZipBackend(CompressionBackend):
+    """Zip archive with independently deflated members
+
+    Zip is an archive format rather than a compressed stream: members can be
+    read individually using the central directory, see ZipArchiveWriter.
+    """
+
+    name = 'zip'
+    extension = '.zip'
+    container = 'zip'
+    levels = range(0, 10)
+    default_level = 9
+
+    def open(self, fileobj, name: str, mtime: int | None = None):
+        raise MKCTFAPIException("zip is not a compressed stream format")
+
+    @classmethod
+    def reader(cls, fileobj):
+        raise MKCTFAPIException("zip is not a compressed stream format")
+
+
+COMPRESSION_BACKENDS = {
+    backend.name: backend
+    for backend in (
+        TarBackend,
+        GzipBackend,
+        ParallelGzipBackend,
+        XzBackend,
+        ZstdBackend,
+        ZipBackend,
+    )
+}
+
+
+def compression_backend(
+    name: str, level: int | None = None, threads: int = 1
+) -> CompressionBackend:
+    """Create compression backend instance"""
+    backend_cls = COMPRESSION_BACKENDS.get(name)
+    if backend_cls is None:
+        raise MKCTFAPIException(f"unknown compression format: {name}")
+    return backend_cls(level, threads)
+
+
+def compression_backend_of(filename: str) -> type[CompressionBackend]:
+    """Compression backend able to read archive named filename"""
+    for backend_cls in COMPRESSION_BACKENDS.values():
+        if filename.endswith(backend_cls.extension):
+            return backend_cls
+    raise MKCTFAPIException(f"unknown archive format: {filename}")
+
+
+def compression_extension(name: str) -> str:
+    """Archive file extension of compression format"""
+    backend_cls = COMPRESSION_BACKENDS.get(name)
+    if backend_cls is None:
+        raise MKCTFAPIException(f"unknown compression format: {name}")
+    return backend_cls.extension
@@ -21,6 +21,7 @@ _RETURNSTATE_COLOR_MAP = {
     CalledProcessState.NOT_IMPLEMENTED: 'magenta',
     CalledProcessState.FAILURE: 'red',
     CalledProcessState.TIMEOUT: 'red',
+    CalledProcessState.SKIPPED: 'yellow',
     CalledProcessState.EXCEPTION: 'magenta',
 }
 
@@ -29,19 +30,22 @@ def _strip_ansi_escape_sequences(data: bytes):
     return _ANSI_ESC_SEQ_PATTERN.sub(b'', data)
 
 
-def display(item):
-    _CONSOLE.print(item)
+def display(item, soft_wrap: bool = False):
+    _CONSOLE.print(item, soft_wrap=soft_wrap)
 
 
 def display_cpr(slug: str, cpr: CalledProcessResult):
     """Display CalledProcessResult instance"""
     returnstate = cpr.returnstate
     color = _RETURNSTATE_COLOR_MAP[returnstate]
+    title = f"{slug} [{returnstate.name}]"
+    if cpr.cached:
+        title += " (up-to-date)"
     table = Table(
         'Field',
         'Data',
         box=ROUNDED,
-        title=f"{slug} [{returnstate.name}]",
+        title=title,
         style=Style(color=color),
         title_style=Style(color=color, bold=True),
         expand=True,
@@ -50,24 +54,59 @@ def display_cpr(slug: str, cpr: CalledProcessResult):
     )
     if returnstate == CalledProcessState.EXCEPTION:
         table.add_row(Text('EXCEPTION', style='magenta'), cpr.exception)
+    if returnstate == CalledProcessState.SKIPPED:
+        table.add_row(Text('REASON', style='yellow'), cpr.exception)
+        display(table)
+        return
     if returnstate != CalledProcessState.SUCCESS:
-        stdout = _strip_ansi_escape_sequences(cpr.stdout)
-        stderr = _strip_ansi_escape_sequences(cpr.stderr)
-        table.add_row(Text('STDOUT', style='blue'), stdout.decode().strip())
-        table.add_row(Text('STDERR', style='red'), stderr.decode().strip())
+        stdout = _strip_ansi_escape_sequences(cpr.stdout or b'')
+        stderr = _strip_ansi_escape_sequences(cpr.stderr or b'')
+        table.add_row(
+            Text('STDOUT', style='blue'),
+            stdout.decode(errors='replace').strip(),
+        )
+        table.add_row(
+            Text('STDERR', style='red'),
+            stderr.decode(errors='replace').strip(),
+        )
+        if cpr.log_path:
+            table.add_row(Text('LOG', style='cyan'), cpr.log_path)
     display(table)
 
 
+def display_line(slug: str, stream: str, line: bytes):
+    """Display a line of challenge program output"""
+    line = _strip_ansi_escape_sequences(line).decode(errors='replace')
+    style = 'red' if stream == 'stderr' else None
+    display(Text(f'{slug} | {line.rstrip()}', style=style), soft_wrap=True)
+
+
+def display_build_plan(slug: str, reason: str | None):
+    """Display whether challenge would be built and why"""
+    if reason is None:
+        display(Text(f'up-to-date {slug}', style='green'), soft_wrap=True)
+        return
+    display(
+        Text(f'build      {slug} ({reason})', style='yellow'), soft_wrap=True
+    )
+
+
 def display_challenge_api(
     challenge_api: ChallengeAPI, summarize: bool = False
 ):
-    """Display ChallengeAPI instance"""
-    color = 'green' if challenge_api.config.enabled else 'red'
+    """Display ChallengeAPI instance
+
+    Summary is built from challenge index, configuration is only loaded to
+    display details.
+    """
     if summarize:
-        slug = challenge_api.config.slug
-        category = challenge_api.config.category
-        display(Text(f'[{category:12s}] {slug}', style=color))
+        config = challenge_api.indexed_config
+        color = 'green' if config.get('enabled') else 'red'
+        slug = challenge_api.slug
+        category = config.get('category') or ''
+        display(Text(f'[{category:12s}] {slug}', style=color), soft_wrap=True)
         return
+    color = 'green' if challenge_api.config.enabled else 'red'
     table = Table(
         'Field',
         'Data',
@@ -0,0 +1,137 @@
+"""Gitignore helper
+"""
+
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from os import scandir
+from pathlib import Path
+from re import Pattern
+from re import compile as re_compile
+from re import escape
+
+GITIGNORE = '.gitignore'
+
+
+def _translate(glob: str) -> str:
+    """Translate gitignore glob to regular expression"""
+    parts = []
+    index = 0
+    while index < len(glob):
+        if glob.startswith('**/', index):
+            parts.append('(?:.*/)?')
+            index += 3
+            continue
+        if glob.startswith('**', index):
+            parts.append('.*')
+            index += 2
+            continue
+        char = glob[index]
+        index += 1
+        if char == '*':
+            parts.append('[^/]*')
+        elif char == '?':
+            parts.append('[^/]')
+        elif char == '\\' and index < len(glob):
+            parts.append(escape(glob[index]))
+            index += 1
+        elif char == '[' and ']' in glob[index + 1 :]:
+            end = glob.index(']', index + 1)
+            content = glob[index:end].replace('\\', '\\\\')
+            if content[0] in '!^':
+                content = '^' + content[1:]
+            parts.append(f'[{content}]')
+            index = end + 1
+        else:
+            parts.append(escape(char))
+    return ''.join(parts)
+
+
+@dataclass
+class GitIgnore:
+    """Patterns of a gitignore file, matched against relative POSIX paths"""
+
+    patterns: list[tuple[Pattern, bool, bool]] = field(default_factory=list)
+
+    @classmethod
+    def parse(cls, content: str) -> 'GitIgnore':
+        """Parse gitignore file content"""
+        patterns = []
+        for line in content.splitlines():
+            if line.endswith(' ') and not line.endswith('\\ '):
+                line = line.rstrip(' ')
+            if not line or line.startswith('#'):
+                continue
+            negate = line.startswith('!')
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            anchored = '/' in line
+            regex = _translate(line.lstrip('/'))
+            if not anchored:
+                regex = f'(?:.*/)?{regex}'
+            patterns.append((re_compile(regex), negate, dir_only))
+        return cls(patterns=patterns)
+
+    @classmethod
+    def load(cls, filepath: Path) -> 'GitIgnore':
+        """Load gitignore file, a missing file is considered empty"""
+        if not filepath.is_file():
+            return cls()
+        return cls.parse(filepath.read_text(errors='replace'))
+
+    def match(self, relpath: str, is_dir: bool) -> bool | None:
+        """Determine if relpath is ignored, None if no pattern matches"""
+        for regex, negate, dir_only in reversed(self.patterns):
+            if dir_only and not is_dir:
+                continue
+            if regex.fullmatch(relpath):
+                return not negate
+        return None
+
+
+def walk_files(
+    directory: Path,
+    root: Path | None = None,
+    excluded: set[Path] | None = None,
+) -> Iterator[Path]:
+    """Yield files under directory which are not ignored, sorted by path
+
+    Gitignore files of root and every directory down to directory apply as
+    well. Excluded paths and .git directories are skipped. Symbolic links are
+    yielded but never followed.
+    """
+    excluded = excluded or set()
+    ignores = []
+    if root is not None and root in directory.parents:
+        for parent in reversed(directory.parents):
+            if parent == root or root in parent.parents:
+                ignores.append((parent, GitIgnore.load(parent / GITIGNORE)))
+
+    def ignored(path: Path, is_dir: bool) -> bool:
+        for base, gitignore in reversed(ignores):
+            result = gitignore.match(path.relative_to(base).as_posix(), is_dir)
+            if result is not None:
+                return result
+        return False
+
+    def walk(current: Path) -> Iterator[Path]:
+        ignores.append((current, GitIgnore.load(current / GITIGNORE)))
+        with scandir(current) as iterator:
+            entries = sorted(iterator, key=lambda entry: entry.name)
+        for entry in entries:
+            path = current / entry.name
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if path in excluded or (is_dir and entry.name == '.git'):
+                continue
+            if ignored(path, is_dir):
+                continue
+            if is_dir:
+                yield from walk(path)
+            else:
+                yield path
+        ignores.pop()
+
+    yield from walk(directory)
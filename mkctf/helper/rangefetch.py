@@ -0,0 +1,225 @@
+"""HTTP range fetch helper
+"""
+
+from dataclasses import dataclass, field
+from struct import Struct
+from struct import error as struct_error
+from zlib import MAX_WBITS, crc32, decompressobj
+from zlib import error as zlib_error
+
+from aiohttp import ClientError, ClientSession, ClientTimeout
+
+from .exception import MKCTFAPIException
+from .logging import LOGGER
+
+# end of central directory record, zip64 locator and zip64 record
+_EOCD = Struct('<4sHHHHIIH')
+_EOCD64_LOCATOR = Struct('<4sIQI')
+_EOCD64 = Struct('<4sQHHIIQQQQ')
+# central directory file header and local file header
+_CDFH = Struct('<4sHHHHHHIIIHHHHHII')
+_LFH = Struct('<4sHHHHHIIIHH')
+# largest possible end of central directory record, comment included
+_TAIL_SIZE = _EOCD.size + 0xFFFF
+# extra bytes fetched with a member to cover its local header extra field
+_LOCAL_EXTRA_MARGIN = 256
+
+
+@dataclass
+class RemoteMember:
+    """Zip archive member listed in central directory"""
+
+    name: str
+    method: int
+    crc: int
+    compress_size: int
+    file_size: int
+    header_offset: int
+    extra_size: int
+
+
+def _zip64_extra(extra: bytes, values: list[int]) -> list[int]:
+    """Replace saturated values using zip64 extended information field
+
+    values are 32-bit fields in zip64 field order: file size, compressed
+    size and local header offset.
+    """
+    offset = 0
+    while offset + 4 <= len(extra):
+        tag, size = Struct('<HH').unpack_from(extra, offset)
+        if tag == 1:
+            fields = iter(
+                Struct(f'<{size // 8}Q').unpack_from(extra, offset + 4)
+            )
+            return [
+                next(fields) if value == 0xFFFFFFFF else value
+                for value in values
+            ]
+        offset += 4 + size
+    return values
+
+
+@dataclass
+class RemoteZip:
+    """Zip archive served over HTTP, read using range requests
+
+    Only the end of the archive holding the central directory and requested
+    members are downloaded, which requires the server to honor Range
+    headers (any static file server does). Use it as an asynchronous
+    context manager, requests share a single HTTP session.
+    """
+
+    url: str
+    timeout: float = 30
+    _session: ClientSession | None = field(default=None, repr=False)
+    _members: dict[str, RemoteMember] | None = field(default=None, repr=False)
+
+    async def __aenter__(self) -> 'RemoteZip':
+        self._session = ClientSession(
+            timeout=ClientTimeout(total=self.timeout)
+        )
+        return self
+
+    async def __aexit__(self, *_):
+        await self._session.close()
+        self._session = None
+
+    async def _get(self, range_: str) -> tuple[bytes, int]:
+        """Fetch byte range, return data and archive size"""
+        # identity encoding keeps byte offsets those of the archive
+        headers = {'Range': f'bytes={range_}', 'Accept-Encoding': 'identity'}
+        LOGGER.debug("fetching bytes %s of %s", range_, self.url)
+        try:
+            async with self._session.get(self.url, headers=headers) as resp:
+                if resp.status != 206:
+                    raise MKCTFAPIException(
+                        f"{self.url} does not support range requests"
+                    )
+                content_range = resp.headers.get('Content-Range', '')
+                size = int(content_range.rsplit('/', 1)[-1])
+                return await resp.read(), size
+        except (ClientError, OSError, ValueError) as exc:
+            raise MKCTFAPIException(f"failed to fetch {self.url}") from exc
+
+    async def _get_range(self, start: int, size: int) -> bytes:
+        return (await self._get(f'{start}-{start + size - 1}'))[0]
+
+    async def _central_directory(self) -> bytes:
+        tail, archive_size = await self._get(f'-{_TAIL_SIZE}')
+        tail_offset = archive_size - len(tail)
+        position = tail.rfind(b'PK\x05\x06')
+        if position < 0:
+            raise MKCTFAPIException(f"{self.url} is not a zip archive")
+        _, _, _, _, count, cd_size, cd_offset, _ = _EOCD.unpack_from(
+            tail, position
+        )
+        if 0xFFFFFFFF in (cd_size, cd_offset) or count == 0xFFFF:
+            locator = position - _EOCD64_LOCATOR.size
+            _, _, eocd64_offset, _ = _EOCD64_LOCATOR.unpack_from(tail, locator)
+            if eocd64_offset >= tail_offset:
+                eocd64 = tail[eocd64_offset - tail_offset :]
+            else:
+                eocd64 = await self._get_range(eocd64_offset, _EOCD64.size)
+            _, _, _, _, _, _, _, _, cd_size, cd_offset = _EOCD64.unpack_from(
+                eocd64
+            )
+        if cd_offset >= tail_offset:
+            start = cd_offset - tail_offset
+            return tail[start : start + cd_size]
+        return await self._get_range(cd_offset, cd_size)
+
+    async def members(self) -> dict[str, RemoteMember]:
+        """Archive members by name, central directory is fetched once"""
+        if self._members is not None:
+            return self._members
+        data = await self._central_directory()
+        members = {}
+        offset = 0
+        try:
+            while offset + _CDFH.size <= len(data):
+                (
+                    signature,
+                    _,
+                    _,
+                    flags,
+                    method,
+                    _,
+                    _,
+                    crc,
+                    compress_size,
+                    file_size,
+                    name_size,
+                    extra_size,
+                    comment_size,
+                    _,
+                    _,
+                    _,
+                    header_offset,
+                ) = _CDFH.unpack_from(data, offset)
+                if signature != b'PK\x01\x02':
+                    break
+                offset += _CDFH.size
+                name = data[offset : offset + name_size].decode(
+                    'utf-8' if flags & 0x800 else 'cp437'
+                )
+                extra = data[
+                    offset + name_size : offset + name_size + extra_size
+                ]
+                file_size, compress_size, header_offset = _zip64_extra(
+                    extra, [file_size, compress_size, header_offset]
+                )
+                members[name] = RemoteMember(
+                    name=name,
+                    method=method,
+                    crc=crc,
+                    compress_size=compress_size,
+                    file_size=file_size,
+                    header_offset=header_offset,
+                    extra_size=extra_size,
+                )
+                offset += name_size + extra_size + comment_size
+        except (struct_error, UnicodeDecodeError) as exc:
+            raise MKCTFAPIException(
+                f"invalid central directory in {self.url}"
+            ) from exc
+        self._members = members
+        return members
+
+    async def read(self, name: str) -> bytes:
+        """Fetch and decompress member named name"""
+        member = (await self.members()).get(name)
+        if member is None:
+            raise MKCTFAPIException(f"{name} not found in {self.url}")
+        # local header extra field usually matches central directory one,
+        # fetch header and data at once and complete if it does not
+        guess = (
+            _LFH.size
+            + len(member.name.encode())
+            + member.extra_size
+            + _LOCAL_EXTRA_MARGIN
+        )
+        data = await self._get_range(
+            member.header_offset, guess + member.compress_size
+        )
+        signature, *_, name_size, extra_size = _LFH.unpack_from(data)
+        if signature != b'PK\x03\x04':
+            raise MKCTFAPIException(f"invalid local header for {name}")
+        start = _LFH.size + name_size + extra_size
+        end = start + member.compress_size
+        if end > len(data):
+            data += await self._get_range(
+                member.header_offset + len(data), end - len(data)
+            )
+        data = data[start:end]
+        try:
+            if member.method == 8:
+                data = decompressobj(-MAX_WBITS).decompress(data)
+            elif member.method != 0:
+                raise MKCTFAPIException(
+                    f"unsupported compression method for {name}"
+                )
+        except zlib_error as exc:
+            raise MKCTFAPIException(f"failed to decompress {name}") from exc
+        if len(data) != member.file_size or crc32(data) != member.crc:
+            raise MKCTFAPIException(f"{name} is corrupted")
+        return data
@@ -15,7 +15,7 @@ async def _shutdown(_, loop):
     tasks = [task for task in all_tasks() if task is not current_task()]
     _ = [task.cancel() for task in tasks]
     LOGGER.warning("waiting for tasks to terminate... please wait")
-    await gather(*tasks)
+    await gather(*tasks, return_exceptions=True)
     loop.stop()
     LOGGER.info("finally exiting")
 
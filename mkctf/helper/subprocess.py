@@ -1,16 +1,71 @@
 """Subprocess helper
 """
 
+from asyncio import StreamReader
 from asyncio import TimeoutError as AsyncioTimeoutError
-from asyncio import create_subprocess_exec, wait_for
-from dataclasses import dataclass
+from asyncio import create_subprocess_exec, gather, shield, sleep, wait_for
+from asyncio.subprocess import Process
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
+from secrets import token_hex
+from signal import SIGTERM
 from subprocess import PIPE, CalledProcessError
+from sys import executable
+from time import monotonic
+from typing import BinaryIO
 
 from .logging import LOGGER
 
+try:
+    from os import killpg
+    from resource import RLIMIT_AS, RLIMIT_CPU, RLIMIT_NOFILE, RLIMIT_NPROC
+    from signal import SIGKILL
+
+    # challenge configuration limits keys, address space is in bytes and
+    # processes counts all processes of the user
+    _RLIMITS = {
+        'cpu_time': RLIMIT_CPU,
+        'address_space': RLIMIT_AS,
+        'open_files': RLIMIT_NOFILE,
+        'processes': RLIMIT_NPROC,
+    }
+except ImportError:
+    # not a POSIX system: programs are signaled on their own, terminating a
+    # process is as strong as killing it, limits are not supported
+    killpg = None
+    SIGKILL = SIGTERM
+    _RLIMITS = {}
+
 DEFAULT_PROG_TIMEOUT = 120  # 2 minutes
+DEFAULT_KILL_GRACE = 5  # seconds between SIGTERM and SIGKILL
+OUTPUT_HEAD_SIZE = 64 * 1024
+OUTPUT_TAIL_SIZE = 256 * 1024
+_READ_SIZE = 64 * 1024
+# stream name and line, line is terminated by a newline unless it is the
+# last one or it exceeds _READ_SIZE
+LineCallback = Callable[[str, bytes], None]
+# sets RESOURCE=VALUE limits given as arguments up to '--' then executes the
+# remaining arguments, a fork-safe alternative to preexec_fn which lets
+# limits apply before the program starts
+_RLIMITS_WRAPPER = '''
+from os import execv
+from resource import RLIM_INFINITY, getrlimit, setrlimit
+from sys import argv
+split = argv.index('--')
+for arg in argv[1:split]:
+    resource, value = map(int, arg.split('='))
+    _, hard = getrlimit(resource)
+    if hard != RLIM_INFINITY:
+        value = min(value, hard)
+    setrlimit(resource, (value, value))
+try:
+    execv(argv[split + 1], argv[split + 1:])
+except OSError as exc:
+    raise SystemExit(f'{argv[split + 1]}: {exc.strerror}')
+'''
 
 
 class CalledProcessState(Enum):
@@ -22,6 +77,7 @@ class CalledProcessState(Enum):
     NOT_IMPLEMENTED = 0x00000004
     FAILURE = 0xFFFFFFF1
     TIMEOUT = 0xFFFFFFF2
+    SKIPPED = 0xFFFFFFF3
     EXCEPTION = 0xFFFFFFFF
 
 
@@ -30,12 +86,45 @@ _HEALTHY_STATES = {
     CalledProcessState.SUCCESS,
     CalledProcessState.NOT_APPLICABLE,
 }
-_CALLED_PROCESS_STATES = {
-    CalledProcessState.SUCCESS,
-    CalledProcessState.NOT_APPLICABLE,
-    CalledProcessState.MANUAL,
-    CalledProcessState.NOT_IMPLEMENTED,
-}
+
+
+@dataclass
+class OutputBuffer:
+    """Bounded output capture
+
+    Keeps the first head_size and the last tail_size bytes written, bytes in
+    between are counted but dropped.
+    """
+
+    head_size: int = OUTPUT_HEAD_SIZE
+    tail_size: int = OUTPUT_TAIL_SIZE
+    size: int = 0
+    head: bytearray = field(default_factory=bytearray)
+    tail: deque[bytes] = field(default_factory=deque)
+    tail_bytes: int = 0
+
+    def write(self, data: bytes):
+        """Capture data"""
+        self.size += len(data)
+        room = self.head_size - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if not data or not self.tail_size:
+            return
+        self.tail.append(data)
+        self.tail_bytes += len(data)
+        while self.tail_bytes - len(self.tail[0]) >= self.tail_size:
+            self.tail_bytes -= len(self.tail.popleft())
+
+    def getvalue(self) -> bytes:
+        """Captured bytes, dropped bytes are replaced by a marker"""
+        tail = b''.join(self.tail)[-self.tail_size :] if self.tail else b''
+        omitted = self.size - len(self.head) - len(tail)
+        if omitted <= 0:
+            return bytes(self.head) + tail
+        marker = f'\n[... {omitted} bytes omitted ...]\n'.encode()
+        return bytes(self.head) + marker + tail
 
 
 @dataclass
@@ -46,13 +135,28 @@ class CalledProcessResult:
     stderr: bytes | None = None
     exception: str | None = None
     returncode: int = CalledProcessState.EXCEPTION.value
+    cached: bool = False
+    log_path: str | None = None
+
+    @classmethod
+    def from_dict(cls, dct):
+        """Create instance from dict"""
+        return cls(
+            stdout=dct['stdout'],
+            stderr=dct['stderr'],
+            exception=dct['exception'],
+            returncode=dct['returncode'],
+            cached=dct.get('cached', False),
+            log_path=dct.get('log_path'),
+        )
 
     @property
     def returnstate(self) -> CalledProcessState:
         """Called process return state"""
-        if self.returncode in _CALLED_PROCESS_STATES:
+        try:
             return CalledProcessState(self.returncode)
-        return CalledProcessState.FAILURE
+        except ValueError:
+            return CalledProcessState.FAILURE
 
     @property
     def healthy(self) -> bool:
@@ -67,13 +171,119 @@ class CalledProcessResult:
             'exception': self.exception,
             'returncode': self.returncode,
             'returnstate': self.returnstate.name,
+            'cached': self.cached,
+            'log_path': self.log_path,
         }
 
 
+async def _pump(
+    stream: StreamReader,
+    name: str,
+    buffer: OutputBuffer,
+    log: BinaryIO | None,
+    on_line: LineCallback | None,
+):
+    """Read stream until EOF, dispatching lines as they arrive"""
+
+    def emit(line):
+        buffer.write(line)
+        if log is not None:
+            log.write(line)
+        if on_line is not None:
+            on_line(name, line)
+
+    pending = b''
+    while True:
+        chunk = await stream.read(_READ_SIZE)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            emit(line + b'\n')
+        # bound memory used by a line which never ends
+        if len(pending) >= _READ_SIZE:
+            emit(pending)
+            pending = b''
+    if pending:
+        emit(pending)
+
+
+def _limited(args: list[str], limits: dict[str, int]) -> list[str]:
+    """Wrap args so that limits apply to the program they execute"""
+    if not _RLIMITS:
+        LOGGER.warning("resource limits ignored (unsupported platform)")
+        return args
+    return [
+        executable,
+        '-I',
+        '-S',
+        '-c',
+        _RLIMITS_WRAPPER,
+        *(f'{_RLIMITS[name]}={value}' for name, value in limits.items()),
+        '--',
+        *args,
+    ]
+
+
+def _signal_group(proc: Process, signum: int) -> bool:
+    """Send signal to process group of proc, False if group is gone
+
+    proc alone is signaled on systems without process groups.
+    """
+    try:
+        if killpg is not None:
+            killpg(proc.pid, signum)
+        elif proc.returncode is not None:
+            return False
+        elif signum:
+            proc.send_signal(signum)
+    except (ProcessLookupError, PermissionError):
+        return False
+    return True
+
+
+async def _terminate_group(proc: Process, grace: float):
+    """Terminate process group of proc and reap proc
+
+    SIGTERM is sent to the whole group, members still alive after grace
+    seconds are killed using SIGKILL.
+    """
+    deadline = monotonic() + grace
+    _signal_group(proc, SIGTERM)
+    try:
+        await wait_for(proc.wait(), timeout=grace)
+    except AsyncioTimeoutError:
+        pass
+    # members of the group may outlive their leader
+    while monotonic() < deadline and _signal_group(proc, 0):
+        await sleep(0.1)
+    _signal_group(proc, SIGKILL)
+    await proc.wait()
+
+
 async def run_mkctf_prog(
-    prog: str, cwd: Path, dev: bool, timeout: int | None = None
+    prog: str,
+    cwd: Path,
+    dev: bool,
+    timeout: int | None = None,
+    on_line: LineCallback | None = None,
+    log_path: Path | None = None,
+    limits: dict[str, int] | None = None,
+    grace: float = DEFAULT_KILL_GRACE,
 ) -> CalledProcessResult:
-    """Runs a script as an asynchronous subprocess"""
+    """Runs a script as an asynchronous subprocess
+
+    Output is streamed line by line to on_line and spooled to a gzip
+    compressed log_path when given, the script does not run if log_path
+    cannot be created. Only head and tail of each stream are kept in memory,
+    see OutputBuffer.
+
+    Script runs in its own session so that processes it spawns can be
+    terminated along with it on timeout, see _terminate_group. limits maps
+    _RLIMITS keys to values applied to the script before it starts, see
+    _RLIMITS_WRAPPER.
+    """
 
     if timeout is None:
         timeout = DEFAULT_PROG_TIMEOUT
@@ -81,25 +291,65 @@ async def run_mkctf_prog(
     args = [str(cwd / prog)]
     if dev:
         args.append('--dev')
-    proc = await create_subprocess_exec(
-        *args, stdout=PIPE, stderr=PIPE, cwd=str(cwd)
-    )
+    if limits:
+        args = _limited(args, limits)
+    stdout = OutputBuffer()
+    stderr = OutputBuffer()
+    log = None
+    result = CalledProcessResult()
     try:
-        stdout, stderr = await wait_for(proc.communicate(), timeout=timeout)
-        return CalledProcessResult(
-            stdout=stdout, stderr=stderr, returncode=proc.returncode
+        if log_path is not None:
+            from gzip import GzipFile
+
+            # concurrent runs of the same program must not share a file
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_log_path = log_path.with_name(
+                f'.{log_path.name}.{token_hex(8)}.tmp'
+            )
+            log = GzipFile(tmp_log_path, 'xb', compresslevel=6, mtime=0)
+        proc = await create_subprocess_exec(
+            *args,
+            stdout=PIPE,
+            stderr=PIPE,
+            cwd=str(cwd),
+            start_new_session=True,
         )
-    except AsyncioTimeoutError:
-        proc.terminate()
-        return CalledProcessResult(
-            exception="timeout", returncode=CalledProcessState.TIMEOUT.value
+        pumps = gather(
+            _pump(proc.stdout, 'stdout', stdout, log, on_line),
+            _pump(proc.stderr, 'stderr', stderr, log, on_line),
+            proc.wait(),
         )
+        try:
+            await wait_for(pumps, timeout=timeout)
+            result.returncode = proc.returncode
+        except AsyncioTimeoutError:
+            await _terminate_group(proc, grace)
+            result.exception = "timeout"
+            result.returncode = CalledProcessState.TIMEOUT.value
+        finally:
+            # task was cancelled or pumping output failed: terminate and reap
+            # the group, even if task is cancelled again meanwhile
+            if proc.returncode is None:
+                await shield(_terminate_group(proc, grace))
+            # wait_for does not retrieve it when cancelled
+            if pumps.done() and not pumps.cancelled():
+                pumps.exception()
     except CalledProcessError as exc:
-        return CalledProcessResult(
-            stdout=exc.stdout,
-            stderr=exc.stderr,
-            exception="called process error",
-            returncode=exc.returncode,
-        )
+        stdout.write(exc.stdout or b'')
+        stderr.write(exc.stderr or b'')
+        result.exception = "called process error"
+        result.returncode = exc.returncode
     except Exception as exc:
-        return CalledProcessResult(exception=str(exc))
+        result.exception = str(exc)
+    finally:
+        if log is not None:
+            try:
+                log.close()
+                tmp_log_path.replace(log_path)
+                result.log_path = str(log_path)
+            except OSError as exc:
+                tmp_log_path.unlink(missing_ok=True)
+                LOGGER.warning("failed to write log %s (%s)", log_path, exc)
+    result.stdout = stdout.getvalue()
+    result.stderr = stderr.getvalue()
+    return result
@@ -5,6 +5,7 @@ from argparse import ArgumentParser
 from asyncio import get_event_loop
 from getpass import getpass
 from os import getenv
+from pathlib import Path
 from sys import exit as sys_exit
 
 from yarl import URL
@@ -66,6 +67,23 @@ def parse_args():
         type=int,
         help="count of workers to be spawned",
     )
+    parser.add_argument(
+        '--snapshot',
+        type=Path,
+        default=getenv('MKCTF_SNAPSHOT'),
+        help="read repository from a snapshot written by mkctf-cli snapshot instead of scanning it, overrides MKCTF_SNAPSHOT (env)",
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help="watch repository for added, removed, enabled or disabled challenges",
+    )
+    parser.add_argument(
+        '--watch-interval',
+        default=5.0,
+        type=float,
+        help="repository polling interval when inotify is not available (in seconds)",
+    )
     parser.add_argument(
         '--post-timeout',
         default=60,
@@ -90,7 +108,9 @@ async def async_app():
         "Dashboard API password: "
     )
     try:
-        mkctf_api = create_mkctf_api(args.repository_directory)
+        mkctf_api = create_mkctf_api(
+            args.repository_directory, args.scan_workers, args.snapshot
+        )
         notifier = MonitorNotifier(
             base_url=URL.build(scheme='https', host=args.host, port=args.port),
             username=args.username,
@@ -105,6 +125,8 @@ async def async_app():
             delay=args.delay,
             timeout=args.timeout,
             worker=args.worker,
+            watch=args.watch,
+            watch_interval=args.watch_interval,
         )
         await monitor.run()
         returncode = 0
@@ -7,6 +7,7 @@ from dataclasses import dataclass, field
 from humanize import naturaldelta
 
 from ..api import MKCTFAPI
+from ..api.watcher import RepositoryEvent, RepositoryEventKind
 from ..helper.logging import LOGGER
 from .notifier import MonitorNotifier
 from .task import MonitorTask
@@ -22,9 +23,39 @@ class MKCTFMonitor:
     delay: int = 600
     timeout: int = 120
     worker: int = 4
+    watch: bool = False
+    watch_interval: float = 5.0
     _queue: Queue = field(default_factory=Queue)
+    _tasks: dict[str, MonitorTask] = field(default_factory=dict)
     _workers: list[Task] = field(default_factory=list)
 
+    async def _inject(self, slug: str):
+        """Inject a task for given challenge unless it exists already"""
+        if slug in self._tasks:
+            return
+        LOGGER.info("[monitor]: injecting a task for %s", slug)
+        task = MonitorTask(
+            mkctf_api=self.mkctf_api, slug=slug, timeout=self.timeout
+        )
+        self._tasks[slug] = task
+        await self._queue.put(task)
+
+    async def _on_repository_event(self, event: RepositoryEvent):
+        """Keep tasks in sync with repository changes"""
+        if event.kind in (
+            RepositoryEventKind.ADDED,
+            RepositoryEventKind.ENABLED,
+        ):
+            if event.config.enabled:
+                await self._inject(event.slug)
+            return
+        if event.kind in (
+            RepositoryEventKind.REMOVED,
+            RepositoryEventKind.DISABLED,
+        ):
+            if self._tasks.pop(event.slug, None):
+                LOGGER.info("[monitor]: dropping task for %s", event.slug)
+
     async def _worker_routine(self, worker_id):
         """Represent a monitoring worker"""
         while True:
@@ -32,6 +63,10 @@ class MKCTFMonitor:
             if task is None:
                 LOGGER.info("[%s]: exiting gracefully", worker_id)
                 break
+            if self._tasks.get(task.slug) is not task:
+                LOGGER.info("[%s]: %s task dropped", worker_id, task.slug)
+                self._queue.task_done()
+                continue
             countdown = task.countdown(self.delay)
             if countdown > 0:
                 LOGGER.info(
@@ -63,25 +98,34 @@ class MKCTFMonitor:
                 await self.notifier.post(worker_id, task.slug, False)
             else:
                 await self.notifier.post(worker_id, task.slug, cpr.healthy)
-            if self.count > 0 and task.count < self.count:
-                await self._queue.put(task)
+            if self._tasks.get(task.slug) is task:
+                if self.count < 0 or task.count < self.count:
+                    await self._queue.put(task)
+                else:
+                    del self._tasks[task.slug]
             self._queue.task_done()
 
     async def run(self):
         """Perform one monitoring round"""
-        for challenge_api in self.mkctf_api.enum():
-            slug = challenge_api.config.slug
-            if not challenge_api.config.enabled:
-                LOGGER.info("[monitor]: %s skipped (disabled)", slug)
-                continue
-            LOGGER.info("[monitor]: injecting a task for %s", slug)
-            await self._queue.put(
-                MonitorTask(
-                    mkctf_api=self.mkctf_api, slug=slug, timeout=self.timeout
-                )
-            )
+        watcher = None
+        if self.watch:
+            watcher = self.mkctf_api.watcher(self.watch_interval)
+            watcher.snapshot()
+            watcher.subscribe(self._on_repository_event)
+            slugs = [
+                slug
+                for slug, config in sorted(watcher.view.items())
+                if config.enabled
+            ]
+        else:
+            slugs = [
+                challenge_api.slug
+                for challenge_api in self.mkctf_api.enum(enabled=True)
+            ]
+        for slug in slugs:
+            await self._inject(slug)
         # check if queue is empty before starting
-        if self._queue.empty():
+        if self._queue.empty() and not self.watch:
             LOGGER.info("[monitor]: no task to process, exiting.")
             return
         # create N worker tasks to process the queue concurrently
@@ -89,10 +133,14 @@ class MKCTFMonitor:
         for k in range(self.worker):
             worker = create_task(self._worker_routine(f'worker-{k}'))
             self._workers.append(worker)
-        # await queue to be processed entirely
+        # await queue to be processed entirely or watch repository until
+        # cancelled
         LOGGER.info("[monitor]: waiting for tasks to be processed...")
         try:
-            await self._queue.join()
+            if watcher:
+                await watcher.run()
+            else:
+                await self._queue.join()
         except CancelledError:
             LOGGER.warning("[monitor]: tasks cancelled.")
         # terminate workers
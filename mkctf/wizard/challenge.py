@@ -74,6 +74,10 @@ class ChallengeConfigWizard(WizardBase):
             # consistency: keep previous enabled even if challenge renamed
             self.config.static_url = (
                 self.existing_config.static_url
-                or self.repository_config.make_static_url(self.config.slug)
+                or self.repository_config.make_static_url(
+                    self.config.slug, self.config.category
+                )
             )
+            # consistency: keep build dependencies declared manually
+            self.config.depends = self.existing_config.depends
             return self.config
@@ -0,0 +1,155 @@
+"""Archive writers and reader
+"""
+
+from hashlib import sha256
+from os import utime
+from tarfile import open as tarfile_open
+
+from pytest import mark, param
+
+from mkctf.helper.archive import (
+    ArchiveReader,
+    ArchiveWriter,
+    SegmentedArchiveWriter,
+    ZipArchiveWriter,
+)
+from mkctf.helper.blobstore import BlobStore
+from mkctf.helper.compression import GzipBackend, XzBackend
+
+FILES = {
+    'chall/exploit': b'#!/bin/sh\necho exploit\n',
+    'chall/data.bin': bytes(range(256)) * 41,
+    'chall/empty': b'',
+}
+MANIFEST = b'{"files": 3}\n'
+
+
+def _tree(directory, mtime):
+    directory.mkdir(exist_ok=True)
+    for arcname, data in FILES.items():
+        filepath = directory / arcname.replace('/', '_')
+        filepath.write_bytes(data)
+        filepath.chmod(0o755 if arcname.endswith('exploit') else 0o600)
+        utime(filepath, (mtime, mtime))
+    return directory
+
+
+def _tar_gz(filepath, tmp_path, mtime=None):
+    return ArchiveWriter(filepath, 'chall', mtime=mtime)
+
+
+def _tar_xz(filepath, tmp_path, mtime=None):
+    return ArchiveWriter(filepath, 'chall', XzBackend(), mtime)
+
+
+def _zip(filepath, tmp_path, mtime=None):
+    return ZipArchiveWriter(filepath, 'chall', mtime=mtime)
+
+
+def _segmented_gz(filepath, tmp_path, mtime=None):
+    blob_store = BlobStore(tmp_path / 'blobs')
+    return SegmentedArchiveWriter(
+        filepath, 'chall', blob_store, GzipBackend(), mtime
+    )
+
+
+def _segmented_xz(filepath, tmp_path, mtime=None):
+    blob_store = BlobStore(tmp_path / 'blobs')
+    return SegmentedArchiveWriter(
+        filepath, 'chall', blob_store, XzBackend(), mtime
+    )
+
+
+WRITERS = {
+    '.tar.gz': [_tar_gz, _segmented_gz],
+    '.tar.xz': [_tar_xz, _segmented_xz],
+    '.zip': [_zip],
+}
+CASES = [
+    param(extension, writer, id=writer.__name__.lstrip('_'))
+    for extension, writers in WRITERS.items()
+    for writer in writers
+]
+
+
+def _write(writer, directory):
+    with writer as arch:
+        digests = {
+            arcname: arch.add(directory / arcname.replace('/', '_'), arcname)
+            for arcname in FILES
+        }
+        arch.add_bytes('chall/manifest.json', MANIFEST)
+    return digests
+
+
+@mark.parametrize('extension, factory', CASES)
+def test_archive_round_trip(tmp_path, extension, factory):
+    directory = _tree(tmp_path / 'src', 1_600_000_000)
+    filepath = tmp_path / f'chall{extension}'
+    writer = factory(filepath, tmp_path)
+    digests = _write(writer, directory)
+    assert digests == {
+        arcname: sha256(data).hexdigest() for arcname, data in FILES.items()
+    }
+    assert writer.hexdigest == sha256(filepath.read_bytes()).hexdigest()
+    with ArchiveReader(filepath) as reader:
+        members = {
+            name: (hexdigest, data)
+            for name, hexdigest, data in reader.members(
+                keep={'chall/manifest.json', 'chall/data.bin'}
+            )
+        }
+    assert reader.hexdigest == writer.hexdigest
+    assert members == {
+        'chall/exploit': (digests['chall/exploit'], None),
+        'chall/data.bin': (digests['chall/data.bin'], FILES['chall/data.bin']),
+        'chall/empty': (digests['chall/empty'], None),
+        'chall/manifest.json': (sha256(MANIFEST).hexdigest(), MANIFEST),
+    }
+
+
+@mark.parametrize('extension, factory', CASES)
+def test_archive_is_reproducible(tmp_path, extension, factory):
+    first, second = (
+        tmp_path / f'first{extension}',
+        tmp_path / f'second{extension}',
+    )
+    _write(factory(first, tmp_path, 0), _tree(tmp_path / 'a', 1_600_000_000))
+    _write(factory(second, tmp_path, 0), _tree(tmp_path / 'b', 1_700_000_000))
+    assert first.read_bytes() == second.read_bytes()
+
+
+@mark.parametrize('extension', ['.tar.gz', '.tar.xz'])
+def test_segmented_archive_matches_tar_layout(tmp_path, extension):
+    directory = _tree(tmp_path / 'src', 1_600_000_000)
+    factory = WRITERS[extension][1]
+    filepath = tmp_path / f'chall{extension}'
+    _write(factory(filepath, tmp_path, 0), directory)
+    with tarfile_open(filepath) as arch:
+        modes = {tarinfo.name: tarinfo.mode for tarinfo in arch}
+        assert (
+            arch.extractfile('chall/exploit').read() == FILES['chall/exploit']
+        )
+    assert modes == {
+        'chall/exploit': 0o755,
+        'chall/data.bin': 0o644,
+        'chall/empty': 0o644,
+        'chall/manifest.json': 0o644,
+    }
+
+
+def test_segmented_archive_reuses_known_blobs(tmp_path):
+    directory = _tree(tmp_path / 'src', 1_600_000_000)
+    first, second = tmp_path / 'first.tar.gz', tmp_path / 'second.tar.gz'
+    digests = _write(_segmented_gz(first, tmp_path, 0), directory)
+    blobs = sorted((tmp_path / 'blobs').rglob('*'))
+    # files with a known digest are not read again
+    for filepath in directory.iterdir():
+        filepath.write_bytes(bytes(filepath.stat().st_size))
+    with _segmented_gz(second, tmp_path, 0) as arch:
+        for arcname, hexdigest in digests.items():
+            filepath = directory / arcname.replace('/', '_')
+            assert arch.add(filepath, arcname, hexdigest) == hexdigest
+        arch.add_bytes('chall/manifest.json', MANIFEST)
+    assert sorted((tmp_path / 'blobs').rglob('*')) == blobs
+    assert first.read_bytes() == second.read_bytes()
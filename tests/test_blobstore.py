@@ -0,0 +1,26 @@
+"""Content-addressed blob store
+"""
+
+from hashlib import sha256
+
+from mkctf.helper.blobstore import BlobStore
+
+
+def _put(blob_store: BlobStore, data: bytes) -> str:
+    hexdigest = sha256(data).hexdigest()
+    tmp_path = blob_store.tmp_path('gz')
+    tmp_path.write_bytes(data)
+    blob_store.put('gz', hexdigest, tmp_path)
+    return hexdigest
+
+
+def test_prune_keeps_referenced_blobs_only(tmp_path):
+    blob_store = BlobStore(tmp_path)
+    kept = _put(blob_store, b'kept')
+    dropped = _put(blob_store, b'dropped')
+    pending = blob_store.tmp_path('gz')
+    pending.write_bytes(b'written by a concurrent export')
+    assert blob_store.prune({kept}) == (1, len(b'dropped'))
+    assert blob_store.find('gz', kept) is not None
+    assert blob_store.find('gz', dropped) is None
+    assert pending.is_file()
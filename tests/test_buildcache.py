@@ -0,0 +1,55 @@
+"""Build inputs fingerprint
+"""
+
+from pathlib import Path
+
+from pytest import mark
+
+from mkctf.api.buildcache import build_fingerprint
+from mkctf.helper.checksum import sha256_file_hexdigest
+
+try:
+    from os import mkfifo
+except ImportError:
+    mkfifo = None
+
+
+def _fingerprint(directory: Path, excluded: set[Path] | None = None) -> str:
+    return build_fingerprint(
+        directory,
+        directory.parent,
+        excluded or set(),
+        'build',
+        'FLAG{x}',
+        False,
+        {},
+        sha256_file_hexdigest,
+    )
+
+
+def _challenge(tmp_path: Path) -> Path:
+    directory = tmp_path / 'chall'
+    directory.mkdir()
+    (directory / 'build').write_text('#!/bin/sh\n')
+    (directory / 'src.c').write_text('int main;\n')
+    return directory
+
+
+def test_fingerprint_tracks_content_and_honors_exclusions(tmp_path):
+    directory = _challenge(tmp_path)
+    config = directory / '.mkctf.yml'
+    config.write_text('flag: a\n')
+    fingerprint = _fingerprint(directory, {config})
+    config.write_text('flag: b\n')
+    assert _fingerprint(directory, {config}) == fingerprint
+    (directory / 'src.c').write_text('int main = 1;\n')
+    assert _fingerprint(directory, {config}) != fingerprint
+
+
+@mark.skipif(mkfifo is None, reason="FIFOs are not supported")
+def test_fingerprint_does_not_open_special_files(tmp_path):
+    directory = _challenge(tmp_path)
+    fingerprint = _fingerprint(directory)
+    mkfifo(directory / 'pipe')
+    # would block forever if the FIFO was opened
+    assert _fingerprint(directory) != fingerprint
@@ -0,0 +1,34 @@
+"""Command line interface commands
+"""
+
+from argparse import ArgumentParser
+
+from mkctf.command import LazySubParsersAction, setup_commands
+
+
+def _parser() -> tuple[ArgumentParser, LazySubParsersAction]:
+    parser = ArgumentParser()
+    parser.add_argument('--repository-directory', '-r')
+    subparsers = parser.add_subparsers(
+        dest='command', action=LazySubParsersAction
+    )
+    subparsers.required = True
+    setup_commands(subparsers)
+    return parser, subparsers
+
+
+def test_only_selected_command_is_set_up():
+    parser, subparsers = _parser()
+    # a command name given as an option value must not select it
+    args = parser.parse_args(['-r', 'export', 'build', '--force'])
+    assert args.command == 'build'
+    assert args.force
+    assert 'build' not in subparsers.pending
+    assert 'export' in subparsers.pending
+
+
+def test_commands_are_set_up_right_away_without_lazy_action():
+    parser = ArgumentParser()
+    setup_commands(parser.add_subparsers(dest='command'))
+    args = parser.parse_args(['export', 'out', '--blobs'])
+    assert args.blobs
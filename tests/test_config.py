@@ -0,0 +1,96 @@
+"""Configuration models and persistence
+"""
+
+from pytest import raises
+
+from mkctf.api.config import CONFIG_CODEC, ChallengeConfig, ConfigBatch
+
+CHALLENGE = {
+    'name': 'Alpha',
+    'slug': 'alpha',
+    'tags': ['web'],
+    'flag': 'FLAG{alpha}',
+    'author': 'someone',
+    'points': 100,
+    'enabled': True,
+    'category': 'web',
+    'logo_url': '',
+    'difficulty': 'easy',
+    'static_url': 'https://static.example.ctf/web/alpha.tar.gz',
+}
+
+
+def test_challenge_config_omits_unset_optional_fields():
+    config = ChallengeConfig.from_dict(CHALLENGE)
+    assert config.to_dict() == CHALLENGE
+
+
+def test_challenge_config_round_trips_optional_fields():
+    dct = {**CHALLENGE, 'depends': ['beta'], 'limits': {'cpu_time': 10}}
+    config = ChallengeConfig.from_dict(dct)
+    assert config.depends == ['beta']
+    assert config.to_dict() == dct
+
+
+def test_batch_writes_changed_files_on_commit(tmp_path):
+    changed = tmp_path / 'changed.yml'
+    unchanged = tmp_path / 'unchanged.yml'
+    created = tmp_path / 'created.yml'
+    changed.write_text('a: 1\n')
+    changed.chmod(0o640)
+    unchanged.write_text('b: 2\n')
+    CONFIG_CODEC.sidecar_path(changed).write_bytes(b'stale')
+    before = unchanged.stat().st_mtime_ns
+    batch = ConfigBatch()
+    batch.stage(changed, 'a: 0\n')
+    batch.stage(changed, 'a: 3\n')
+    batch.stage(unchanged, 'b: 2\n')
+    batch.stage(created, 'c: 4\n')
+    assert not created.exists()
+    assert batch.commit() == 2
+    assert len(batch) == 0
+    assert changed.read_text() == 'a: 3\n'
+    assert changed.stat().st_mode & 0o777 == 0o640
+    assert created.read_text() == 'c: 4\n'
+    assert unchanged.stat().st_mtime_ns == before
+    # sidecar of a rewritten file is outdated
+    assert not CONFIG_CODEC.sidecar_path(changed).exists()
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        'changed.yml',
+        'created.yml',
+        'unchanged.yml',
+    ]
+
+
+def test_batch_rolls_back_on_error(tmp_path):
+    filepath = tmp_path / 'config.yml'
+    filepath.write_text('a: 1\n')
+    with raises(RuntimeError):
+        with ConfigBatch() as batch:
+            batch.stage(filepath, 'a: 2\n')
+            raise RuntimeError
+    assert len(batch) == 0
+    assert filepath.read_text() == 'a: 1\n'
+
+
+def test_batch_commit_failure_leaves_files_untouched(tmp_path):
+    filepath = tmp_path / 'config.yml'
+    filepath.write_text('a: 1\n')
+    batch = ConfigBatch()
+    batch.stage(filepath, 'a: 2\n')
+    batch.stage(tmp_path / 'missing' / 'config.yml', 'b: 1\n')
+    with raises(OSError):
+        batch.commit()
+    assert filepath.read_text() == 'a: 1\n'
+    assert [path.name for path in tmp_path.iterdir() if path.is_file()] == [
+        'config.yml'
+    ]
+
+
+def test_config_dump_is_staged_in_batch(tmp_path):
+    filepath = tmp_path / '.mkctf.yml'
+    config = ChallengeConfig.from_dict(CHALLENGE)
+    with ConfigBatch() as batch:
+        config.dump(filepath, batch)
+        assert not filepath.exists()
+    assert ChallengeConfig.load(filepath).to_dict() == CHALLENGE
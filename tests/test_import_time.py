@@ -0,0 +1,62 @@
+"""mkctf-cli startup budget
+
+mkctf-cli runs hundreds of times per CI pipeline: importing mkctf.cli must
+stay fast and must not pull dependencies of specific subcommands.
+"""
+
+from os import environ
+from subprocess import run
+from sys import executable
+
+# seconds, best of ROUNDS, override using MKCTF_IMPORT_BUDGET
+IMPORT_BUDGET = float(environ.get('MKCTF_IMPORT_BUDGET', '0.5'))
+ROUNDS = 5
+# modules only needed by some subcommands
+LAZY_MODULES = (
+    'aiohttp',
+    'concurrent.futures.process',
+    'ctypes',
+    'jinja2',
+    'mkctf.api.export',
+    'mkctf.api.snapshot',
+    'mkctf.api.watcher',
+    'mkctf.command.build',
+    'mkctf.helper.archive',
+    'mkctf.helper.rangefetch',
+    'pick',
+    'ruamel.yaml',
+    'tarfile',
+    'urllib.request',
+    'zipfile',
+)
+
+
+def _python(code: str) -> str:
+    return run(
+        [executable, '-c', code],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+
+
+def test_import_keeps_subcommand_dependencies_out():
+    loaded = _python(
+        'import sys, mkctf.cli; print("\\n".join(sys.modules))'
+    ).split()
+    assert not set(LAZY_MODULES).intersection(loaded)
+
+
+def test_import_time_budget():
+    elapsed = min(
+        float(
+            _python(
+                'from time import perf_counter\n'
+                'started = perf_counter()\n'
+                'import mkctf.cli\n'
+                'print(perf_counter() - started)\n'
+            )
+        )
+        for _ in range(ROUNDS)
+    )
+    assert elapsed < IMPORT_BUDGET, f"import mkctf.cli took {elapsed:.3f}s"
@@ -0,0 +1,63 @@
+"""Challenge index
+"""
+
+from os import utime
+from pathlib import Path
+from time import time_ns
+
+from mkctf.api.config import ChallengeConfig
+from mkctf.api.index import RACY_DELAY_NS, ChallengeIndex
+
+
+def _challenge(directory: Path, slug: str, mtime_ns: int) -> Path:
+    config_path = directory / slug / '.mkctf.yml'
+    config_path.parent.mkdir(parents=True)
+    ChallengeConfig(slug=slug, tags=['web'], category='web').dump(config_path)
+    utime(config_path, ns=(mtime_ns, mtime_ns))
+    return config_path
+
+
+def _index(directory: Path) -> ChallengeIndex:
+    return ChallengeIndex.load(directory / 'index.json', directory)
+
+
+def test_index_reparses_stale_entries_only(tmp_path):
+    old_ns = time_ns() - 10 * RACY_DELAY_NS
+    config_path = _challenge(tmp_path, 'alpha', old_ns)
+    index = _index(tmp_path)
+    index.refresh([config_path])
+    index.dump()
+    index = _index(tmp_path)
+    assert index.config(config_path).slug == 'alpha'
+    assert not index.dirty
+    ChallengeConfig(slug='beta', tags=[]).dump(config_path)
+    assert index.config(config_path).slug == 'beta'
+    assert index.dirty
+    assert index.select(index.entries, slug='beta') == ['alpha/.mkctf.yml']
+
+
+def test_verify_reports_problems(tmp_path):
+    old_ns = time_ns() - 10 * RACY_DELAY_NS
+    stale = _challenge(tmp_path, 'stale', old_ns)
+    orphan = _challenge(tmp_path, 'orphan', old_ns)
+    index = _index(tmp_path)
+    index.refresh([stale, orphan])
+    index.dump()
+    index = _index(tmp_path)
+    utime(stale, ns=(old_ns + 1, old_ns + 1))
+    unindexed = _challenge(tmp_path, 'unindexed', old_ns)
+    assert index.verify([stale, unindexed]) == [
+        ('stale/.mkctf.yml', 'stale'),
+        ('unindexed/.mkctf.yml', 'unindexed'),
+        ('orphan/.mkctf.yml', 'orphaned'),
+    ]
+
+
+def test_verify_accepts_entries_too_recent_to_be_indexed(tmp_path):
+    config_path = _challenge(tmp_path, 'delta', time_ns())
+    index = _index(tmp_path)
+    index.refresh([config_path])
+    index.dump()
+    index = _index(tmp_path)
+    assert not index.entries
+    assert index.verify([config_path]) == []
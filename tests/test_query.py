@@ -0,0 +1,130 @@
+"""Challenge query engine
+"""
+
+from pytest import mark, raises
+
+from mkctf.api.query import Aggregate, Catalog, parse_expression
+from mkctf.helper.exception import MKCTFAPIException
+
+CONFIGS = [
+    {
+        'slug': 'alpha',
+        'points': 100,
+        'enabled': True,
+        'category': 'web',
+        'tags': ['sqli', 'easy'],
+    },
+    {
+        'slug': 'beta',
+        'points': 300,
+        'enabled': False,
+        'category': 'pwn',
+        'tags': ['heap'],
+    },
+    {
+        'slug': 'gamma',
+        'points': 500,
+        'enabled': True,
+        'category': 'pwn',
+        'tags': ['heap', 'easy'],
+    },
+    {'slug': 'delta', 'enabled': True, 'category': 'misc', 'tags': None},
+]
+
+
+def _slugs(text: str) -> list[str]:
+    catalog = Catalog.from_configs(CONFIGS)
+    indices = catalog.filter(parse_expression(text))
+    return [row['slug'] for row in catalog.rows(indices, ['slug'])]
+
+
+@mark.parametrize(
+    'text, slugs',
+    [
+        ("points >= 300", ['beta', 'gamma']),
+        ("category == 'pwn' and not enabled", ['beta']),
+        ("tags has 'easy'", ['alpha', 'gamma']),
+        ("category in ['web', 'misc']", ['alpha', 'delta']),
+        ("slug ~ '^[ab]'", ['alpha', 'beta']),
+        ("points == null", ['delta']),
+        # points > 'x' cannot be compared, rows do not match
+        ("points > 'x' or slug = 'delta'", ['delta']),
+    ],
+)
+def test_filter(text, slugs):
+    assert _slugs(text) == slugs
+
+
+def test_and_binds_tighter_than_or():
+    text = "category == 'web' or category == 'pwn' and enabled"
+    assert _slugs(text) == ['alpha', 'gamma']
+    text = "(category == 'web' or category == 'pwn') and enabled"
+    assert _slugs(text) == ['alpha', 'gamma']
+    text = "(category == 'web' or category == 'pwn') and not enabled"
+    assert _slugs(text) == ['beta']
+    assert _slugs("not enabled or points > 400") == ['beta', 'gamma']
+
+
+@mark.parametrize(
+    'text',
+    [
+        "unknown == 1",
+        "points >",
+        "(enabled",
+        "enabled enabled",
+        "points == 1 $",
+        "slug ~ '('",
+        "tags has [1,",
+    ],
+)
+def test_invalid_expressions(text):
+    with raises(MKCTFAPIException):
+        _slugs(text)
+
+
+def test_aggregate_groups_by_tag():
+    catalog = Catalog.from_configs(CONFIGS)
+    rows = list(
+        catalog.aggregate(
+            catalog.filter(),
+            ['tags'],
+            [Aggregate.parse('count'), Aggregate.parse('sum(points)')],
+        )
+    )
+    assert rows == [
+        {'tags': 'sqli', 'count': 1, 'sum(points)': 100},
+        {'tags': 'easy', 'count': 2, 'sum(points)': 600},
+        {'tags': 'heap', 'count': 2, 'sum(points)': 800},
+    ]
+
+
+def test_aggregate_functions_skip_missing_values():
+    catalog = Catalog.from_configs(CONFIGS)
+    indices = catalog.filter(parse_expression("enabled"))
+    row = next(
+        catalog.aggregate(
+            indices,
+            [],
+            [
+                Aggregate.parse(spec)
+                for spec in (
+                    'count',
+                    'count(points)',
+                    'avg(points)',
+                    'max(slug)',
+                )
+            ],
+        )
+    )
+    assert row == {
+        'count': 3,
+        'count(points)': 2,
+        'avg(points)': 300,
+        'max(slug)': 'gamma',
+    }
+
+
+@mark.parametrize('spec', ['median(points)', 'sum', 'count(', ''])
+def test_invalid_aggregates(spec):
+    with raises(MKCTFAPIException):
+        Aggregate.parse(spec)
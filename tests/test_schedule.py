@@ -0,0 +1,108 @@
+"""Challenge dependency scheduling
+"""
+
+from asyncio import run, sleep
+
+from pytest import raises
+
+from mkctf.api.schedule import DependencyScheduler, dependency_closure
+from mkctf.helper.exception import MKCTFAPIException
+
+# lib <- app <- exploit, docs is independent
+DEPENDENCIES = {
+    'docs': [],
+    'exploit': ['app'],
+    'app': ['lib'],
+    'lib': [],
+}
+
+
+def _run(scheduler, failing=(), keep_order=False):
+    started = []
+
+    async def func(node):
+        started.append(node)
+        await sleep(0.01 if node == 'docs' else 0)
+        return node not in failing
+
+    async def collect():
+        return [
+            item
+            async for item in scheduler.run(
+                func,
+                lambda result: result,
+                lambda node, dependency: f'skipped ({dependency})',
+                keep_order,
+            )
+        ]
+
+    return started, run(collect())
+
+
+def test_dependency_closure_puts_dependencies_first():
+    assert dependency_closure(['exploit'], DEPENDENCIES) == [
+        'exploit',
+        'app',
+        'lib',
+    ]
+    with raises(MKCTFAPIException):
+        dependency_closure(['exploit'], {'exploit': ['unknown']})
+
+
+def test_cycles_are_rejected():
+    with raises(MKCTFAPIException, match='a, b'):
+        DependencyScheduler({'a': ['b'], 'b': ['a'], 'c': []})
+
+
+def test_dependencies_run_first():
+    scheduler = DependencyScheduler(DEPENDENCIES, jobs=4)
+    started, results = _run(scheduler)
+    assert started.index('lib') < started.index('app')
+    assert started.index('app') < started.index('exploit')
+    assert dict(results) == {node: True for node in DEPENDENCIES}
+    assert scheduler.topological_order().index('lib') < (
+        scheduler.topological_order().index('app')
+    )
+
+
+def test_dependents_of_failed_node_are_skipped():
+    scheduler = DependencyScheduler(DEPENDENCIES, jobs=2)
+    started, results = _run(scheduler, failing={'lib'}, keep_order=True)
+    assert sorted(started) == ['docs', 'lib']
+    assert results == [
+        ('docs', True),
+        ('exploit', 'skipped (lib)'),
+        ('app', 'skipped (lib)'),
+        ('lib', False),
+    ]
+
+
+def test_critical_path():
+    scheduler = DependencyScheduler(DEPENDENCIES)
+    scheduler.durations = {'lib': 1.0, 'app': 2.0, 'exploit': 0.5, 'docs': 3}
+    assert scheduler.critical_path() == (['lib', 'app', 'exploit'], 3.5)
+    scheduler.durations['docs'] = 4
+    assert scheduler.critical_path() == (['docs'], 4)
+    assert DependencyScheduler({}).critical_path() == ([], 0.0)
+
+
+def test_closing_results_cancels_running_tasks():
+    scheduler = DependencyScheduler({'slow': [], 'fast': []}, jobs=2)
+    cancelled = []
+
+    async def func(node):
+        try:
+            await sleep(0 if node == 'fast' else 10)
+        except BaseException:
+            cancelled.append(node)
+            raise
+        return True
+
+    async def first():
+        results = scheduler.run(func, bool, lambda *_: False)
+        item = await anext(results)
+        await results.aclose()
+        return item
+
+    assert run(first()) == ('fast', True)
+    assert cancelled == ['slow']
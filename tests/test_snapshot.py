@@ -0,0 +1,27 @@
+"""Repository snapshot
+"""
+
+from mkctf.api.snapshot import Snapshot, write_snapshot
+
+
+def test_snapshot_records_are_found_by_slug(tmp_path):
+    filepath = tmp_path / '.mkctf' / 'snapshot.bin'
+    challenges = {
+        'beta': {'slug': 'beta', 'enabled': False},
+        'renamed': {'slug': 'alpha', 'enabled': True},
+        'unconfigured': {},
+        'duplicate': {'slug': 'alpha', 'enabled': False},
+    }
+    assert write_snapshot(filepath, tmp_path, {'name': 'ctf'}, challenges) == 3
+    snapshot = Snapshot.open(filepath)
+    try:
+        assert snapshot.repository_directory == tmp_path
+        assert snapshot.metadata['config'] == {'name': 'ctf'}
+        index = snapshot.find('alpha')
+        assert snapshot.entry(index) == ('duplicate', challenges['duplicate'])
+        assert not snapshot.enabled(index)
+        index = snapshot.find('unconfigured')
+        assert snapshot.directory(index) == 'unconfigured'
+        assert snapshot.find('renamed') is None
+    finally:
+        snapshot.close()
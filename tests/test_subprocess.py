@@ -0,0 +1,89 @@
+"""Challenge programs execution
+"""
+
+from asyncio import run
+from gzip import decompress
+from os import name as os_name
+from pathlib import Path
+
+from pytest import mark
+
+from mkctf.helper.subprocess import (
+    CalledProcessState,
+    OutputBuffer,
+    run_mkctf_prog,
+)
+
+posix_only = mark.skipif(os_name != 'posix', reason="POSIX shell scripts")
+
+
+def test_output_buffer_keeps_everything_below_limits():
+    buffer = OutputBuffer(head_size=4, tail_size=4)
+    for data in (b'ab', b'cd', b'ef'):
+        buffer.write(data)
+    assert buffer.getvalue() == b'abcdef'
+
+
+def test_output_buffer_keeps_head_and_tail():
+    buffer = OutputBuffer(head_size=4, tail_size=3)
+    for data in (b'ab', b'cdefgh', b'ij', b'k'):
+        buffer.write(data)
+    assert buffer.size == 11
+    assert buffer.getvalue() == b'abcd\n[... 4 bytes omitted ...]\nijk'
+    # dropped chunks are not kept around
+    assert buffer.tail_bytes < 3 + len(b'ij')
+
+
+def test_output_buffer_without_tail():
+    buffer = OutputBuffer(head_size=2, tail_size=0)
+    buffer.write(b'abcdef')
+    assert buffer.getvalue() == b'ab\n[... 4 bytes omitted ...]\n'
+
+
+def _script(directory: Path, body: str) -> str:
+    script = directory / 'build'
+    script.write_text(f'#!/bin/sh\n{body}\n')
+    script.chmod(0o755)
+    return script.name
+
+
+@posix_only
+def test_run_streams_lines_and_writes_log(tmp_path):
+    prog = _script(tmp_path, 'echo "$1"; printf partial; echo oops >&2')
+    lines = []
+    log_path = tmp_path / 'logs' / 'build.log.gz'
+    result = run(
+        run_mkctf_prog(
+            prog,
+            tmp_path,
+            True,
+            timeout=10,
+            on_line=lambda name, line: lines.append((name, line)),
+            log_path=log_path,
+        )
+    )
+    assert result.returnstate == CalledProcessState.SUCCESS
+    assert result.stdout == b'--dev\npartial'
+    assert result.stderr == b'oops\n'
+    assert ('stdout', b'--dev\n') in lines
+    assert ('stdout', b'partial') in lines
+    assert ('stderr', b'oops\n') in lines
+    assert result.log_path == str(log_path)
+    assert sorted(decompress(log_path.read_bytes()).splitlines()) == [
+        b'--dev',
+        b'oops',
+        b'partial',
+    ]
+    assert [path.name for path in log_path.parent.iterdir()] == [log_path.name]
+
+
+@posix_only
+def test_run_terminates_process_group_on_timeout(tmp_path):
+    marker = tmp_path / 'survived'
+    prog = _script(tmp_path, f'(sleep 2; touch {marker}) & sleep 30')
+    result = run(run_mkctf_prog(prog, tmp_path, False, timeout=1, grace=0.5))
+    assert result.returnstate == CalledProcessState.TIMEOUT
+    assert result.exception == "timeout"
+    run(run_mkctf_prog(_script(tmp_path, 'sleep 2'), tmp_path, False))
+    # the background process belonged to the terminated group
+    assert not marker.exists()